@@ -0,0 +1,493 @@
+#!/usr/bin/env python3
+"""
+Benchmarks do ChefConta
+Mede o desempenho das operações críticas do sistema em um banco temporário
+
+Uso:
+    python benchmark.py sales [--count 500] [--profiles default performance]
+    python benchmark.py items [--sizes 1 10 100] [--count 50]
+    python benchmark.py pages [--rows 1000 10000 100000]
+    python benchmark.py summary [--rows 10000 100000 1000000]
+    python benchmark.py dashboard [--rows 10000 100000 1000000]
+    python benchmark.py report [--rows 10000 100000] [--single-max 10000] [--memory]
+                               [--format pdf|xlsx|csv]
+    python benchmark.py pack [--rows 20000] [--format pdf|xlsx|csv]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from sqlalchemy.orm import sessionmaker
+
+from src.models.database import Base, create_db_engine, SQLITE_PROFILES
+
+# Tempo máximo (ms) dos indicadores do dashboard sem cache
+DASHBOARD_TARGET_MS = 50
+
+
+class BenchmarkDatabase:
+    """Banco SQLite temporário com dados mínimos para os benchmarks"""
+
+    def __init__(self, profile, products=100):
+        self.tmpdir = tempfile.mkdtemp(prefix="chefconta_bench_")
+        self.url = f"sqlite:///{os.path.join(self.tmpdir, 'bench.db')}"
+        self.engine = create_db_engine(self.url, profile=profile)
+        self.Session = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        Base.metadata.create_all(bind=self.engine)
+        self.user_id, self.product_ids = self.seed(products)
+
+    def seed(self, products):
+        """Cria usuário e produtos de teste"""
+        from src.models import User, Product
+
+        db = self.Session()
+        try:
+            user = User(
+                username="bench",
+                email="bench@chefconta.com",
+                password_hash="-",
+                full_name="Benchmark",
+                role="admin"
+            )
+            db.add(user)
+            items = [
+                Product(
+                    code=f"B{i:05d}",
+                    name=f"Produto {i}",
+                    sale_price=10.0 + i,
+                    cost_price=5.0 + i,
+                    stock_quantity=1_000_000
+                )
+                for i in range(products)
+            ]
+            db.add_all(items)
+            db.commit()
+            return user.id, [p.id for p in items]
+        finally:
+            db.close()
+
+    def close(self):
+        self.engine.dispose()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+
+def time_sales(profile, size, count):
+    """Cronometra `count` chamadas de SalesController.create_sale com `size` itens"""
+    from src.controllers.sales_controller import SalesController
+
+    bench_db = BenchmarkDatabase(profile, products=max(size, 20))
+    controller = SalesController()
+    items = [
+        {'product_id': pid, 'quantity': 1, 'unit_price': 10.0}
+        for pid in bench_db.product_ids[:size]
+    ]
+
+    db = bench_db.Session()
+    try:
+        start = time.perf_counter()
+        for _ in range(count):
+            if controller.create_sale(db, user_id=bench_db.user_id, items=items,
+                                      payment_method="dinheiro") is None:
+                raise RuntimeError("create_sale falhou durante o benchmark")
+        return time.perf_counter() - start
+    finally:
+        db.close()
+        bench_db.close()
+
+
+def bench_sales(profile, count):
+    """Mede vendas/s (commits/s) de SalesController.create_sale"""
+    elapsed = time_sales(profile, 3, count)
+    return count / elapsed, elapsed
+
+
+def bench_items(profile, size, count):
+    """Mede itens/s de create_sale para vendas com `size` itens"""
+    elapsed = time_sales(profile, size, count)
+    return size * count / elapsed, count / elapsed
+
+
+def seed_sales_history(bench_db, rows):
+    """Insere `rows` vendas distribuídas nos últimos dois anos"""
+    from datetime import datetime, timedelta
+    from sqlalchemy import insert
+    from src.models import Sale
+
+    start = datetime.now() - timedelta(days=730)
+    step = timedelta(days=730) / rows
+    with bench_db.engine.begin() as connection:
+        connection.execute(insert(Sale), [
+            {
+                'sale_number': f"VD{i:08d}",
+                'user_id': bench_db.user_id,
+                'sale_date': start + step * i,
+                'total_amount': 10.0,
+                'final_amount': 10.0,
+                'is_cancelled': False
+            }
+            for i in range(rows)
+        ])
+
+
+def seed_expense_history(bench_db, rows):
+    """Insere `rows` despesas distribuídas nos últimos dois anos (uma em cada três pendente)"""
+    from datetime import datetime, timedelta
+    from sqlalchemy import insert
+    from src.models import Expense
+
+    start = datetime.now() - timedelta(days=730)
+    step = timedelta(days=730) / rows
+    with bench_db.engine.begin() as connection:
+        connection.execute(insert(Expense), [
+            {
+                'expense_number': f"DP{i:08d}",
+                'user_id': bench_db.user_id,
+                'expense_type': "outros",
+                'description': "Despesa de benchmark",
+                'amount': 5.0,
+                'expense_date': start + step * i,
+                'paid': i % 3 != 0
+            }
+            for i in range(rows)
+        ])
+
+
+def bench_pages(rows, repeat=5):
+    """Mede a abertura da tela de vendas: lista completa x primeira página"""
+    from src.controllers.sales_controller import SalesController
+
+    bench_db = BenchmarkDatabase("performance", products=1)
+    seed_sales_history(bench_db, rows)
+    controller = SalesController()
+
+    db = bench_db.Session()
+    try:
+        timings = {}
+        cases = {
+            'completa': lambda: controller.list_sales(db, include_cancelled=True, load="rows"),
+            'página': lambda: controller.list_sales_page(db, include_cancelled=True),
+        }
+        for name, run in cases.items():
+            start = time.perf_counter()
+            for _ in range(repeat):
+                run()
+            timings[name] = (time.perf_counter() - start) / repeat
+        return timings
+    finally:
+        db.close()
+        bench_db.close()
+
+
+def bench_summary(rows, repeat=5):
+    """Mede o resumo de vendas do último ano: documentos x consolidado diário"""
+    from datetime import datetime, timedelta
+    from sqlalchemy import func
+    from src.models import Sale
+    from src.controllers.sales_controller import SalesController
+    from src.controllers.rollup_controller import RollupController
+
+    bench_db = BenchmarkDatabase("performance", products=1)
+    seed_sales_history(bench_db, rows)
+    controller = SalesController()
+
+    db = bench_db.Session()
+    try:
+        RollupController().rebuild(db)
+        end = datetime.now()
+        start = end - timedelta(days=365)
+
+        def raw_summary():
+            return db.query(func.count(Sale.id), func.sum(Sale.final_amount)).filter(
+                Sale.is_cancelled == False,
+                Sale.sale_date >= start,
+                Sale.sale_date <= end
+            ).one()
+
+        timings = {}
+        cases = {
+            'documentos': raw_summary,
+            'consolidado': lambda: controller.get_sales_summary(db, start, end),
+        }
+        for name, run in cases.items():
+            start_time = time.perf_counter()
+            for _ in range(repeat):
+                run()
+            timings[name] = (time.perf_counter() - start_time) / repeat
+        return timings
+    finally:
+        db.close()
+        bench_db.close()
+
+
+def bench_dashboard(rows, repeat=20):
+    """
+    Mede os indicadores do dashboard (DashboardController.get_dashboard)
+    com dois anos de vendas e despesas
+
+    Returns:
+        Dict {caso: segundos}: primeira chamada (engine e sessão novas,
+        sem cache), média sem cache e média com cache
+    """
+    from src.controllers.dashboard_controller import DashboardController
+
+    bench_db = BenchmarkDatabase("performance", products=1000)
+    seed_sales_history(bench_db, rows)
+    seed_expense_history(bench_db, max(rows // 10, 1))
+    bench_db.engine.dispose()  # A primeira chamada abre a conexão, como no login
+    controller = DashboardController()
+
+    db = bench_db.Session()
+    try:
+        timings = {}
+        DashboardController.invalidate()
+        start_time = time.perf_counter()
+        controller.get_dashboard(db)
+        timings['primeira'] = time.perf_counter() - start_time
+
+        cases = {
+            'sem cache': lambda: controller.get_dashboard(db, use_cache=False),
+            'com cache': lambda: controller.get_dashboard(db),
+        }
+        for name, run in cases.items():
+            start_time = time.perf_counter()
+            for _ in range(repeat):
+                run()
+            timings[name] = (time.perf_counter() - start_time) / repeat
+        return timings
+    finally:
+        db.close()
+        bench_db.close()
+        DashboardController.invalidate()
+
+
+def bench_report(rows, single_table=False, memory=False, output_format="pdf"):
+    """
+    Gera o relatório de vendas de dois anos em PDF, XLSX ou CSV
+
+    Com single_table=True (só PDF) reproduz a geração antiga: uma única
+    tabela com todas as vendas. Com memory=True mede o pico com
+    tracemalloc (que deixa a execução bem mais lenta).
+    """
+    import tracemalloc
+    from datetime import datetime, timedelta
+    from src.utils.report_generator import ReportGenerator
+
+    bench_db = BenchmarkDatabase("performance", products=1)
+    seed_sales_history(bench_db, rows)
+    output_dir = os.path.join(bench_db.tmpdir, "reports")
+
+    db = bench_db.Session()
+    try:
+        end = datetime.now()
+        start = end - timedelta(days=731)
+
+        if memory:
+            tracemalloc.start()
+        start_time = time.perf_counter()
+        # Tabela única: um bloco maior que o relatório inteiro
+        generator = ReportGenerator(output_dir, chunk_rows=rows + 1 if single_table else None,
+                                    use_cache=False)
+        filepath = generator.generate(db, "sales", start, end, output_format=output_format)
+        elapsed = time.perf_counter() - start_time
+
+        peak = None
+        if memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        return elapsed, peak, os.path.getsize(filepath)
+    finally:
+        db.close()
+        bench_db.close()
+
+
+def bench_pack(rows, output_format="pdf"):
+    """
+    Gera o pacote do fechamento (dois anos de vendas): um relatório após o
+    outro x todos em paralelo no pool de processos
+
+    Returns:
+        Tupla (tempos sequenciais por relatório, ReportPackResult)
+    """
+    from datetime import datetime, timedelta
+    from src.utils.report_generator import ReportGenerator
+    from src.utils.report_pack import REPORT_PACK_TYPES, generate_report_pack
+
+    bench_db = BenchmarkDatabase("performance", products=1)
+    seed_sales_history(bench_db, rows)
+    output_dir = os.path.join(bench_db.tmpdir, "reports")
+
+    end = datetime.now()
+    start = end - timedelta(days=731)
+    try:
+        sequential = {}
+        db = bench_db.Session()
+        try:
+            generator = ReportGenerator(output_dir, use_cache=False)
+            for report_type in REPORT_PACK_TYPES:
+                start_time = time.perf_counter()
+                generator.generate(db, report_type, start, end, output_format=output_format)
+                sequential[report_type] = time.perf_counter() - start_time
+        finally:
+            db.close()
+
+        result = generate_report_pack(start, end, output_dir, output_format,
+                                      database_url=bench_db.url)
+        return sequential, result
+    finally:
+        bench_db.close()
+
+
+def cmd_pages(args):
+    """Compara a listagem completa com a paginação por cursor"""
+    print("Abertura da tela de vendas (média de 5 execuções)\n")
+    print(f"{'Vendas':<12}{'completa (ms)':>16}{'página (ms)':>14}")
+    print("-" * 42)
+
+    for rows in args.rows:
+        timings = bench_pages(rows)
+        print(f"{rows:<12}{timings['completa'] * 1000:>16.1f}{timings['página'] * 1000:>14.1f}")
+
+
+def cmd_summary(args):
+    """Compara o resumo anual por documentos com o consolidado diário"""
+    print("Resumo de vendas de 12 meses (média de 5 execuções)\n")
+    print(f"{'Vendas':<12}{'documentos (ms)':>18}{'consolidado (ms)':>18}")
+    print("-" * 48)
+
+    for rows in args.rows:
+        timings = bench_summary(rows)
+        print(f"{rows:<12}{timings['documentos'] * 1000:>18.1f}{timings['consolidado'] * 1000:>18.1f}")
+
+
+def cmd_dashboard(args):
+    """Mede os indicadores do dashboard com e sem cache (meta: 50 ms)"""
+    print("Indicadores do dashboard, 2 anos de vendas e despesas (média de 20 execuções)\n")
+    print(f"{'Vendas':<12}{'primeira (ms)':>16}{'sem cache (ms)':>16}{'com cache (ms)':>16}{'meta':>8}")
+    print("-" * 68)
+
+    for rows in args.rows:
+        timings = bench_dashboard(rows)
+        within_target = max(timings['primeira'], timings['sem cache']) * 1000 < DASHBOARD_TARGET_MS
+        print(f"{rows:<12}{timings['primeira'] * 1000:>16.1f}{timings['sem cache'] * 1000:>16.1f}"
+              f"{timings['com cache'] * 1000:>16.3f}{'ok' if within_target else 'acima':>8}")
+
+
+def cmd_report(args):
+    """Compara o PDF em blocos (streaming) com a tabela única"""
+    print(f"Relatório de vendas em {args.format.upper()} (2 anos)"
+          + (" - memória via tracemalloc" if args.memory else "") + "\n")
+    print(f"{'Vendas':<10}{'modo':<16}{'tempo (s)':>12}{'pico (MB)':>12}{'arquivo (MB)':>14}")
+    print("-" * 64)
+
+    for rows in args.rows:
+        modes = [("streaming", False)]
+        if rows <= args.single_max and args.format == "pdf":
+            modes.append(("tabela única", True))
+
+        for name, single_table in modes:
+            elapsed, peak, size = bench_report(rows, single_table, args.memory, args.format)
+            peak_text = f"{peak / 2**20:.1f}" if peak is not None else "-"
+            print(f"{rows:<10}{name:<16}{elapsed:>12.2f}{peak_text:>12}{size / 2**20:>14.1f}")
+
+
+def cmd_pack(args):
+    """Compara o pacote do mês gerado em sequência e em paralelo"""
+    print(f"Pacote de relatórios em {args.format.upper()} ({os.cpu_count()} núcleos)\n")
+
+    for rows in args.rows:
+        sequential, result = bench_pack(rows, args.format)
+        print(f"{rows} vendas")
+        print(f"  {'relatório':<14}{'sequencial (s)':>16}{'no pacote (s)':>16}")
+        for report_type, elapsed in sequential.items():
+            packed = result.timings.get(report_type)
+            packed_text = f"{packed:.2f}" if packed is not None else "erro"
+            print(f"  {report_type:<14}{elapsed:>16.2f}{packed_text:>16}")
+        total = sum(sequential.values())
+        print(f"  {'total':<14}{total:>16.2f}{result.elapsed:>16.2f}"
+              f"  ({total / result.elapsed:.1f}x)\n")
+
+
+def cmd_items(args):
+    """Mede a vazão de itens por tamanho de venda"""
+    print(f"create_sale: {args.count} vendas por tamanho (perfil {args.profile})\n")
+    print(f"{'Itens/venda':<14}{'itens/s':>12}{'vendas/s':>12}")
+    print("-" * 38)
+
+    for size in args.sizes:
+        items_rate, sales_rate = bench_items(args.profile, size, args.count)
+        print(f"{size:<14}{items_rate:>12.1f}{sales_rate:>12.1f}")
+
+
+def cmd_sales(args):
+    """Compara perfis de conexão na criação de vendas"""
+    print(f"create_sale: {args.count} vendas de 3 itens por perfil\n")
+    print(f"{'Perfil':<14}{'vendas/s':>12}{'tempo (s)':>12}")
+    print("-" * 38)
+
+    results = {}
+    for profile in args.profiles:
+        rate, elapsed = bench_sales(profile, args.count)
+        results[profile] = rate
+        print(f"{profile:<14}{rate:>12.1f}{elapsed:>12.2f}")
+
+    if "default" in results and len(results) > 1:
+        print()
+        for profile, rate in results.items():
+            if profile != "default":
+                print(f"{profile}: {rate / results['default']:.1f}x em relação a 'default'")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks do ChefConta")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    sales = subparsers.add_parser("sales", help="vendas/s de SalesController.create_sale")
+    sales.add_argument("--count", type=int, default=500)
+    sales.add_argument("--profiles", nargs="+", default=["default", "performance"],
+                       choices=sorted(SQLITE_PROFILES))
+    sales.set_defaults(func=cmd_sales)
+
+    items = subparsers.add_parser("items", help="itens/s de create_sale por tamanho de venda")
+    items.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100])
+    items.add_argument("--count", type=int, default=50)
+    items.add_argument("--profile", default="performance", choices=sorted(SQLITE_PROFILES))
+    items.set_defaults(func=cmd_items)
+
+    pages = subparsers.add_parser("pages", help="listagem completa x página de vendas")
+    pages.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    pages.set_defaults(func=cmd_pages)
+
+    summary = subparsers.add_parser("summary", help="resumo anual: documentos x consolidado")
+    summary.add_argument("--rows", type=int, nargs="+", default=[10000, 100000, 1000000])
+    summary.set_defaults(func=cmd_summary)
+
+    dashboard = subparsers.add_parser("dashboard", help="indicadores do dashboard: sem x com cache")
+    dashboard.add_argument("--rows", type=int, nargs="+", default=[10000, 100000, 1000000])
+    dashboard.set_defaults(func=cmd_dashboard)
+
+    report = subparsers.add_parser("report", help="relatório de vendas: streaming x tabela única")
+    report.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    report.add_argument("--single-max", type=int, default=10000,
+                        help="maior volume medido também com tabela única (custo quadrático)")
+    report.add_argument("--memory", action="store_true", help="mede o pico de memória (mais lento)")
+    report.add_argument("--format", default="pdf", choices=["pdf", "xlsx", "csv"])
+    report.set_defaults(func=cmd_report)
+
+    pack = subparsers.add_parser("pack", help="pacote do mês: sequencial x pool de processos")
+    pack.add_argument("--rows", type=int, nargs="+", default=[20000])
+    pack.add_argument("--format", default="pdf", choices=["pdf", "xlsx", "csv"])
+    pack.set_defaults(func=cmd_pack)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
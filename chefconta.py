@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+ChefConta - Linha de Comando
+Relatórios, exportações, backups e manutenção sem a interface gráfica
+(ex.: tarefas noturnas agendadas no cron ou no Agendador de Tarefas)
+
+Os módulos pesados (reportlab, openpyxl) só são importados pelos comandos
+que os usam; a interface (customtkinter/Tk) nunca é importada.
+
+Uso (na pasta do sistema, onde fica o .env):
+    python -m chefconta report sales [--month 2024-05 | --start 2024-05-01 --end 2024-05-31]
+                                     [--format pdf|xlsx|csv] [--output ARQUIVO] [--no-cache]
+    python -m chefconta pack [--month 2024-05] [--format pdf|xlsx|csv] [--output-dir reports] [--zip]
+    python -m chefconta export sales|expenses|purchases|products [--start ...] [--end ...]
+                                     [--output ARQUIVO.csv]
+    python -m chefconta backup [--output ARQUIVO] [--dir backups] [--keep 30]
+    python -m chefconta rollup rebuild|check [--start AAAA-MM-DD] [--end AAAA-MM-DD]
+    python -m chefconta valuation [show|rebuild]
+    python -m chefconta check
+    python -m chefconta migrate [--revision head]
+
+Código de saída: 0 = sucesso, 1 = falha ou divergências encontradas
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import date, datetime, time as day_time, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+REPORT_TYPES = ["sales", "expenses", "financial", "stock", "purchases"]
+EXPORT_TYPES = ["sales", "expenses", "purchases", "products"]
+FORMATS = ["pdf", "xlsx", "csv"]
+
+
+def parse_month(value: str):
+    """AAAA-MM -> (primeiro instante, último instante) do mês"""
+    try:
+        start = datetime.strptime(value, "%Y-%m")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"mês inválido: {value} (use AAAA-MM)")
+    next_month = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start, next_month - timedelta(microseconds=1)
+
+
+def resolve_period(args, default_month: bool = True):
+    """
+    Período do comando: --month ou --start/--end (dias inteiros, fim inclusivo)
+
+    Sem nenhum deles: mês atual até agora (default_month) ou sem limite.
+    """
+    if getattr(args, "month", None):
+        return args.month
+
+    start = datetime.combine(args.start, day_time.min) if args.start else None
+    end = datetime.combine(args.end, day_time.max) if args.end else None
+    if start is None and end is None and default_month:
+        now = datetime.now()
+        return now.replace(day=1, hour=0, minute=0, second=0, microsecond=0), now
+    return start, end
+
+
+def cmd_report(args):
+    """Gera um relatório"""
+    from src.models.database import session_scope
+    from src.utils.report_generator import ReportGenerator
+
+    start, end = resolve_period(args)
+    output_dir = os.path.dirname(args.output) if args.output else "reports"
+    generator = ReportGenerator(output_dir or ".", use_cache=not args.no_cache)
+
+    start_time = time.perf_counter()
+    with session_scope() as db:
+        filepath = generator.generate(db, args.type, start, end, args.output, args.format)
+    print(f"✅ Relatório gerado: {filepath} ({time.perf_counter() - start_time:.1f} s)")
+    return 0
+
+
+def cmd_pack(args):
+    """Gera o pacote de relatórios do período"""
+    from src.utils.report_pack import generate_report_pack
+
+    start, end = resolve_period(args)
+    result = generate_report_pack(start, end, args.output_dir, args.format, zip_pack=args.zip)
+
+    for report_type, seconds in result.timings.items():
+        print(f"✅ {report_type:<12}{seconds:>8.1f} s  {result.files[report_type]}")
+    for report_type, error in result.errors.items():
+        print(f"❌ {report_type:<12} {error}")
+    print(f"\nPacote em {result.zip_path or result.folder} ({result.elapsed:.1f} s)")
+    return 1 if result.errors else 0
+
+
+def export_value(value) -> str:
+    """Valor no CSV (padrão das planilhas em português)"""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "Sim" if value else "Não"
+    if isinstance(value, float):
+        return f"{value:.10g}".replace(".", ",")
+    if isinstance(value, datetime):
+        return value.strftime("%d/%m/%Y %H:%M:%S")
+    if isinstance(value, date):
+        return value.strftime("%d/%m/%Y")
+    return str(value)
+
+
+def cmd_export(args):
+    """Exporta os registros (projeção das listagens) em CSV"""
+    import csv
+    from src.models.database import session_scope
+
+    start, end = resolve_period(args, default_month=False)
+    filepath = args.output or f"{args.type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+
+    with session_scope() as db:
+        if args.type == "products":
+            from src.controllers.product_controller import ProductController
+            query = ProductController().iter_products(db, active_only=False)
+        elif args.type == "sales":
+            from src.controllers.sales_controller import SalesController
+            query = SalesController().iter_sales(db, start, end, include_cancelled=True)
+        elif args.type == "expenses":
+            from src.controllers.expense_controller import ExpenseController
+            query = ExpenseController().iter_expenses(db, start, end)
+        else:
+            from src.controllers.purchase_controller import PurchaseController
+            query = PurchaseController().iter_purchases(db, start, end)
+
+        count = 0
+        with open(filepath, "w", newline="", encoding="utf-8-sig") as file:
+            writer = csv.writer(file, delimiter=";")
+            writer.writerow([column["name"] for column in query.column_descriptions])
+            for row in query:
+                writer.writerow([export_value(value) for value in row])
+                count += 1
+
+    print(f"✅ {count} registro(s) exportado(s) para {filepath}")
+    return 0
+
+
+def cmd_backup(args):
+    """Cria um backup do banco"""
+    from src.utils.backup import create_backup
+
+    filepath = create_backup(args.output, args.dir, args.keep)
+    print(f"✅ Backup criado: {filepath}")
+    return 0
+
+
+def cmd_rollup(args):
+    """Reconstrói ou confere os consolidados diários"""
+    from src.models.database import session_scope
+    from src.controllers.rollup_controller import RollupController
+
+    controller = RollupController()
+    with session_scope() as db:
+        if args.action == "rebuild":
+            written = controller.rebuild(db, args.start, args.end)
+            print(f"✅ {written} linha(s) de consolidado recalculada(s)")
+            return 0
+
+        problems = controller.check_consistency(db, args.start, args.end)
+    for problem in problems:
+        print(f"❌ {problem}")
+    if not problems:
+        print("✅ Consolidados consistentes com os documentos")
+    return 1 if problems else 0
+
+
+def cmd_valuation(args):
+    """Valor do estoque pelo custo médio (rebuild: recalcula pelo histórico)"""
+    from src.models.database import session_scope
+    from src.controllers.product_controller import ProductController
+
+    controller = ProductController()
+    with session_scope() as db:
+        if args.action == "rebuild":
+            count = controller.rebuild_average_costs(db)
+            print(f"✅ Custo médio recalculado para {count} produto(s)")
+        summary = controller.get_stock_summary(db)
+
+    print(f"Produtos ativos:            {summary['product_count']}")
+    print(f"Valor pelo custo médio:     R$ {summary['cost_value']:.2f}")
+    print(f"Valor pelo preço de venda:  R$ {summary['stock_value']:.2f}")
+    return 0
+
+
+def cmd_check(args):
+    """Confere schema, integridade do arquivo e consolidados"""
+    from sqlalchemy import text
+    from src.models.database import engine, session_scope
+    from src.models.migrations import HEAD_REVISION, get_schema_version
+    from src.controllers.rollup_controller import RollupController
+
+    problems = []
+
+    version = get_schema_version()
+    if version != HEAD_REVISION:
+        problems.append(f"Schema na versão {version or 'nenhuma'}, esperado {HEAD_REVISION} "
+                        f"(execute: python -m chefconta migrate)")
+    else:
+        print(f"✅ Schema na versão {version}")
+
+    if engine.dialect.name == "sqlite":
+        with engine.connect() as connection:
+            integrity = [row[0] for row in connection.execute(text("PRAGMA integrity_check"))]
+            foreign_keys = connection.execute(text("PRAGMA foreign_key_check")).fetchall()
+        if integrity != ["ok"]:
+            problems.extend(f"integrity_check: {message}" for message in integrity)
+        else:
+            print("✅ Arquivo do banco íntegro")
+        problems.extend(f"Chave estrangeira inválida: {row[0]} (rowid {row[1]}) -> {row[2]}"
+                        for row in foreign_keys)
+
+    if version is not None:
+        with session_scope() as db:
+            rollup_problems = RollupController().check_consistency(db)
+        problems.extend(rollup_problems)
+        if not rollup_problems:
+            print("✅ Consolidados consistentes com os documentos")
+
+    for problem in problems:
+        print(f"❌ {problem}")
+    return 1 if problems else 0
+
+
+def cmd_migrate(args):
+    """Aplica as migrações pendentes do schema"""
+    from src.models.migrations import get_schema_version, upgrade_database
+
+    current = get_schema_version()
+    revision = upgrade_database(revision=args.revision)
+    if current == revision:
+        print(f"ℹ️  Schema já está na versão {revision}")
+    else:
+        print(f"✅ Schema migrado: {current or 'vazio'} → {revision}")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m chefconta",
+                                     description="ChefConta - linha de comando")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_period(subparser):
+        subparser.add_argument("--month", type=parse_month, help="mês (AAAA-MM)")
+        subparser.add_argument("--start", type=date.fromisoformat, help="primeiro dia (AAAA-MM-DD)")
+        subparser.add_argument("--end", type=date.fromisoformat, help="último dia (AAAA-MM-DD)")
+        subparser.set_defaults(period_parser=subparser)
+
+    report = subparsers.add_parser("report", help="gera um relatório")
+    report.add_argument("type", choices=REPORT_TYPES)
+    add_period(report)
+    report.add_argument("--format", default="pdf", choices=FORMATS)
+    report.add_argument("--output", help="arquivo de saída (padrão: reports/relatorio_<tipo>_<data>)")
+    report.add_argument("--no-cache", action="store_true", help="gera mesmo se houver cópia em cache")
+    report.set_defaults(func=cmd_report)
+
+    pack = subparsers.add_parser("pack", help="gera todos os relatórios do período em paralelo")
+    add_period(pack)
+    pack.add_argument("--format", default="pdf", choices=FORMATS)
+    pack.add_argument("--output-dir", default="reports")
+    pack.add_argument("--zip", action="store_true", help="também compacta a pasta do pacote")
+    pack.set_defaults(func=cmd_pack)
+
+    export = subparsers.add_parser("export", help="exporta os registros em CSV")
+    export.add_argument("type", choices=EXPORT_TYPES)
+    export.add_argument("--start", type=date.fromisoformat, help="primeiro dia (AAAA-MM-DD)")
+    export.add_argument("--end", type=date.fromisoformat, help="último dia (AAAA-MM-DD)")
+    export.add_argument("--output", help="arquivo CSV (padrão: <tipo>_<data>.csv)")
+    export.set_defaults(func=cmd_export)
+
+    backup = subparsers.add_parser("backup", help="cria um backup do banco (SQLite)")
+    backup.add_argument("--output", help="arquivo de destino (sem rotação)")
+    backup.add_argument("--dir", help="pasta dos backups automáticos (padrão BACKUP_DIR)")
+    backup.add_argument("--keep", type=int, help="backups mantidos na pasta (padrão BACKUP_KEEP)")
+    backup.set_defaults(func=cmd_backup)
+
+    rollup = subparsers.add_parser("rollup", help="reconstrói ou confere os consolidados diários")
+    rollup.add_argument("action", choices=["rebuild", "check"])
+    rollup.add_argument("--start", type=date.fromisoformat, help="primeiro dia (AAAA-MM-DD)")
+    rollup.add_argument("--end", type=date.fromisoformat, help="último dia (AAAA-MM-DD)")
+    rollup.set_defaults(func=cmd_rollup)
+
+    valuation = subparsers.add_parser("valuation", help="valor do estoque pelo custo médio")
+    valuation.add_argument("action", nargs="?", default="show", choices=["show", "rebuild"])
+    valuation.set_defaults(func=cmd_valuation)
+
+    check = subparsers.add_parser("check", help="confere schema, arquivo do banco e consolidados")
+    check.set_defaults(func=cmd_check)
+
+    migrate = subparsers.add_parser("migrate", help="aplica as migrações do schema")
+    migrate.add_argument("--revision", default="head")
+    migrate.set_defaults(func=cmd_migrate)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    # Um mês (--month) ou um intervalo (--start/--end), nunca os dois
+    if getattr(args, "month", None) and (args.start or args.end):
+        args.period_parser.error("--month não pode ser combinado com --start/--end")
+    try:
+        return args.func(args)
+    except Exception as e:
+        print(f"❌ Erro: {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
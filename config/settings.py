@@ -9,6 +9,7 @@ load_dotenv()
 
 # ===== BANCO DE DADOS =====
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///database/chefconta.db")
+DB_PROFILE = os.getenv("DB_PROFILE", "performance")  # performance, safe ou default
 
 # ===== AUTENTICAÇÃO =====
 SECRET_KEY = os.getenv("SECRET_KEY", "sua-chave-secreta-aqui")
@@ -5,7 +5,8 @@ Aplicação Principal
 import customtkinter as ctk
 from src.views.login_view import LoginView
 from src.views.main_view import MainView
-from src.models.database import create_tables
+from src.models.migrations import ensure_schema
+from src.utils.task_runner import get_task_runner
 from src.utils.window_utils import maximize_window
 import sys
 
@@ -22,8 +23,12 @@ class ChefContaApp(ctk.CTk):
         # Configurações da janela principal
         self.title("ChefConta - Sistema de Gestão Financeira")
         
-        # Inicializar banco de dados
-        create_tables()
+        # Verificar versão do schema (aplica migrações pendentes, se houver)
+        ensure_schema()
+        
+        # Executor das tarefas em segundo plano (banco, relatórios)
+        self.task_runner = get_task_runner(self)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
         
         # Variável para armazenar usuário atual
         self.current_user = None
@@ -63,6 +68,11 @@ class ChefContaApp(ctk.CTk):
         """Callback executado quando o usuário faz logout"""
         self.current_user = None
         self.show_login()
+    
+    def on_close(self):
+        """Encerra as tarefas em segundo plano e fecha a aplicação"""
+        self.task_runner.shutdown()
+        self.destroy()
 
 def main():
     """Função principal"""
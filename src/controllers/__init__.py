@@ -1,16 +1,23 @@
 """
 Arquivo __init__ para o pacote controllers
+
+Importações sob demanda: importar um controller não carrega os demais
+(nem bcrypt/jwt do AuthController)
 """
-from .auth_controller import AuthController
-from .product_controller import ProductController
-from .sales_controller import SalesController
-from .expense_controller import ExpenseController
-from .purchase_controller import PurchaseController
 
-__all__ = [
-    'AuthController',
-    'ProductController',
-    'SalesController',
-    'ExpenseController',
-    'PurchaseController',
-]
+_CONTROLLERS = {
+    'AuthController': 'auth_controller',
+    'ProductController': 'product_controller',
+    'SalesController': 'sales_controller',
+    'ExpenseController': 'expense_controller',
+    'PurchaseController': 'purchase_controller',
+}
+
+__all__ = list(_CONTROLLERS)
+
+
+def __getattr__(name):
+    if name in _CONTROLLERS:
+        from importlib import import_module
+        return getattr(import_module(f".{_CONTROLLERS[name]}", __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -4,8 +4,9 @@ Gerencia abertura, fechamento e movimentações do caixa
 """
 from datetime import datetime
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, or_
 from src.models import CashRegister, CashMovement, Sale
+from src.controllers.events import CashMovementAdded, bus
 
 class CashRegisterController:
     """Controller para operações de caixa"""
@@ -69,30 +70,12 @@ class CashRegisterController:
             if not cash_register.is_open:
                 return None, "Este caixa já está fechado."
             
-            # Calcular totais por tipo de venda
-            movements = db.query(CashMovement).filter(
-                CashMovement.cash_register_id == cash_register_id
-            ).all()
-            
-            total_comanda = 0.0
-            total_balcao = 0.0
-            total_sales = 0.0
-            
-            for mov in movements:
-                if mov.movement_type == "entrada" and mov.reference_type == "sale":
-                    total_sales += mov.amount
-                    if mov.sale_type == "comanda":
-                        total_comanda += mov.amount
-                    elif mov.sale_type == "balcao":
-                        total_balcao += mov.amount
-            
-            # Calcular saldo esperado
-            expected_balance = (
-                cash_register.opening_balance + 
-                total_sales + 
-                sum(m.amount for m in movements if m.movement_type == "entrada" and m.reference_type != "sale") -
-                sum(m.amount for m in movements if m.movement_type in ["saida", "sangria"])
-            )
+            # Totais e saldo esperado: os mesmos do resumo exibido na tela
+            totals = self._movement_totals(db, cash_register_id)
+            total_sales = totals['total_vendas']
+            total_comanda = totals['total_comanda_vendas']
+            total_balcao = totals['total_balcao_vendas']
+            expected_balance = self._current_balance(cash_register, totals)
             
             # Calcular saldo informado (fechamento)
             closing_balance = total_cash + total_card + total_pix + total_other
@@ -143,6 +126,10 @@ class CashRegisterController:
             )
             
             db.add(movement)
+            db.flush()  # Para obter o ID da movimentação
+            bus.publish_after_commit(db, CashMovementAdded(
+                cash_register_id, movement.id, movement_type, amount, payment_method, sale_type
+            ))
             db.commit()
             db.refresh(movement)
             
@@ -201,7 +188,12 @@ class CashRegisterController:
         )
     
     def get_cash_register_summary(self, db: Session, cash_register_id: int):
-        """Retorna resumo do caixa com todas as movimentações"""
+        """
+        Retorna resumo do caixa
+        
+        Os totais vêm de uma única consulta agregada; as movimentações em si
+        são carregadas apenas pelo diálogo de movimentações (list_movements_page).
+        """
         cash_register = db.query(CashRegister).filter(
             CashRegister.id == cash_register_id
         ).first()
@@ -209,51 +201,101 @@ class CashRegisterController:
         if not cash_register:
             return None
         
-        movements = db.query(CashMovement).filter(
-            CashMovement.cash_register_id == cash_register_id
-        ).order_by(CashMovement.created_at).all()
-        
-        # Calcular totais em tempo real
-        total_vendas = sum(m.amount for m in movements if m.movement_type == "entrada" and m.reference_type == "sale")
-        total_entradas = sum(m.amount for m in movements if m.movement_type == "entrada" and m.reference_type != "sale")
-        total_saidas = sum(m.amount for m in movements if m.movement_type in ["saida", "sangria"])
-        total_reforcos = sum(m.amount for m in movements if m.movement_type == "reforco")
+        totals = self._movement_totals(db, cash_register_id)
         
-        # Total por forma de pagamento
-        total_dinheiro = sum(m.amount for m in movements if m.payment_method == "dinheiro" and m.movement_type == "entrada")
-        total_cartao = sum(m.amount for m in movements if m.payment_method == "cartao" and m.movement_type == "entrada")
-        total_pix_calc = sum(m.amount for m in movements if m.payment_method == "pix" and m.movement_type == "entrada")
+        return {
+            'cash_register': cash_register,
+            'total_vendas': totals['total_vendas'],
+            'total_entradas': totals['total_entradas'],
+            'total_saidas': totals['total_saidas'],
+            'total_reforcos': totals['total_reforcos'],
+            'total_dinheiro': totals['total_dinheiro'],
+            'total_cartao': totals['total_cartao'],
+            'total_pix': totals['total_pix'],
+            'total_comanda': totals['total_comanda'],
+            'total_balcao': totals['total_balcao'],
+            'saldo_atual': self._current_balance(cash_register, totals),
+            'quantidade_vendas': totals['quantidade_vendas']
+        }
+    
+    def _movement_totals(self, db: Session, cash_register_id: int) -> dict:
+        """Totais das movimentações do caixa em um único SELECT (agregação condicional)"""
+        amount = CashMovement.amount
+        is_sale = CashMovement.reference_type == "sale"
+        not_sale = or_(CashMovement.reference_type.is_(None), CashMovement.reference_type != "sale")
+        is_entry = CashMovement.movement_type == "entrada"
         
-        # Total por tipo de venda
-        total_comanda = sum(m.amount for m in movements if m.sale_type == "comanda")
-        total_balcao = sum(m.amount for m in movements if m.sale_type == "balcao")
+        totals = db.query(
+            func.sum(amount).filter(is_entry, is_sale).label('total_vendas'),
+            func.sum(amount).filter(is_entry, not_sale).label('total_entradas'),
+            func.sum(amount).filter(CashMovement.movement_type.in_(["saida", "sangria"])).label('total_saidas'),
+            func.sum(amount).filter(CashMovement.movement_type == "reforco").label('total_reforcos'),
+            # Por forma de pagamento (entradas)
+            func.sum(amount).filter(is_entry, CashMovement.payment_method == "dinheiro").label('total_dinheiro'),
+            func.sum(amount).filter(is_entry, CashMovement.payment_method == "cartao").label('total_cartao'),
+            func.sum(amount).filter(is_entry, CashMovement.payment_method == "pix").label('total_pix'),
+            # Por tipo de venda (resumo: qualquer movimento; fechamento: só entradas de venda)
+            func.sum(amount).filter(CashMovement.sale_type == "comanda").label('total_comanda'),
+            func.sum(amount).filter(CashMovement.sale_type == "balcao").label('total_balcao'),
+            func.sum(amount).filter(is_entry, is_sale, CashMovement.sale_type == "comanda").label('total_comanda_vendas'),
+            func.sum(amount).filter(is_entry, is_sale, CashMovement.sale_type == "balcao").label('total_balcao_vendas'),
+            func.count(CashMovement.id).filter(is_sale).label('quantidade_vendas')
+        ).filter(
+            CashMovement.cash_register_id == cash_register_id
+        ).one()._asdict()
         
-        saldo_atual = (
+        return {name: value or 0 for name, value in totals.items()}
+    
+    @staticmethod
+    def _current_balance(cash_register, totals: dict) -> float:
+        """Saldo atual: abertura + vendas + entradas + reforços - saídas"""
+        return (
             cash_register.opening_balance + 
-            total_vendas + 
-            total_entradas + 
-            total_reforcos - 
-            total_saidas
+            totals['total_vendas'] + 
+            totals['total_entradas'] + 
+            totals['total_reforcos'] - 
+            totals['total_saidas']
         )
+    
+    def list_movements_page(self, db: Session, cash_register_id: int, cursor: tuple = None,
+                            limit: int = None, offset: int = None) -> tuple:
+        """
+        Lista uma página das movimentações do caixa (em ordem cronológica)
         
-        return {
-            'cash_register': cash_register,
-            'movements': movements,
-            'total_vendas': total_vendas,
-            'total_entradas': total_entradas,
-            'total_saidas': total_saidas,
-            'total_reforcos': total_reforcos,
-            'total_dinheiro': total_dinheiro,
-            'total_cartao': total_cartao,
-            'total_pix': total_pix_calc,
-            'total_comanda': total_comanda,
-            'total_balcao': total_balcao,
-            'saldo_atual': saldo_atual,
-            'quantidade_vendas': len([m for m in movements if m.reference_type == "sale"])
-        }
+        Returns:
+            Tupla (movimentações, próximo cursor ou None)
+        """
+        from src.controllers.pagination import keyset_page, DEFAULT_PAGE_SIZE
+        
+        query = db.query(CashMovement).filter(CashMovement.cash_register_id == cash_register_id)
+        return keyset_page(query, CashMovement.created_at, CashMovement.id,
+                           cursor, limit or DEFAULT_PAGE_SIZE, offset, descending=False)
+    
+    def count_movements(self, db: Session, cash_register_id: int) -> int:
+        """Conta as movimentações do caixa"""
+        return db.query(func.count(CashMovement.id)).filter(
+            CashMovement.cash_register_id == cash_register_id
+        ).scalar()
     
     def list_cash_registers(self, db: Session, limit: int = 50):
         """Lista os caixas (mais recentes primeiro)"""
         return db.query(CashRegister).order_by(
             CashRegister.opening_date.desc()
         ).limit(limit).all()
+    
+    def list_cash_registers_page(self, db: Session, cursor: tuple = None, limit: int = None,
+                                 offset: int = None) -> tuple:
+        """
+        Lista uma página de caixas (mais recentes primeiro)
+        
+        Returns:
+            Tupla (caixas, próximo cursor ou None)
+        """
+        from src.controllers.pagination import keyset_page, DEFAULT_PAGE_SIZE
+        
+        return keyset_page(db.query(CashRegister), CashRegister.opening_date, CashRegister.id,
+                           cursor, limit or DEFAULT_PAGE_SIZE, offset)
+    
+    def count_cash_registers(self, db: Session) -> int:
+        """Conta os caixas registrados"""
+        return db.query(func.count(CashRegister.id)).scalar()
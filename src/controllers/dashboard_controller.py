@@ -0,0 +1,133 @@
+"""
+Controller do Dashboard
+Indicadores do mês em uma única consulta, com cache de curta duração
+"""
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Validade (s) dos indicadores em cache
+DASHBOARD_TTL = float(os.getenv("DASHBOARD_TTL", "30"))
+
+# Chave em Session.info: a transação alterou vendas, despesas ou produtos
+_DASHBOARD_STALE = "dashboard_stale"
+
+
+class DashboardController:
+    """Controlador do dashboard"""
+    
+    _cache = {}  # {(início do mês, dia): (expira em, indicadores)}
+    _lock = threading.Lock()
+    
+    def get_dashboard(self, db: Session, reference_date: datetime = None,
+                      use_cache: bool = True) -> dict:
+        """
+        Retorna os indicadores do mês da data de referência
+        
+        Vendas, despesas e estoque baixo vêm de um único SELECT com
+        agregação condicional; o resultado fica em cache por DASHBOARD_TTL
+        segundos ou até o commit de uma venda, despesa ou produto.
+        """
+        reference_date = reference_date or datetime.now()
+        today = reference_date.replace(hour=0, minute=0, second=0, microsecond=0)
+        month_start = today.replace(day=1)
+        key = (month_start, today)
+        
+        if use_cache:
+            with self._lock:
+                cached = self._cache.get(key)
+            if cached and cached[0] > time.monotonic():
+                return dict(cached[1])
+        
+        summary = self._query_dashboard(db, month_start, today)
+        
+        with self._lock:
+            self._cache[key] = (time.monotonic() + DASHBOARD_TTL, summary)
+        return dict(summary)
+    
+    @classmethod
+    def invalidate(cls):
+        """Descarta os indicadores em cache"""
+        with cls._lock:
+            cls._cache.clear()
+    
+    def _query_dashboard(self, db: Session, month_start: datetime, today: datetime) -> dict:
+        from src.models import Sale, Expense, Product
+        from sqlalchemy import case, func, select, true
+        
+        next_month = (month_start + timedelta(days=32)).replace(day=1)
+        
+        # Cada subconsulta agrega uma tabela pelo seu índice (período/status)
+        sales = select(
+            func.count(Sale.id).label('sales_count'),
+            func.coalesce(func.sum(Sale.final_amount), 0).label('sales_total'),
+            func.coalesce(func.sum(
+                case((Sale.sale_date >= today, Sale.final_amount), else_=0)
+            ), 0).label('sales_today')
+        ).where(
+            Sale.is_cancelled == False,
+            Sale.sale_date >= month_start,
+            Sale.sale_date < next_month
+        ).subquery()
+        
+        expenses = select(
+            func.count(Expense.id).label('expenses_count'),
+            func.coalesce(func.sum(Expense.amount), 0).label('expenses_total'),
+            func.coalesce(func.sum(
+                case((Expense.paid == False, Expense.amount), else_=0)
+            ), 0).label('expenses_pending')
+        ).where(
+            Expense.expense_date >= month_start,
+            Expense.expense_date < next_month
+        ).subquery()
+        
+        stock = select(
+            func.count(Product.id).label('low_stock_count')
+        ).where(
+            Product.is_active == True,
+            Product.stock_quantity <= Product.min_stock
+        ).subquery()
+        
+        # Uma linha por subconsulta: a junção sem condição é a própria linha final
+        result = db.execute(
+            select(sales, expenses, stock).select_from(
+                sales.join(expenses, true()).join(stock, true())
+            )
+        ).one()
+        
+        sales_total = float(result.sales_total)
+        expenses_total = float(result.expenses_total)
+        return {
+            'month_start': month_start,
+            'sales_count': result.sales_count,
+            'sales_total': sales_total,
+            'sales_today': float(result.sales_today),
+            'expenses_count': result.expenses_count,
+            'expenses_total': expenses_total,
+            'expenses_pending': float(result.expenses_pending),
+            'balance': sales_total - expenses_total,
+            'low_stock_count': result.low_stock_count
+        }
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_dashboard_stale(session, flush_context):
+    from src.models import Sale, Expense, Product
+    
+    changed = session.new | session.dirty | session.deleted
+    if any(isinstance(obj, (Sale, Expense, Product)) for obj in changed):
+        session.info[_DASHBOARD_STALE] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_dashboard(session):
+    if session.info.pop(_DASHBOARD_STALE, False):
+        DashboardController.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_dashboard_stale(session):
+    session.info.pop(_DASHBOARD_STALE, None)
@@ -0,0 +1,91 @@
+"""
+Controller de Versões dos Dados
+Contadores de alteração por tabela e mês, usados como carimbo de versão
+pelo cache de relatórios
+"""
+from datetime import datetime
+from typing import Dict, Sequence
+from sqlalchemy import and_, func, update
+from sqlalchemy.orm import Session
+
+
+def month_of(value: datetime) -> str:
+    """Mês (AAAA-MM) de uma data"""
+    return value.strftime("%Y-%m")
+
+
+class DataVersionController:
+    """Controlador das versões dos dados"""
+    
+    def bump(self, db: Session, table_name: str, when: datetime):
+        """
+        Incrementa a versão da tabela no mês da data do documento
+        
+        Não faz commit: roda na transação da alteração, de modo que o
+        rollback também desfaz o incremento.
+        
+        Args:
+            table_name: Tabela alterada (ex.: 'sales')
+            when: Data do documento
+        """
+        from src.models import DataVersion
+        
+        table = DataVersion.__table__
+        keys = {'table_name': table_name, 'month': month_of(when)}
+        
+        dialect = db.get_bind().dialect.name
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        elif dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            insert = None
+        
+        if insert is not None:
+            stmt = insert(table).values(version=1, **keys)
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=list(keys),
+                set_={'version': table.c.version + 1}
+            ))
+            return
+        
+        result = db.execute(
+            update(table).where(
+                and_(table.c.table_name == table_name, table.c.month == keys['month'])
+            ).values(version=table.c.version + 1)
+        )
+        if result.rowcount == 0:
+            db.execute(table.insert().values(version=1, **keys))
+    
+    def get_versions(self, db: Session, table_names: Sequence[str],
+                     start_date: datetime = None, end_date: datetime = None) -> Dict[str, int]:
+        """
+        Versão de cada tabela no período (soma dos meses do período), em
+        uma única consulta
+        
+        Os contadores só crescem: qualquer alteração no período muda a soma.
+        
+        Returns:
+            Dict {tabela: versão} (0 para tabelas nunca alteradas)
+        """
+        from src.models import DataVersion
+        
+        filters = [DataVersion.table_name.in_(list(table_names))]
+        if start_date is not None:
+            filters.append(DataVersion.month >= month_of(start_date))
+        if end_date is not None:
+            filters.append(DataVersion.month <= month_of(end_date))
+        
+        rows = db.query(DataVersion.table_name, func.sum(DataVersion.version)).filter(
+            *filters
+        ).group_by(DataVersion.table_name).all()
+        
+        versions = dict.fromkeys(table_names, 0)
+        versions.update({table_name: int(version) for table_name, version in rows})
+        return versions
+    
+    def get_stamp(self, db: Session, table_names: Sequence[str],
+                  start_date: datetime = None, end_date: datetime = None) -> str:
+        """Carimbo de versão do período (ex.: 'expenses=4;sales=17')"""
+        versions = self.get_versions(db, table_names, start_date, end_date)
+        return ";".join(f"{table_name}={versions[table_name]}" for table_name in sorted(versions))
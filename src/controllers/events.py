@@ -0,0 +1,125 @@
+"""
+Eventos de Domínio
+Barramento em processo: os controllers registram o que mudou na transação
+e os inscritos são avisados somente após o commit
+"""
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, Optional
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Chave em Session.info com os eventos da transação em andamento
+_PENDING_EVENTS = "domain_events_pending"
+
+
+@dataclass(frozen=True)
+class SaleCreated:
+    """Venda registrada"""
+    sale_id: int
+    sale_number: str
+    sale_date: datetime
+    final_amount: float
+
+
+@dataclass(frozen=True)
+class SaleCancelled:
+    """Venda cancelada (itens devolvidos ao estoque)"""
+    sale_id: int
+    final_amount: float
+
+
+@dataclass(frozen=True)
+class StockChanged:
+    """Estoque de produtos alterado"""
+    stock_levels: Dict[int, float]  # {product_id: novo estoque}
+
+
+@dataclass(frozen=True)
+class CashMovementAdded:
+    """Movimentação lançada no caixa"""
+    cash_register_id: int
+    movement_id: int
+    movement_type: str
+    amount: float
+    payment_method: Optional[str] = None
+    sale_type: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class ExpenseCreated:
+    """Despesa lançada"""
+    expense_id: int
+    expense_date: datetime
+    amount: float
+    paid: bool
+
+
+@dataclass(frozen=True)
+class ExpensePaid:
+    """Despesa marcada como paga"""
+    expense_id: int
+    amount: float
+
+
+class EventBus:
+    """
+    Barramento de eventos de domínio
+    
+    Os callbacks rodam na thread que fez o commit; as views usam
+    src.utils.ui_events.listen, que entrega na thread do Tk.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}  # {tipo de evento: [callbacks]}
+    
+    def subscribe(self, event_type: type, callback: Callable) -> Callable[[], None]:
+        """
+        Inscreve callback(evento) para um tipo de evento
+        
+        Returns:
+            Função que cancela a inscrição
+        """
+        with self._lock:
+            self._subscribers.setdefault(event_type, []).append(callback)
+        return lambda: self.unsubscribe(event_type, callback)
+    
+    def unsubscribe(self, event_type: type, callback: Callable):
+        """Cancela a inscrição (ignora se já não estiver inscrito)"""
+        with self._lock:
+            callbacks = self._subscribers.get(event_type, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+    
+    def publish(self, domain_event):
+        """Entrega o evento agora a todos os inscritos do tipo"""
+        with self._lock:
+            callbacks = list(self._subscribers.get(type(domain_event), []))
+        
+        for callback in callbacks:
+            try:
+                callback(domain_event)
+            except Exception as e:
+                # Um inscrito com erro não impede os demais
+                print(f"Erro ao tratar evento {type(domain_event).__name__}: {e}")
+    
+    def publish_after_commit(self, db: Session, domain_event):
+        """Registra o evento na transação; é entregue após o commit e descartado no rollback"""
+        db.info.setdefault(_PENDING_EVENTS, []).append(domain_event)
+
+
+# Barramento compartilhado pelo processo
+bus = EventBus()
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending_events(session):
+    for domain_event in session.info.pop(_PENDING_EVENTS, []):
+        bus.publish(domain_event)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_events(session):
+    session.info.pop(_PENDING_EVENTS, None)
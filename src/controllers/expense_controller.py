@@ -5,6 +5,7 @@ Gerencia despesas da empresa
 from datetime import datetime
 from typing import Optional, List
 from sqlalchemy.orm import Session
+from src.controllers.events import ExpenseCreated, ExpensePaid, bus
 
 class ExpenseController:
     """Controlador de despesas"""
@@ -12,19 +13,9 @@ class ExpenseController:
     def generate_expense_number(self, db: Session) -> str:
         """Gera um número único de despesa"""
         from src.models import Expense
+        from src.controllers.numbering_controller import NumberingController
         
-        today = datetime.now().strftime("%Y%m%d")
-        last_expense = db.query(Expense).filter(
-            Expense.expense_number.like(f"DP{today}%")
-        ).order_by(Expense.id.desc()).first()
-        
-        if last_expense:
-            last_number = int(last_expense.expense_number[-4:])
-            new_number = last_number + 1
-        else:
-            new_number = 1
-        
-        return f"DP{today}{new_number:04d}"
+        return NumberingController().next_number(db, "DP", Expense.expense_number)
     
     def create_expense(self, db: Session, user_id: int, expense_type: str,
                       description: str, amount: float, expense_date: datetime = None,
@@ -33,6 +24,8 @@ class ExpenseController:
                       notes: str = None) -> Optional[object]:
         """Cria uma nova despesa"""
         from src.models import Expense
+        from src.controllers.rollup_controller import RollupController
+        from src.controllers.data_version_controller import DataVersionController
         
         try:
             expense_number = self.generate_expense_number(db)
@@ -53,6 +46,12 @@ class ExpenseController:
             )
             
             db.add(expense)
+            db.flush()  # Para obter o ID da despesa
+            RollupController().record_expense(db, expense)
+            DataVersionController().bump(db, "expenses", expense.expense_date)
+            bus.publish_after_commit(db, ExpenseCreated(
+                expense.id, expense.expense_date, expense.amount, expense.paid
+            ))
             db.commit()
             db.refresh(expense)
             return expense
@@ -64,16 +63,22 @@ class ExpenseController:
     def mark_as_paid(self, db: Session, expense_id: int, payment_method: str = None) -> bool:
         """Marca uma despesa como paga"""
         from src.models import Expense
+        from src.controllers.rollup_controller import RollupController
+        from src.controllers.data_version_controller import DataVersionController
         
         try:
             expense = db.query(Expense).filter(Expense.id == expense_id).first()
             if not expense:
                 return False
             
+            if not expense.paid:
+                RollupController().record_expense_paid(db, expense)
+                bus.publish_after_commit(db, ExpensePaid(expense.id, expense.amount))
             expense.paid = True
             expense.paid_date = datetime.now()
             if payment_method:
                 expense.payment_method = payment_method
+            DataVersionController().bump(db, "expenses", expense.expense_date)
             
             db.commit()
             return True
@@ -82,18 +87,89 @@ class ExpenseController:
             print(f"Erro ao marcar despesa como paga: {e}")
             return False
     
-    def get_expense(self, db: Session, expense_id: int) -> Optional[object]:
-        """Busca uma despesa por ID"""
+    def get_expense(self, db: Session, expense_id: int, load=None) -> Optional[object]:
+        """Busca uma despesa por ID (load: perfil de carregamento, ex.: 'details')"""
         from src.models import Expense
-        return db.query(Expense).filter(Expense.id == expense_id).first()
+        from src.controllers.load_profiles import apply_load_profile, EXPENSE_PROFILES
+        
+        query = db.query(Expense).filter(Expense.id == expense_id)
+        return apply_load_profile(query, EXPENSE_PROFILES, load).first()
     
     def list_expenses(self, db: Session, start_date: datetime = None,
                      end_date: datetime = None, expense_type: str = None,
-                     supplier_id: int = None, paid: bool = None) -> List:
-        """Lista despesas com filtros"""
+                     supplier_id: int = None, paid: bool = None, load=None) -> List:
+        """
+        Lista despesas com filtros
+        
+        Args:
+            load: Perfil de carregamento ('details', 'rows') ou opções de
+                loader; None mantém o carregamento lazy
+        """
         from src.models import Expense
+        from src.controllers.load_profiles import apply_load_profile, EXPENSE_PROFILES
         
-        query = db.query(Expense)
+        query = self._filter_expenses(db.query(Expense), start_date, end_date,
+                                      expense_type, supplier_id, paid)
+        
+        query = query.order_by(Expense.expense_date.desc())
+        return apply_load_profile(query, EXPENSE_PROFILES, load).all()
+    
+    def iter_expenses(self, db: Session, start_date: datetime = None,
+                      end_date: datetime = None, expense_type: str = None,
+                      supplier_id: int = None, paid: bool = None, yield_per: int = 1000):
+        """
+        Percorre as despesas em ordem cronológica, buscando yield_per linhas
+        por vez (projeção 'rows'); para relatórios de períodos longos
+        """
+        from src.models import Expense
+        from src.controllers.load_profiles import apply_load_profile, EXPENSE_PROFILES
+        
+        query = self._filter_expenses(db.query(Expense), start_date, end_date,
+                                      expense_type, supplier_id, paid)
+        query = query.order_by(Expense.expense_date, Expense.id)
+        return apply_load_profile(query, EXPENSE_PROFILES, "rows").yield_per(yield_per)
+    
+    def list_expenses_page(self, db: Session, cursor: tuple = None, limit: int = None,
+                           start_date: datetime = None, end_date: datetime = None,
+                           expense_type: str = None, supplier_id: int = None,
+                           paid: bool = None, load="rows", offset: int = None) -> tuple:
+        """
+        Lista uma página de despesas (mais recentes primeiro)
+        
+        Args:
+            cursor: (expense_date, id) da última despesa da página anterior
+            limit: Despesas por página (padrão DEFAULT_PAGE_SIZE)
+            load: Perfil de carregamento (padrão: projeção 'rows')
+            offset: Posição inicial quando não há cursor (saltos de rolagem)
+        
+        Returns:
+            Tupla (despesas, próximo cursor ou None)
+        """
+        from src.models import Expense
+        from src.controllers.load_profiles import apply_load_profile, EXPENSE_PROFILES
+        from src.controllers.pagination import keyset_page, DEFAULT_PAGE_SIZE
+        
+        query = self._filter_expenses(db.query(Expense), start_date, end_date,
+                                      expense_type, supplier_id, paid)
+        query = apply_load_profile(query, EXPENSE_PROFILES, load)
+        
+        return keyset_page(query, Expense.expense_date, Expense.id, cursor,
+                           limit or DEFAULT_PAGE_SIZE, offset)
+    
+    def count_expenses(self, db: Session, start_date: datetime = None,
+                       end_date: datetime = None, expense_type: str = None,
+                       supplier_id: int = None, paid: bool = None) -> int:
+        """Conta as despesas com os mesmos filtros da listagem"""
+        from src.models import Expense
+        from sqlalchemy import func
+        
+        query = self._filter_expenses(db.query(func.count(Expense.id)), start_date,
+                                      end_date, expense_type, supplier_id, paid)
+        return query.scalar()
+    
+    def _filter_expenses(self, query, start_date, end_date, expense_type, supplier_id, paid):
+        """Aplica os filtros comuns das listagens de despesas"""
+        from src.models import Expense
         
         if start_date:
             query = query.filter(Expense.expense_date >= start_date)
@@ -106,56 +182,20 @@ class ExpenseController:
         if paid is not None:
             query = query.filter(Expense.paid == paid)
         
-        return query.order_by(Expense.expense_date.desc()).all()
+        return query
     
     def get_expenses_summary(self, db: Session, start_date: datetime = None,
                             end_date: datetime = None) -> dict:
-        """Retorna resumo de despesas"""
-        from src.models import Expense
-        from sqlalchemy import func
-        
-        # Total de despesas
-        query_total = db.query(
-            func.count(Expense.id).label('total_expenses'),
-            func.sum(Expense.amount).label('total_amount')
-        )
-        
-        if start_date:
-            query_total = query_total.filter(Expense.expense_date >= start_date)
-        if end_date:
-            query_total = query_total.filter(Expense.expense_date <= end_date)
-        
-        total_result = query_total.first()
-        
-        # Despesas pagas
-        query_paid = db.query(
-            func.sum(Expense.amount).label('paid_amount')
-        ).filter(Expense.paid == True)
-        
-        if start_date:
-            query_paid = query_paid.filter(Expense.expense_date >= start_date)
-        if end_date:
-            query_paid = query_paid.filter(Expense.expense_date <= end_date)
-        
-        paid_result = query_paid.first()
-        
-        # Despesas pendentes
-        query_pending = db.query(
-            func.sum(Expense.amount).label('pending_amount')
-        ).filter(Expense.paid == False)
-        
-        if start_date:
-            query_pending = query_pending.filter(Expense.expense_date >= start_date)
-        if end_date:
-            query_pending = query_pending.filter(Expense.expense_date <= end_date)
+        """Retorna resumo de despesas (consolidado diário + pontas do período)"""
+        from src.controllers.rollup_controller import RollupController
         
-        pending_result = query_pending.first()
+        totals = RollupController().expense_totals(db, start_date, end_date)[()]
         
         return {
-            'total_expenses': total_result.total_expenses or 0,
-            'total_amount': float(total_result.total_amount or 0),
-            'paid_amount': float(paid_result.paid_amount or 0),
-            'pending_amount': float(pending_result.pending_amount or 0)
+            'total_expenses': totals['expense_count'],
+            'total_amount': float(totals['total_amount']),
+            'paid_amount': float(totals['paid_amount']),
+            'pending_amount': float(totals['total_amount'] - totals['paid_amount'])
         }
     
     def get_overdue_expenses(self, db: Session) -> List:
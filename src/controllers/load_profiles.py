@@ -0,0 +1,170 @@
+"""
+Perfis de Carregamento
+Estratégias de carregamento (eager loading e projeções) para as listagens
+"""
+from sqlalchemy import func, select
+from sqlalchemy.orm import Query, joinedload, selectinload
+
+# Cada perfil recebe a Query da listagem e devolve a Query ajustada:
+# - perfis ORM acrescentam joinedload/selectinload e continuam retornando objetos
+# - perfis "rows" trocam as entidades por uma projeção plana (Row com atributos
+#   nomeados), sem objetos no identity map
+
+
+def _sale_list(query: Query) -> Query:
+    """Vendas com cliente (listagem de vendas)"""
+    from src.models import Sale
+    return query.options(joinedload(Sale.customer))
+
+
+def _sale_details(query: Query) -> Query:
+    """Vendas com cliente, vendedor e itens com produto (detalhes/relatórios)"""
+    from src.models import Sale, SaleItem
+    return query.options(
+        joinedload(Sale.customer),
+        joinedload(Sale.user),
+        selectinload(Sale.items).joinedload(SaleItem.product)
+    )
+
+
+def _sale_rows(query: Query) -> Query:
+    """Projeção plana da listagem de vendas"""
+    from src.models import Sale, Customer
+    return query.outerjoin(Sale.customer).with_entities(
+        Sale.id,
+        Sale.sale_number,
+        Sale.sale_date,
+        Sale.total_amount,
+        Sale.discount,
+        Sale.final_amount,
+        Sale.payment_method,
+        Sale.is_cancelled,
+        Customer.name.label('customer_name')
+    )
+
+
+def _product_list(query: Query) -> Query:
+    """Produtos com categoria (listagem de produtos)"""
+    from src.models import Product
+    return query.options(joinedload(Product.category))
+
+
+def _product_rows(query: Query) -> Query:
+    """Projeção plana da listagem de produtos"""
+    from src.models import Product, Category
+    return query.outerjoin(Product.category).with_entities(
+        Product.id,
+        Product.code,
+        Product.name,
+        Product.unit,
+        Product.sale_price,
+        Product.stock_quantity,
+        Product.min_stock,
+        Product.average_cost,
+        Product.is_active,
+        Category.name.label('category_name')
+    )
+
+
+def _purchase_list(query: Query) -> Query:
+    """Compras com fornecedor e itens"""
+    from src.models import Purchase
+    return query.options(joinedload(Purchase.supplier), selectinload(Purchase.items))
+
+
+def _purchase_details(query: Query) -> Query:
+    """Compras com fornecedor, comprador e itens com produto"""
+    from src.models import Purchase, PurchaseItem
+    return query.options(
+        joinedload(Purchase.supplier),
+        joinedload(Purchase.user),
+        selectinload(Purchase.items).joinedload(PurchaseItem.product)
+    )
+
+
+def _purchase_rows(query: Query) -> Query:
+    """Projeção plana da listagem de compras (com quantidade de itens)"""
+    from src.models import Purchase, PurchaseItem, Supplier
+    
+    item_count = select(func.count(PurchaseItem.id)).where(
+        PurchaseItem.purchase_id == Purchase.id
+    ).correlate(Purchase).scalar_subquery()
+    
+    return query.outerjoin(Purchase.supplier).with_entities(
+        Purchase.id,
+        Purchase.purchase_number,
+        Purchase.purchase_date,
+        Purchase.total_amount,
+        Supplier.name.label('supplier_name'),
+        item_count.label('item_count')
+    )
+
+
+def _expense_details(query: Query) -> Query:
+    """Despesas com fornecedor e usuário"""
+    from src.models import Expense
+    return query.options(joinedload(Expense.supplier), joinedload(Expense.user))
+
+
+def _expense_rows(query: Query) -> Query:
+    """Projeção plana da listagem de despesas"""
+    from src.models import Expense, Supplier
+    return query.outerjoin(Expense.supplier).with_entities(
+        Expense.id,
+        Expense.expense_number,
+        Expense.expense_date,
+        Expense.expense_type,
+        Expense.description,
+        Expense.amount,
+        Expense.due_date,
+        Expense.paid,
+        Expense.paid_date,
+        Supplier.name.label('supplier_name')
+    )
+
+
+SALE_PROFILES = {
+    'list': _sale_list,
+    'details': _sale_details,
+    'rows': _sale_rows,
+}
+
+PRODUCT_PROFILES = {
+    'list': _product_list,
+    'rows': _product_rows,
+}
+
+PURCHASE_PROFILES = {
+    'list': _purchase_list,
+    'details': _purchase_details,
+    'rows': _purchase_rows,
+}
+
+EXPENSE_PROFILES = {
+    'details': _expense_details,
+    'rows': _expense_rows,
+}
+
+
+def apply_load_profile(query: Query, profiles: dict, load=None) -> Query:
+    """
+    Aplica um perfil de carregamento à query
+    
+    Args:
+        query: Query da listagem (já filtrada e ordenada)
+        profiles: Perfis disponíveis para a entidade (ex.: SALE_PROFILES)
+        load: None (carregamento lazy padrão), nome do perfil ou uma
+            sequência de opções de loader (ex.: [joinedload(Sale.user)])
+    
+    Returns:
+        Query com o perfil aplicado
+    """
+    if load is None:
+        return query
+    
+    if isinstance(load, str):
+        if load not in profiles:
+            raise ValueError(f"Perfil de carregamento desconhecido: {load}")
+        return profiles[load](query)
+    
+    return query.options(*load)
@@ -0,0 +1,156 @@
+"""
+Controller de Numeração
+Gera números de documentos (vendas, despesas, compras) a partir de contadores
+"""
+import os
+import threading
+from datetime import datetime
+from typing import Tuple
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+
+class NumberingController:
+    """Controlador de numeração de documentos"""
+    
+    # Blocos reservados por este terminal: (banco, prefixo, dia) -> [próximo, último]
+    _blocks = {}
+    _lock = threading.Lock()
+    
+    def __init__(self, block_size: int = None):
+        self.block_size = block_size or int(os.getenv("NUMBERING_BLOCK_SIZE", "1"))
+    
+    @staticmethod
+    def format_number(prefix: str, day: str, value: int) -> str:
+        """Formata o número do documento (ex.: VD202610180001)"""
+        # Mínimo de 4 dígitos; acima de 9999 o sufixo simplesmente cresce
+        return f"{prefix}{day}{value:04d}"
+    
+    def next_number(self, db: Session, prefix: str, number_column=None) -> str:
+        """
+        Retorna o próximo número de documento do dia para o prefixo
+        
+        Com block_size = 1 o contador é incrementado na transação do próprio
+        documento (UPDATE ... RETURNING atômico). Com block_size > 1 o
+        terminal consome um bloco reservado previamente.
+        
+        Args:
+            prefix: Prefixo do documento (VD, DP, CP)
+            number_column: Coluna do número (ex.: Sale.sale_number), usada
+                apenas para iniciar o contador a partir dos documentos já
+                existentes no dia
+        """
+        day = datetime.now().strftime("%Y%m%d")
+        
+        if self.block_size <= 1:
+            value = self._increment(db, prefix, day, 1, number_column)
+            return self.format_number(prefix, day, value)
+        
+        key = (str(db.get_bind().url), prefix, day)
+        with self._lock:
+            block = self._blocks.get(key)
+            if not block or block[0] > block[1]:
+                first, last = self.reserve_block(db, prefix, self.block_size, day, number_column)
+                block = self._blocks[key] = [first, last]
+            
+            value = block[0]
+            block[0] += 1
+        
+        return self.format_number(prefix, day, value)
+    
+    def reserve_block(self, db: Session, prefix: str, size: int, day: str = None,
+                      number_column=None) -> Tuple[int, int]:
+        """
+        Reserva um bloco de números para este terminal
+        
+        A reserva usa uma sessão própria e é confirmada imediatamente, para
+        não segurar o contador durante a transação do documento. Números não
+        utilizados de um bloco ficam como lacunas na sequência.
+        
+        Returns:
+            Tupla (primeiro, último) do bloco reservado
+        """
+        day = day or datetime.now().strftime("%Y%m%d")
+        
+        reservation = Session(bind=db.get_bind())
+        try:
+            last = self._increment(reservation, prefix, day, size, number_column)
+            reservation.commit()
+        except Exception:
+            reservation.rollback()
+            raise
+        finally:
+            reservation.close()
+        
+        return last - size + 1, last
+    
+    def _increment(self, db: Session, prefix: str, day: str, size: int, number_column) -> int:
+        """Incrementa o contador e retorna o novo último valor"""
+        value = self._update_counter(db, prefix, day, size)
+        if value is None:
+            # Primeiro documento do dia: criar o contador e repetir o UPDATE
+            seed = self._current_max(db, prefix, day, number_column)
+            self._insert_counter(db, prefix, day, seed)
+            value = self._update_counter(db, prefix, day, size)
+        
+        return value
+    
+    def _update_counter(self, db: Session, prefix: str, day: str, size: int):
+        """UPDATE ... RETURNING do contador (None se ainda não existir)"""
+        from src.models import DocumentCounter
+        
+        stmt = update(DocumentCounter).where(
+            DocumentCounter.prefix == prefix,
+            DocumentCounter.day == day
+        ).values(
+            last_value=DocumentCounter.last_value + size,
+            updated_at=datetime.now()
+        )
+        
+        if db.get_bind().dialect.update_returning:
+            return db.execute(stmt.returning(DocumentCounter.last_value)).scalar()
+        
+        # Bancos sem RETURNING: o UPDATE já bloqueou a linha na transação
+        if db.execute(stmt).rowcount == 0:
+            return None
+        return db.query(DocumentCounter.last_value).filter(
+            DocumentCounter.prefix == prefix,
+            DocumentCounter.day == day
+        ).scalar()
+    
+    def _insert_counter(self, db: Session, prefix: str, day: str, value: int):
+        """Cria o contador do dia, ignorando se outro terminal já o criou"""
+        from src.models import DocumentCounter
+        
+        dialect = db.get_bind().dialect.name
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        elif dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy import insert
+        
+        stmt = insert(DocumentCounter).values(
+            prefix=prefix,
+            day=day,
+            last_value=value,
+            updated_at=datetime.now()
+        )
+        if hasattr(stmt, "on_conflict_do_nothing"):
+            stmt = stmt.on_conflict_do_nothing()
+        
+        db.execute(stmt)
+    
+    def _current_max(self, db: Session, prefix: str, day: str, number_column) -> int:
+        """Maior sufixo já usado no dia (bancos anteriores aos contadores)"""
+        if number_column is None:
+            return 0
+        
+        start = f"{prefix}{day}"
+        last_number = db.query(number_column).filter(
+            number_column >= start,
+            number_column < f"{prefix}{int(day) + 1}"
+        ).order_by(func.length(number_column).desc(), number_column.desc()).limit(1).scalar()
+        
+        if not last_number:
+            return 0
+        return int(last_number[len(start):])
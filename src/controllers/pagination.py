@@ -0,0 +1,66 @@
+"""
+Paginação por Cursor
+Paginação keyset (chave de ordenação, id) para as listagens do sistema
+"""
+from typing import List, Optional, Tuple
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query
+
+# Tamanho padrão de página das listagens
+DEFAULT_PAGE_SIZE = 50
+
+
+def keyset_page(query: Query, sort_column, id_column, cursor: Optional[Tuple] = None,
+                limit: int = DEFAULT_PAGE_SIZE, offset: int = None,
+                descending: bool = True) -> Tuple[List, Optional[Tuple]]:
+    """
+    Retorna uma página ordenada por (chave, id)
+    
+    O cursor é a chave (chave, id) da última linha da página anterior; a
+    consulta continua a partir dela pelo índice da chave, com LIMIT no SQL,
+    então o custo é proporcional à página e não ao histórico.
+    
+    Args:
+        query: Query já filtrada e sem ORDER BY (objetos ou projeção)
+        sort_column: Coluna de ordenação (ex.: Sale.sale_date)
+        id_column: Chave primária usada como desempate (ex.: Sale.id)
+        cursor: (chave, id) da última linha da página anterior; None = primeira
+        limit: Quantidade de linhas por página
+        offset: Posição inicial quando não há cursor (saltos da grade virtual);
+            usa OFFSET no SQL, então só deve ser usado para saltos pontuais
+        descending: Ordem decrescente (padrão) ou crescente
+    
+    Returns:
+        Tupla (linhas, próximo cursor); o cursor é None na última página
+    """
+    if cursor:
+        last_key, last_id = cursor
+        # A comparação redundante "chave <= última" permite a busca por faixa no índice
+        if descending:
+            query = query.filter(and_(
+                sort_column <= last_key,
+                or_(sort_column < last_key, id_column < last_id)
+            ))
+        else:
+            query = query.filter(and_(
+                sort_column >= last_key,
+                or_(sort_column > last_key, id_column > last_id)
+            ))
+    
+    if descending:
+        query = query.order_by(sort_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(sort_column.asc(), id_column.asc())
+    
+    if offset and not cursor:
+        query = query.offset(offset)
+    
+    # Uma linha a mais indica se existe próxima página
+    rows = query.limit(limit + 1).all()
+    
+    if len(rows) <= limit:
+        return rows, None
+    
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, (getattr(last, sort_column.key), getattr(last, id_column.key))
@@ -0,0 +1,207 @@
+"""
+Catálogo de Produtos em Memória
+Cache do processo com os produtos ativos, para a venda consultar sem ir ao banco
+"""
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from sqlalchemy.orm import Session
+from src.controllers.events import StockChanged, bus
+
+
+@dataclass
+class CatalogProduct:
+    """Dados de um produto usados na venda"""
+    id: int
+    code: str
+    barcode: Optional[str]
+    name: str
+    unit: str
+    sale_price: float
+    stock_quantity: float
+    min_stock: float
+    
+    @property
+    def label(self) -> str:
+        """Texto exibido nas listas (ex.: P001 - Açúcar)"""
+        return f"{self.code} - {self.name}"
+
+
+def normalize_text(text: str) -> str:
+    """Remove acentos e normaliza maiúsculas/minúsculas"""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def _words(text: str) -> List[str]:
+    """Palavras normalizadas (mesma separação da busca FTS)"""
+    return re.findall(r"\w+", normalize_text(text))
+
+
+class ProductCatalog:
+    """
+    Catálogo dos produtos ativos
+    
+    Índices em dicionário por ID, código e código de barras e uma lista
+    ordenada de palavras do nome para busca por prefixo (bisect). É
+    carregado no login e atualizado pelo ProductController, produto a
+    produto (só as palavras do produto alterado entram ou saem da lista);
+    estoques chegam pelo evento StockChanged, publicado apenas após o commit.
+    """
+    
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.clear()
+    
+    def clear(self):
+        """Esvazia o catálogo (o próximo ensure_warm recarrega)"""
+        with self._lock:
+            self._by_id: Dict[int, CatalogProduct] = {}
+            self._by_code: Dict[str, int] = {}
+            self._by_barcode: Dict[str, int] = {}
+            self._name_index = []  # (palavra normalizada, id) ordenado
+            self.is_warm = False
+    
+    def warm(self, db: Session):
+        """Carrega todos os produtos ativos em uma única consulta"""
+        from src.models import Product
+        
+        rows = db.query(
+            Product.id,
+            Product.code,
+            Product.barcode,
+            Product.name,
+            Product.unit,
+            Product.sale_price,
+            Product.stock_quantity,
+            Product.min_stock
+        ).filter(Product.is_active == True).all()
+        
+        with self._lock:
+            self.clear()
+            for row in rows:
+                self._add(CatalogProduct(**row._asdict()))
+            self._name_index = sorted(
+                (word, product.id)
+                for product in self._by_id.values()
+                for word in set(_words(product.name))
+            )
+            self.is_warm = True
+    
+    def ensure_warm(self, db: Session):
+        """Carrega o catálogo se ainda não foi carregado"""
+        if not self.is_warm:
+            self.warm(db)
+    
+    def get(self, product_id: int) -> Optional[CatalogProduct]:
+        """Busca um produto por ID"""
+        return self._by_id.get(product_id)
+    
+    def get_by_code(self, code: str) -> Optional[CatalogProduct]:
+        """Busca um produto pelo código"""
+        return self._by_id.get(self._by_code.get(code))
+    
+    def get_by_barcode(self, barcode: str) -> Optional[CatalogProduct]:
+        """Busca um produto pelo código de barras"""
+        return self._by_id.get(self._by_barcode.get(barcode))
+    
+    def lookup(self, text: str) -> Optional[CatalogProduct]:
+        """Busca exata por código ou código de barras (ex.: leitor de código)"""
+        text = text.strip()
+        return self.get_by_code(text) or self.get_by_barcode(text)
+    
+    def list_products(self) -> List[CatalogProduct]:
+        """Lista os produtos do catálogo ordenados por código"""
+        with self._lock:
+            return sorted(self._by_id.values(), key=lambda product: product.code)
+    
+    def search_prefix(self, text: str, limit: int = 50) -> List[CatalogProduct]:
+        """
+        Busca produtos cujo nome tenha palavras começando pelos termos
+        
+        "acu cris" encontra "Açúcar Cristal". Nomes que começam pelo
+        primeiro termo aparecem antes.
+        """
+        words = _words(text)
+        if not words:
+            return []
+        
+        with self._lock:
+            index = self._name_index
+            position = bisect_left(index, (words[0],))
+            candidates = {}
+            while position < len(index) and index[position][0].startswith(words[0]):
+                product_id = index[position][1]
+                candidates[product_id] = self._by_id[product_id]
+                position += 1
+        
+        results = []
+        for product in candidates.values():
+            name_words = _words(product.name)
+            if all(any(name_word.startswith(word) for name_word in name_words) for word in words[1:]):
+                results.append(product)
+        
+        results.sort(key=lambda product: (
+            not normalize_text(product.name).startswith(words[0]), product.name
+        ))
+        return results[:limit]
+    
+    def upsert(self, product):
+        """Inclui ou atualiza um produto (remove se inativo)"""
+        with self._lock:
+            if not self.is_warm:
+                return  # Será carregado completo no próximo ensure_warm
+            
+            self.remove(product.id)
+            if product.is_active:
+                cached = CatalogProduct(
+                    id=product.id,
+                    code=product.code,
+                    barcode=product.barcode,
+                    name=product.name,
+                    unit=product.unit,
+                    sale_price=product.sale_price,
+                    stock_quantity=product.stock_quantity or 0.0,
+                    min_stock=product.min_stock or 0.0
+                )
+                self._add(cached)
+                for word in set(_words(cached.name)):
+                    insort(self._name_index, (word, cached.id))
+    
+    def remove(self, product_id: int):
+        """Remove um produto do catálogo"""
+        with self._lock:
+            product = self._by_id.pop(product_id, None)
+            if not product:
+                return
+            
+            self._by_code.pop(product.code, None)
+            if product.barcode:
+                self._by_barcode.pop(product.barcode, None)
+            for word in set(_words(product.name)):
+                position = bisect_left(self._name_index, (word, product_id))
+                if position < len(self._name_index) and self._name_index[position] == (word, product_id):
+                    del self._name_index[position]
+    
+    def apply_stock(self, stock_levels: Dict[int, float]):
+        """Atualiza os estoques dos produtos do catálogo"""
+        with self._lock:
+            for product_id, stock in stock_levels.items():
+                product = self._by_id.get(product_id)
+                if product:
+                    product.stock_quantity = stock
+    
+    def _add(self, product: CatalogProduct):
+        self._by_id[product.id] = product
+        self._by_code[product.code] = product.id
+        if product.barcode:
+            self._by_barcode[product.barcode] = product.id
+
+
+# Catálogo compartilhado pelo processo
+catalog = ProductCatalog()
+
+bus.subscribe(StockChanged, lambda changed: catalog.apply_stock(changed.stock_levels))
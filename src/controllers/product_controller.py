@@ -5,6 +5,21 @@ Gerencia produtos e estoque
 from datetime import datetime
 from typing import Optional, List
 from sqlalchemy.orm import Session
+from src.controllers.events import StockChanged, bus
+from src.controllers.product_catalog import catalog
+
+
+def weighted_average_cost(stock: float, average_cost: float, quantity: float, unit_cost: float) -> float:
+    """
+    Novo custo médio após uma entrada de `quantity` unidades a `unit_cost`
+    
+    Com o estoque zerado ou negativo o custo anterior não tem mais peso:
+    o custo médio passa a ser o da entrada.
+    """
+    if stock <= 0:
+        return unit_cost
+    return (stock * average_cost + quantity * unit_cost) / (stock + quantity)
+
 
 class ProductController:
     """Controlador de produtos"""
@@ -19,10 +34,13 @@ class ProductController:
             if existing:
                 return None
             
+            # Sem movimentações ainda: o custo médio parte do preço de custo
+            kwargs.setdefault('average_cost', kwargs.get('cost_price') or 0.0)
             product = Product(**kwargs)
             db.add(product)
             db.commit()
             db.refresh(product)
+            catalog.upsert(product)
             return product
         except Exception as e:
             db.rollback()
@@ -42,8 +60,13 @@ class ProductController:
                 if hasattr(product, key):
                     setattr(product, key, value)
             
+            # Produto que nunca teve custo: o preço de custo informado passa a valer
+            if kwargs.get('cost_price') and not product.average_cost:
+                product.average_cost = kwargs['cost_price']
+            
             product.updated_at = datetime.now()
             db.commit()
+            catalog.upsert(product)
             return True
         except Exception as e:
             db.rollback()
@@ -61,6 +84,7 @@ class ProductController:
             
             product.is_active = False
             db.commit()
+            catalog.remove(product_id)
             return True
         except Exception as e:
             db.rollback()
@@ -71,70 +95,317 @@ class ProductController:
         from src.models import Product
         return db.query(Product).filter(Product.id == product_id).first()
     
+    def get_product_rows(self, db: Session, product_ids) -> List:
+        """Linhas da listagem (projeção 'rows') dos produtos informados"""
+        from src.models import Product
+        from src.controllers.load_profiles import apply_load_profile, PRODUCT_PROFILES
+        
+        query = db.query(Product).filter(Product.id.in_(list(product_ids)))
+        return apply_load_profile(query, PRODUCT_PROFILES, "rows").all()
+    
     def get_product_by_code(self, db: Session, code: str) -> Optional[object]:
         """Busca um produto por código"""
         from src.models import Product
         return db.query(Product).filter(Product.code == code).first()
     
-    def list_products(self, db: Session, active_only: bool = True) -> List:
-        """Lista todos os produtos"""
+    def list_products(self, db: Session, active_only: bool = True, load=None) -> List:
+        """
+        Lista todos os produtos
+        
+        Args:
+            load: Perfil de carregamento ('list', 'rows') ou opções de
+                loader; None mantém o carregamento lazy
+        """
         from src.models import Product
+        from src.controllers.load_profiles import apply_load_profile, PRODUCT_PROFILES
         
         query = db.query(Product)
         if active_only:
             query = query.filter(Product.is_active == True)
         
+        return apply_load_profile(query, PRODUCT_PROFILES, load).all()
+    
+    def iter_products(self, db: Session, active_only: bool = True, yield_per: int = 1000):
+        """
+        Percorre os produtos por código, buscando yield_per linhas por vez
+        (projeção 'rows'); para relatórios e exportações
+        """
+        from src.models import Product
+        from src.controllers.load_profiles import apply_load_profile, PRODUCT_PROFILES
+        
+        query = self._filter_products(db.query(Product), active_only, None)
+        query = query.order_by(Product.code, Product.id)
+        return apply_load_profile(query, PRODUCT_PROFILES, "rows").yield_per(yield_per)
+    
+    def search_products(self, db: Session, search_term: str, load=None,
+                        limit: int = None) -> List:
+        """
+        Busca produtos ativos por código, nome ou descrição
+        
+        No SQLite usa o índice FTS5 (prefixos, sem distinção de acentos e
+        maiúsculas), mais trechos do código, e ordena por relevância; nos
+        demais bancos, ou sem índice, busca por LIKE em nome e código.
+        
+        Args:
+            load: Perfil de carregamento ('list', 'rows') ou opções de loader
+            limit: Quantidade máxima de resultados (opcional)
+        """
+        from src.models import Product
+        from src.controllers.load_profiles import apply_load_profile, PRODUCT_PROFILES
+        
+        query = db.query(Product).filter(Product.is_active == True)
+        
+        ranking = self._search_ranking(db, search_term)
+        if ranking is not None:
+            query = query.join(ranking, ranking.c.product_id == Product.id).order_by(
+                ranking.c.rank, Product.name
+            )
+        else:
+            search = f"%{search_term}%"
+            query = query.filter((Product.name.like(search)) | (Product.code.like(search)))
+        
+        query = apply_load_profile(query, PRODUCT_PROFILES, load)
+        if limit:
+            query = query.limit(limit)
+        
         return query.all()
     
-    def search_products(self, db: Session, search_term: str) -> List:
-        """Busca produtos por nome ou código"""
+    def list_products_page(self, db: Session, cursor: tuple = None, limit: int = None,
+                           active_only: bool = True, search: str = None, load="rows",
+                           offset: int = None) -> tuple:
+        """
+        Lista uma página de produtos ordenada por código ou, com busca no
+        índice FTS, por relevância
+        
+        Args:
+            cursor: (code, id) do último produto da página anterior; na
+                busca por relevância, (rank, id)
+            limit: Produtos por página (padrão DEFAULT_PAGE_SIZE)
+            search: Termo de busca por nome, código ou descrição (opcional)
+            load: Perfil de carregamento (padrão: projeção 'rows'; na busca
+                por relevância cada linha traz também a coluna rank)
+            offset: Posição inicial quando não há cursor (saltos de rolagem)
+        
+        Returns:
+            Tupla (produtos, próximo cursor ou None)
+        """
         from src.models import Product
+        from src.controllers.load_profiles import apply_load_profile, PRODUCT_PROFILES
+        from src.controllers.pagination import keyset_page, DEFAULT_PAGE_SIZE
         
-        search = f"%{search_term}%"
-        return db.query(Product).filter(
-            (Product.name.like(search)) | (Product.code.like(search))
-        ).filter(Product.is_active == True).all()
+        ranking = self._search_ranking(db, search) if search else None
+        query = self._filter_products(db.query(Product), active_only, search, ranking)
+        query = apply_load_profile(query, PRODUCT_PROFILES, load)
+        
+        if ranking is not None:
+            return keyset_page(query.add_columns(ranking.c.rank), ranking.c.rank, Product.id,
+                               cursor, limit or DEFAULT_PAGE_SIZE, offset, descending=False)
+        return keyset_page(query, Product.code, Product.id, cursor,
+                           limit or DEFAULT_PAGE_SIZE, offset, descending=False)
+    
+    def count_products(self, db: Session, active_only: bool = True, search: str = None) -> int:
+        """Conta os produtos com os mesmos filtros da listagem"""
+        from src.models import Product
+        from sqlalchemy import func
+        
+        ranking = self._search_ranking(db, search) if search else None
+        query = db.query(func.count(Product.id)).select_from(Product)
+        return self._filter_products(query, active_only, search, ranking).scalar()
+    
+    def _filter_products(self, query, active_only, search, ranking=None):
+        """Aplica os filtros comuns das listagens de produtos (ranking: ver _search_ranking)"""
+        from src.models import Product
+        
+        if active_only:
+            query = query.filter(Product.is_active == True)
+        if ranking is not None:
+            query = query.join(ranking, ranking.c.product_id == Product.id)
+        elif search:
+            term = f"%{search}%"
+            query = query.filter((Product.name.like(term)) | (Product.code.like(term)))
+        
+        return query
+    
+    def _search_ranking(self, db: Session, search_term: str):
+        """
+        Subconsulta (product_id, rank) da busca: prefixos no índice FTS mais
+        trecho do código; None se o banco não tem índice ou o termo não tem
+        palavras (a busca fica por LIKE)
+        """
+        from src.models.search_index import has_product_search, build_match_query, search_ranking
+        
+        if not has_product_search(db.get_bind()):
+            return None
+        match_query = build_match_query(search_term)
+        if not match_query:
+            return None
+        return search_ranking(match_query, search_term.strip())
     
     def update_stock(self, db: Session, product_id: int, quantity: float, 
                      movement_type: str, reason: str = None, 
                      reference_id: int = None, reference_type: str = None) -> bool:
         """Atualiza o estoque de um produto"""
+        try:
+            self.apply_stock_movements(
+                db,
+                [{'product_id': product_id, 'quantity': quantity}],
+                movement_type,
+                reason,
+                reference_id,
+                reference_type
+            )
+            db.commit()
+            return True
+        except Exception as e:
+            db.rollback()
+            print(f"Erro ao atualizar estoque: {e}")
+            return False
+    
+    def apply_stock_movements(self, db: Session, items: List[dict], movement_type: str,
+                              reason: str = None, reference_id: int = None,
+                              reference_type: str = None) -> dict:
+        """
+        Aplica as movimentações de estoque de um documento inteiro
+        
+        Carrega os produtos em uma única consulta, aplica as quantidades,
+        atualiza o custo médio ponderado e insere todas as StockMovement com
+        executemany. Não faz commit: o chamador decide a transação (uma
+        venda/compra = um commit).
+        
+        Entradas com 'unit_cost' (compras) recalculam o custo médio; as
+        demais movimentações são registradas pelo custo médio atual, que não
+        muda (saídas = custo das mercadorias vendidas).
+        
+        Args:
+            items: Lista de dicts com 'product_id', 'quantity' e,
+                opcionalmente, 'unit_cost'
+            movement_type: entrada, saida ou ajuste
+        
+        Returns:
+            Dict {product_id: novo estoque}
+        
+        Raises:
+            ValueError: Se algum produto não existir
+        """
         from src.models import Product, StockMovement
+        from sqlalchemy import insert
         
-        try:
-            product = db.query(Product).filter(Product.id == product_id).first()
-            if not product:
-                return False
-            
-            previous_stock = product.stock_quantity
+        if not items:
+            return {}
+        
+        product_ids = {item['product_id'] for item in items}
+        products = {
+            product.id: product
+            for product in db.query(Product).filter(Product.id.in_(product_ids))
+        }
+        
+        missing = product_ids - products.keys()
+        if missing:
+            raise ValueError(f"Produto(s) não encontrado(s): {sorted(missing)}")
+        
+        movements = []
+        for item in items:
+            product = products[item['product_id']]
+            quantity = item['quantity']
+            previous_stock = product.stock_quantity or 0.0
+            unit_cost = item.get('unit_cost')
             
             # Atualizar quantidade conforme o tipo de movimentação
             if movement_type == "entrada" or movement_type == "ajuste":
-                product.stock_quantity += quantity
+                new_stock = previous_stock + quantity
             elif movement_type == "saida":
-                product.stock_quantity -= quantity
+                new_stock = previous_stock - quantity
+            else:
+                new_stock = previous_stock
             
-            new_stock = product.stock_quantity
+            if unit_cost is not None and movement_type != "saida" and quantity > 0:
+                product.average_cost = weighted_average_cost(
+                    previous_stock, product.average_cost or 0.0, quantity, unit_cost
+                )
+            else:
+                unit_cost = product.average_cost or 0.0
             
-            # Registrar movimentação
-            movement = StockMovement(
-                product_id=product_id,
-                movement_type=movement_type,
-                quantity=quantity,
-                reason=reason,
-                reference_id=reference_id,
-                reference_type=reference_type,
-                previous_stock=previous_stock,
-                new_stock=new_stock
-            )
+            product.stock_quantity = new_stock
+            movements.append({
+                'product_id': product.id,
+                'movement_type': movement_type,
+                'quantity': quantity,
+                'unit_cost': unit_cost,
+                'reason': reason,
+                'reference_id': reference_id,
+                'reference_type': reference_type,
+                'previous_stock': previous_stock,
+                'new_stock': new_stock
+            })
+        
+        db.flush()
+        db.execute(insert(StockMovement), movements)
+        
+        # Catálogo em memória e telas recebem os novos estoques após o commit
+        stock_levels = {product_id: product.stock_quantity for product_id, product in products.items()}
+        bus.publish_after_commit(db, StockChanged(stock_levels))
+        
+        return stock_levels
+    
+    def rebuild_average_costs(self, db: Session, product_ids: List[int] = None) -> int:
+        """
+        Recalcula o custo médio repassando o histórico de movimentações
+        (carga inicial/correção)
+        
+        Cada produto parte do preço de custo cadastrado; as entradas de
+        compra recalculam o custo médio e as demais movimentações são
+        regravadas com o custo médio da época.
+        
+        Returns:
+            Quantidade de produtos recalculados
+        """
+        from sqlalchemy import update
+        from src.models import Product, StockMovement
+        
+        try:
+            query = db.query(Product.id, Product.cost_price)
+            if product_ids:
+                query = query.filter(Product.id.in_(product_ids))
+            costs = {product_id: cost_price or 0.0 for product_id, cost_price in query}
+            
+            movements = db.query(
+                StockMovement.id,
+                StockMovement.product_id,
+                StockMovement.movement_type,
+                StockMovement.reference_type,
+                StockMovement.quantity,
+                StockMovement.unit_cost,
+                StockMovement.previous_stock
+            ).order_by(StockMovement.product_id, StockMovement.created_at, StockMovement.id)
+            if product_ids:
+                movements = movements.filter(StockMovement.product_id.in_(product_ids))
+            
+            movement_costs = []
+            for movement in movements.yield_per(1000):
+                cost = costs.get(movement.product_id)
+                if cost is None:
+                    continue  # Produto fora da seleção
+                
+                if (movement.movement_type == "entrada" and movement.reference_type == "purchase"
+                        and movement.unit_cost is not None and movement.quantity > 0):
+                    costs[movement.product_id] = weighted_average_cost(
+                        movement.previous_stock, cost, movement.quantity, movement.unit_cost
+                    )
+                elif movement.unit_cost != cost:
+                    movement_costs.append({'id': movement.id, 'unit_cost': cost})
             
-            db.add(movement)
+            if movement_costs:
+                db.execute(update(StockMovement), movement_costs)
+            if costs:
+                db.execute(update(Product), [
+                    {'id': product_id, 'average_cost': cost} for product_id, cost in costs.items()
+                ])
             db.commit()
-            return True
+            return len(costs)
         except Exception as e:
             db.rollback()
-            print(f"Erro ao atualizar estoque: {e}")
-            return False
+            print(f"Erro ao recalcular custo médio: {e}")
+            raise
     
     def get_low_stock_products(self, db: Session) -> List:
         """Retorna produtos com estoque baixo"""
@@ -145,6 +416,37 @@ class ProductController:
             Product.is_active == True
         ).all()
     
+    def get_stock_summary(self, db: Session, active_only: bool = True) -> dict:
+        """
+        Totais do estoque em uma única consulta agregada
+        
+        Returns:
+            Dict com 'product_count', 'total_quantity', 'cost_value'
+            (quantidade x custo médio), 'stock_value' (quantidade x preço de
+            venda) e 'low_stock_count'
+        """
+        from sqlalchemy import case, func
+        from src.models import Product
+        
+        query = db.query(
+            func.count(Product.id),
+            func.coalesce(func.sum(Product.stock_quantity), 0),
+            func.coalesce(func.sum(Product.stock_quantity * Product.average_cost), 0),
+            func.coalesce(func.sum(Product.stock_quantity * Product.sale_price), 0),
+            func.coalesce(func.sum(case((Product.stock_quantity <= Product.min_stock, 1), else_=0)), 0)
+        )
+        if active_only:
+            query = query.filter(Product.is_active == True)
+        
+        product_count, total_quantity, cost_value, stock_value, low_stock_count = query.one()
+        return {
+            'product_count': product_count,
+            'total_quantity': float(total_quantity),
+            'cost_value': float(cost_value),
+            'stock_value': float(stock_value),
+            'low_stock_count': int(low_stock_count)
+        }
+    
     def get_stock_movements(self, db: Session, product_id: int = None) -> List:
         """Lista movimentações de estoque"""
         from src.models import StockMovement
@@ -12,25 +12,18 @@ class PurchaseController:
     def generate_purchase_number(self, db: Session) -> str:
         """Gera um número único de compra"""
         from src.models import Purchase
+        from src.controllers.numbering_controller import NumberingController
         
-        today = datetime.now().strftime("%Y%m%d")
-        last_purchase = db.query(Purchase).filter(
-            Purchase.purchase_number.like(f"CP{today}%")
-        ).order_by(Purchase.id.desc()).first()
-        
-        if last_purchase:
-            last_number = int(last_purchase.purchase_number[-4:])
-            new_number = last_number + 1
-        else:
-            new_number = 1
-        
-        return f"CP{today}{new_number:04d}"
+        return NumberingController().next_number(db, "CP", Purchase.purchase_number)
     
     def create_purchase(self, db: Session, user_id: int, supplier_id: int,
                        items: List[dict], notes: str = None) -> Optional[object]:
         """Cria uma nova compra"""
         from src.models import Purchase, PurchaseItem
         from src.controllers.product_controller import ProductController
+        from src.controllers.rollup_controller import RollupController
+        from src.controllers.data_version_controller import DataVersionController
+        from sqlalchemy import insert
         
         try:
             # Calcular total
@@ -51,31 +44,34 @@ class PurchaseController:
             db.add(purchase)
             db.flush()  # Para obter o ID da compra
             
-            # Adicionar itens e atualizar estoque
-            product_controller = ProductController()
+            # Adicionar itens (executemany) e dar entrada no estoque em lote
+            # (executemany com lista vazia viraria INSERT ... DEFAULT VALUES)
+            if items:
+                db.execute(insert(PurchaseItem), [
+                    {
+                        'purchase_id': purchase.id,
+                        'product_id': item_data['product_id'],
+                        'quantity': item_data['quantity'],
+                        'unit_price': item_data['unit_price'],
+                        'subtotal': item_data['quantity'] * item_data['unit_price']
+                    }
+                    for item_data in items
+                ])
+            
+            # O preço de compra é o custo da entrada (atualiza o custo médio)
+            ProductController().apply_stock_movements(
+                db,
+                [{**item_data, 'unit_cost': item_data['unit_price']} for item_data in items],
+                "entrada",
+                f"Compra {purchase_number}",
+                purchase.id,
+                "purchase"
+            )
             
-            for item_data in items:
-                # Criar item de compra
-                item = PurchaseItem(
-                    purchase_id=purchase.id,
-                    product_id=item_data['product_id'],
-                    quantity=item_data['quantity'],
-                    unit_price=item_data['unit_price'],
-                    subtotal=item_data['quantity'] * item_data['unit_price']
-                )
-                db.add(item)
-                
-                # Atualizar estoque (entrada)
-                product_controller.update_stock(
-                    db,
-                    item_data['product_id'],
-                    item_data['quantity'],
-                    "entrada",
-                    f"Compra {purchase_number}",
-                    purchase.id,
-                    "purchase"
-                )
+            RollupController().record_purchase(db, purchase)
+            DataVersionController().bump(db, "purchases", purchase.purchase_date)
             
+            # Um único commit para compra, itens, estoque e consolidado
             db.commit()
             db.refresh(purchase)
             return purchase
@@ -84,46 +80,103 @@ class PurchaseController:
             print(f"Erro ao criar compra: {e}")
             return None
     
-    def get_purchase(self, db: Session, purchase_id: int) -> Optional[object]:
-        """Busca uma compra por ID"""
+    def get_purchase(self, db: Session, purchase_id: int, load=None) -> Optional[object]:
+        """Busca uma compra por ID (load: perfil de carregamento, ex.: 'details')"""
         from src.models import Purchase
-        return db.query(Purchase).filter(Purchase.id == purchase_id).first()
+        from src.controllers.load_profiles import apply_load_profile, PURCHASE_PROFILES
+        
+        query = db.query(Purchase).filter(Purchase.id == purchase_id)
+        return apply_load_profile(query, PURCHASE_PROFILES, load).first()
     
     def list_purchases(self, db: Session, start_date: datetime = None,
-                      end_date: datetime = None, supplier_id: int = None) -> List:
-        """Lista compras com filtros"""
+                      end_date: datetime = None, supplier_id: int = None,
+                      load=None) -> List:
+        """
+        Lista compras com filtros
+        
+        Args:
+            load: Perfil de carregamento ('list', 'details', 'rows') ou
+                opções de loader; None mantém o carregamento lazy
+        """
         from src.models import Purchase
+        from src.controllers.load_profiles import apply_load_profile, PURCHASE_PROFILES
         
-        query = db.query(Purchase)
+        query = self._filter_purchases(db.query(Purchase), start_date, end_date, supplier_id)
         
-        if start_date:
-            query = query.filter(Purchase.purchase_date >= start_date)
-        if end_date:
-            query = query.filter(Purchase.purchase_date <= end_date)
-        if supplier_id:
-            query = query.filter(Purchase.supplier_id == supplier_id)
+        query = query.order_by(Purchase.purchase_date.desc())
+        return apply_load_profile(query, PURCHASE_PROFILES, load).all()
+    
+    def iter_purchases(self, db: Session, start_date: datetime = None,
+                       end_date: datetime = None, supplier_id: int = None,
+                       yield_per: int = 1000):
+        """
+        Percorre as compras em ordem cronológica, buscando yield_per linhas
+        por vez (projeção 'rows'); para relatórios de períodos longos
+        """
+        from src.models import Purchase
+        from src.controllers.load_profiles import apply_load_profile, PURCHASE_PROFILES
         
-        return query.order_by(Purchase.purchase_date.desc()).all()
+        query = self._filter_purchases(db.query(Purchase), start_date, end_date, supplier_id)
+        query = query.order_by(Purchase.purchase_date, Purchase.id)
+        return apply_load_profile(query, PURCHASE_PROFILES, "rows").yield_per(yield_per)
     
-    def get_purchases_summary(self, db: Session, start_date: datetime = None,
-                             end_date: datetime = None) -> dict:
-        """Retorna resumo de compras"""
+    def list_purchases_page(self, db: Session, cursor: tuple = None, limit: int = None,
+                            start_date: datetime = None, end_date: datetime = None,
+                            supplier_id: int = None, load="rows",
+                            offset: int = None) -> tuple:
+        """
+        Lista uma página de compras (mais recentes primeiro)
+        
+        Args:
+            cursor: (purchase_date, id) da última compra da página anterior
+            limit: Compras por página (padrão DEFAULT_PAGE_SIZE)
+            load: Perfil de carregamento (padrão: projeção 'rows')
+            offset: Posição inicial quando não há cursor (saltos de rolagem)
+        
+        Returns:
+            Tupla (compras, próximo cursor ou None)
+        """
+        from src.models import Purchase
+        from src.controllers.load_profiles import apply_load_profile, PURCHASE_PROFILES
+        from src.controllers.pagination import keyset_page, DEFAULT_PAGE_SIZE
+        
+        query = self._filter_purchases(db.query(Purchase), start_date, end_date, supplier_id)
+        query = apply_load_profile(query, PURCHASE_PROFILES, load)
+        
+        return keyset_page(query, Purchase.purchase_date, Purchase.id, cursor,
+                           limit or DEFAULT_PAGE_SIZE, offset)
+    
+    def count_purchases(self, db: Session, start_date: datetime = None,
+                        end_date: datetime = None, supplier_id: int = None) -> int:
+        """Conta as compras com os mesmos filtros da listagem"""
         from src.models import Purchase
         from sqlalchemy import func
         
-        query = db.query(
-            func.count(Purchase.id).label('total_purchases'),
-            func.sum(Purchase.total_amount).label('total_amount')
-        )
+        query = self._filter_purchases(db.query(func.count(Purchase.id)), start_date,
+                                       end_date, supplier_id)
+        return query.scalar()
+    
+    def _filter_purchases(self, query, start_date, end_date, supplier_id):
+        """Aplica os filtros comuns das listagens de compras"""
+        from src.models import Purchase
         
         if start_date:
             query = query.filter(Purchase.purchase_date >= start_date)
         if end_date:
             query = query.filter(Purchase.purchase_date <= end_date)
+        if supplier_id:
+            query = query.filter(Purchase.supplier_id == supplier_id)
+        
+        return query
+    
+    def get_purchases_summary(self, db: Session, start_date: datetime = None,
+                             end_date: datetime = None) -> dict:
+        """Retorna resumo de compras (consolidado diário + pontas do período)"""
+        from src.controllers.rollup_controller import RollupController
         
-        result = query.first()
+        totals = RollupController().purchase_totals(db, start_date, end_date)[()]
         
         return {
-            'total_purchases': result.total_purchases or 0,
-            'total_amount': float(result.total_amount or 0)
+            'total_purchases': totals['purchase_count'],
+            'total_amount': float(totals['total_amount'])
         }
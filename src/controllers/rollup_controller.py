@@ -0,0 +1,412 @@
+"""
+Controller de Consolidados
+Totais diários de vendas, despesas e compras, mantidos na mesma transação
+dos documentos, para resumos e relatórios em O(dias) e não O(linhas)
+"""
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Tuple
+from sqlalchemy import Date, and_, delete, func, type_coerce, update
+from sqlalchemy.orm import Session
+
+# Diferença máxima aceita entre consolidado e documentos (somas em float)
+TOLERANCE = 0.005
+
+
+def split_period(start_date: datetime = None, end_date: datetime = None):
+    """
+    Separa o período em dias inteiros (consolidado) e pontas parciais (documentos)
+    
+    end_date é inclusivo, como nos filtros das listagens.
+    
+    Returns:
+        Tupla (dias, trechos): dias = (primeiro, último exclusivo) ou None se
+        não houver dia inteiro (None em um dos lados = sem limite); trechos =
+        lista de (início, fim exclusivo) a somar direto dos documentos
+    """
+    stop = end_date + timedelta(microseconds=1) if end_date else None
+    
+    first_day = None
+    if start_date is not None:
+        first_day = start_date.date()
+        if start_date.time() != time.min:
+            first_day += timedelta(days=1)
+    last_day = stop.date() if stop is not None else None
+    
+    if first_day is not None and last_day is not None and first_day >= last_day:
+        return None, [(start_date, stop)]
+    
+    raw_ranges = []
+    if start_date is not None and start_date.time() != time.min:
+        raw_ranges.append((start_date, datetime.combine(first_day, time.min)))
+    if stop is not None and stop.time() != time.min:
+        raw_ranges.append((datetime.combine(last_day, time.min), stop))
+    
+    return (first_day, last_day), raw_ranges
+
+
+def day_of(column, dialect_name: str):
+    """Expressão do dia (Date) de uma coluna DateTime"""
+    if dialect_name == "sqlite":
+        # date() devolve AAAA-MM-DD, o mesmo formato das colunas Date
+        return type_coerce(func.date(column), Date)
+    return func.cast(column, Date)
+
+
+class RollupController:
+    """Controlador dos consolidados diários"""
+    
+    # --- Manutenção incremental (sem commit: roda na transação do documento)
+    
+    def record_sale(self, db: Session, sale, sign: int = 1):
+        """Soma (ou subtrai, sign=-1) uma venda válida no consolidado do dia"""
+        from src.models import DailySalesSummary
+        
+        self._increment(db, DailySalesSummary, self._sale_keys(sale), {
+            'sales_count': sign,
+            'gross_amount': sign * (sale.total_amount or 0.0),
+            'discount_amount': sign * (sale.discount or 0.0),
+            'net_amount': sign * (sale.final_amount or 0.0)
+        })
+    
+    def record_sale_cancellation(self, db: Session, sale):
+        """Move uma venda de válida para cancelada no consolidado do dia"""
+        from src.models import DailySalesSummary
+        
+        self._increment(db, DailySalesSummary, self._sale_keys(sale), {
+            'sales_count': -1,
+            'gross_amount': -(sale.total_amount or 0.0),
+            'discount_amount': -(sale.discount or 0.0),
+            'net_amount': -(sale.final_amount or 0.0),
+            'cancelled_count': 1,
+            'cancelled_amount': sale.final_amount or 0.0
+        })
+    
+    def record_expense(self, db: Session, expense):
+        """Soma uma despesa no consolidado do dia da despesa"""
+        from src.models import DailyExpenseSummary
+        
+        self._increment(db, DailyExpenseSummary, self._expense_keys(expense), {
+            'expense_count': 1,
+            'total_amount': expense.amount,
+            'paid_amount': expense.amount if expense.paid else 0.0
+        })
+    
+    def record_expense_paid(self, db: Session, expense):
+        """Registra o pagamento de uma despesa (chamar apenas na transição para paga)"""
+        from src.models import DailyExpenseSummary
+        
+        self._increment(db, DailyExpenseSummary, self._expense_keys(expense), {
+            'paid_amount': expense.amount
+        })
+    
+    def record_purchase(self, db: Session, purchase):
+        """Soma uma compra no consolidado do dia"""
+        from src.models import DailyPurchaseSummary
+        
+        self._increment(db, DailyPurchaseSummary, {'day': purchase.purchase_date.date()}, {
+            'purchase_count': 1,
+            'total_amount': purchase.total_amount
+        })
+    
+    # --- Totais do período (consolidado nos dias inteiros + documentos nas pontas)
+    
+    def sales_totals(self, db: Session, start_date: datetime = None,
+                     end_date: datetime = None, group_by: Tuple[str, ...] = ()) -> Dict[tuple, dict]:
+        """
+        Totais de vendas do período
+        
+        Args:
+            group_by: Campos de agrupamento: 'day', 'payment_method', 'sale_type'
+        
+        Returns:
+            Dict {valores do agrupamento: {'sales_count', 'gross_amount',
+            'discount_amount', 'net_amount', 'cancelled_count', 'cancelled_amount'}}
+        """
+        return self._totals(db, self._sales_source(db), start_date, end_date, group_by)
+    
+    def expense_totals(self, db: Session, start_date: datetime = None,
+                       end_date: datetime = None, group_by: Tuple[str, ...] = ()) -> Dict[tuple, dict]:
+        """
+        Totais de despesas do período (pela data da despesa)
+        
+        Args:
+            group_by: Campos de agrupamento: 'day', 'expense_type'
+        
+        Returns:
+            Dict {valores do agrupamento: {'expense_count', 'total_amount', 'paid_amount'}}
+        """
+        return self._totals(db, self._expenses_source(db), start_date, end_date, group_by)
+    
+    def purchase_totals(self, db: Session, start_date: datetime = None,
+                        end_date: datetime = None, group_by: Tuple[str, ...] = ()) -> Dict[tuple, dict]:
+        """
+        Totais de compras do período
+        
+        Args:
+            group_by: Campos de agrupamento: 'day'
+        
+        Returns:
+            Dict {valores do agrupamento: {'purchase_count', 'total_amount'}}
+        """
+        return self._totals(db, self._purchases_source(db), start_date, end_date, group_by)
+    
+    # --- Reconstrução e conferência
+    
+    def rebuild(self, db: Session, start_date: date = None, end_date: date = None) -> int:
+        """
+        Recalcula os consolidados a partir dos documentos (carga inicial/correção)
+        
+        Args:
+            start_date, end_date: Dias (inclusivos) a recalcular; None = todos
+        
+        Returns:
+            Quantidade de linhas de consolidado gravadas
+        """
+        written = 0
+        
+        try:
+            for source in self._sources(db):
+                model = source['model']
+                stmt = delete(model)
+                if start_date:
+                    stmt = stmt.where(model.day >= start_date)
+                if end_date:
+                    stmt = stmt.where(model.day <= end_date)
+                db.execute(stmt)
+                
+                rows = self._document_rows(db, source, start_date, end_date)
+                if rows:
+                    db.execute(model.__table__.insert(), rows)
+                written += len(rows)
+            
+            db.commit()
+            return written
+        except Exception as e:
+            db.rollback()
+            print(f"Erro ao reconstruir consolidados: {e}")
+            raise
+    
+    def check_consistency(self, db: Session, start_date: date = None,
+                          end_date: date = None) -> List[str]:
+        """
+        Compara os consolidados com os documentos, dia a dia
+        
+        Returns:
+            Lista de divergências (vazia se estiver tudo consistente)
+        """
+        problems = []
+        
+        for source in self._sources(db):
+            model = source['model']
+            keys = self._key_names(model)
+            
+            expected = {
+                tuple(row[key] for key in keys): row
+                for row in self._document_rows(db, source, start_date, end_date)
+            }
+            
+            query = db.query(model)
+            if start_date:
+                query = query.filter(model.day >= start_date)
+            if end_date:
+                query = query.filter(model.day <= end_date)
+            stored = {tuple(getattr(row, key) for key in keys): row for row in query}
+            
+            for key in sorted(expected.keys() | stored.keys(), key=str):
+                for metric in source['metrics']:
+                    actual = getattr(stored[key], metric) if key in stored else 0
+                    wanted = expected[key][metric] if key in expected else 0
+                    if abs((actual or 0) - (wanted or 0)) > TOLERANCE:
+                        problems.append(
+                            f"{model.__tablename__} {key}: {metric} = {actual}, esperado {wanted}"
+                        )
+        
+        return problems
+    
+    # --- Auxiliares
+    
+    def _sources(self, db: Session) -> list:
+        return [self._sales_source(db), self._expenses_source(db), self._purchases_source(db)]
+    
+    def _sales_source(self, db: Session) -> dict:
+        """Consolidado de vendas e as expressões equivalentes sobre sales"""
+        from src.models import DailySalesSummary, Sale
+        
+        valid = Sale.is_cancelled == False
+        cancelled = Sale.is_cancelled == True
+        return {
+            'model': DailySalesSummary,
+            'date_column': Sale.sale_date,
+            'groups': {
+                'day': day_of(Sale.sale_date, db.get_bind().dialect.name),
+                'payment_method': func.coalesce(Sale.payment_method, ""),
+                'sale_type': func.coalesce(Sale.sale_type, "")
+            },
+            'metrics': {
+                'sales_count': func.count(Sale.id).filter(valid),
+                'gross_amount': func.sum(Sale.total_amount).filter(valid),
+                'discount_amount': func.sum(Sale.discount).filter(valid),
+                'net_amount': func.sum(Sale.final_amount).filter(valid),
+                'cancelled_count': func.count(Sale.id).filter(cancelled),
+                'cancelled_amount': func.sum(Sale.final_amount).filter(cancelled)
+            }
+        }
+    
+    def _expenses_source(self, db: Session) -> dict:
+        """Consolidado de despesas e as expressões equivalentes sobre expenses"""
+        from src.models import DailyExpenseSummary, Expense
+        
+        return {
+            'model': DailyExpenseSummary,
+            'date_column': Expense.expense_date,
+            'groups': {
+                'day': day_of(Expense.expense_date, db.get_bind().dialect.name),
+                'expense_type': Expense.expense_type
+            },
+            'metrics': {
+                'expense_count': func.count(Expense.id),
+                'total_amount': func.sum(Expense.amount),
+                'paid_amount': func.sum(Expense.amount).filter(Expense.paid == True)
+            }
+        }
+    
+    def _purchases_source(self, db: Session) -> dict:
+        """Consolidado de compras e as expressões equivalentes sobre purchases"""
+        from src.models import DailyPurchaseSummary, Purchase
+        
+        return {
+            'model': DailyPurchaseSummary,
+            'date_column': Purchase.purchase_date,
+            'groups': {'day': day_of(Purchase.purchase_date, db.get_bind().dialect.name)},
+            'metrics': {
+                'purchase_count': func.count(Purchase.id),
+                'total_amount': func.sum(Purchase.total_amount)
+            }
+        }
+    
+    @staticmethod
+    def _sale_keys(sale) -> dict:
+        return {
+            'day': sale.sale_date.date(),
+            'payment_method': sale.payment_method or "",
+            'sale_type': sale.sale_type or ""
+        }
+    
+    @staticmethod
+    def _expense_keys(expense) -> dict:
+        return {'day': expense.expense_date.date(), 'expense_type': expense.expense_type}
+    
+    @staticmethod
+    def _key_names(model) -> List[str]:
+        return [column.name for column in model.__table__.primary_key.columns]
+    
+    @staticmethod
+    def _metric_names(model) -> List[str]:
+        return [column.name for column in model.__table__.columns if not column.primary_key]
+    
+    def _increment(self, db: Session, model, keys: dict, deltas: dict):
+        """Soma os deltas na linha do consolidado, criando-a se necessário"""
+        table = model.__table__
+        
+        dialect = db.get_bind().dialect.name
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        elif dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            insert = None
+        
+        row = dict.fromkeys(self._metric_names(model), 0)
+        row.update(keys)
+        row.update(deltas)
+        
+        if insert is not None:
+            # INSERT ... ON CONFLICT DO UPDATE: um único comando, sem corrida
+            stmt = insert(table).values(**row)
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=list(keys),
+                set_={name: table.c[name] + stmt.excluded[name] for name in deltas}
+            ))
+            return
+        
+        # Demais bancos: o UPDATE já bloqueou a linha na transação
+        result = db.execute(
+            update(table).where(
+                and_(*(table.c[name] == value for name, value in keys.items()))
+            ).values({name: table.c[name] + value for name, value in deltas.items()})
+        )
+        if result.rowcount == 0:
+            db.execute(table.insert().values(**row))
+    
+    def _document_rows(self, db: Session, source: dict, start_date: date = None,
+                       end_date: date = None) -> List[dict]:
+        """Linhas do consolidado (todas as chaves) calculadas direto dos documentos"""
+        keys = self._key_names(source['model'])
+        start = datetime.combine(start_date, time.min) if start_date else None
+        stop = datetime.combine(end_date + timedelta(days=1), time.min) if end_date else None
+        
+        totals = {}
+        self._add_documents(db, source, keys, start, stop, totals)
+        return [dict(zip(keys, key), **values) for key, values in totals.items()]
+    
+    def _add_documents(self, db: Session, source: dict, group_by, start, stop, totals: dict):
+        """Soma em totals os documentos de [start, stop)"""
+        date_column = source['date_column']
+        columns = [source['groups'][name].label(name) for name in group_by]
+        query = db.query(
+            *columns,
+            *(expression.label(metric) for metric, expression in source['metrics'].items())
+        )
+        if start is not None:
+            query = query.filter(date_column >= start)
+        if stop is not None:
+            query = query.filter(date_column < stop)
+        if columns:
+            query = query.group_by(*columns)
+        
+        self._accumulate(query, source, group_by, totals)
+    
+    def _add_rollup(self, db: Session, source: dict, group_by, first_day, last_day, totals: dict):
+        """Soma em totals o consolidado dos dias [first_day, last_day)"""
+        model = source['model']
+        columns = [getattr(model, name) for name in group_by]
+        query = db.query(
+            *columns,
+            *(func.sum(getattr(model, metric)).label(metric) for metric in source['metrics'])
+        )
+        if first_day is not None:
+            query = query.filter(model.day >= first_day)
+        if last_day is not None:
+            query = query.filter(model.day < last_day)
+        if columns:
+            query = query.group_by(*columns)
+        
+        self._accumulate(query, source, group_by, totals)
+    
+    @staticmethod
+    def _accumulate(query, source: dict, group_by, totals: dict):
+        for row in query:
+            values = row._asdict()
+            current = totals.setdefault(
+                tuple(values[name] for name in group_by),
+                dict.fromkeys(source['metrics'], 0)
+            )
+            for metric in source['metrics']:
+                current[metric] += values[metric] or 0
+    
+    def _totals(self, db: Session, source: dict, start_date, end_date, group_by) -> Dict[tuple, dict]:
+        """Soma o consolidado dos dias inteiros com os documentos das pontas"""
+        days, raw_ranges = split_period(start_date, end_date)
+        totals = {}
+        
+        if days is not None:
+            self._add_rollup(db, source, group_by, days[0], days[1], totals)
+        for start, stop in raw_ranges:
+            self._add_documents(db, source, group_by, start, stop, totals)
+        
+        # Sem agrupamento, um período vazio devolve a linha de totais zerada
+        if not group_by and () not in totals:
+            totals[()] = dict.fromkeys(source['metrics'], 0)
+        
+        return totals
+
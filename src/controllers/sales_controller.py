@@ -5,6 +5,7 @@ Gerencia vendas e itens de venda
 from datetime import datetime
 from typing import Optional, List
 from sqlalchemy.orm import Session
+from src.controllers.events import SaleCancelled, SaleCreated, bus
 
 class SalesController:
     """Controlador de vendas"""
@@ -12,26 +13,20 @@ class SalesController:
     def generate_sale_number(self, db: Session) -> str:
         """Gera um número único de venda"""
         from src.models import Sale
+        from src.controllers.numbering_controller import NumberingController
         
-        today = datetime.now().strftime("%Y%m%d")
-        last_sale = db.query(Sale).filter(
-            Sale.sale_number.like(f"VD{today}%")
-        ).order_by(Sale.id.desc()).first()
-        
-        if last_sale:
-            last_number = int(last_sale.sale_number[-4:])
-            new_number = last_number + 1
-        else:
-            new_number = 1
-        
-        return f"VD{today}{new_number:04d}"
+        return NumberingController().next_number(db, "VD", Sale.sale_number)
     
     def create_sale(self, db: Session, user_id: int, items: List[dict], 
                     customer_id: int = None, discount: float = 0.0, 
-                    payment_method: str = None, notes: str = None) -> Optional[object]:
+                    payment_method: str = None, notes: str = None,
+                    sale_type: str = None) -> Optional[object]:
         """Cria uma nova venda"""
-        from src.models import Sale, SaleItem, Product
+        from src.models import Sale, SaleItem
         from src.controllers.product_controller import ProductController
+        from src.controllers.rollup_controller import RollupController
+        from src.controllers.data_version_controller import DataVersionController
+        from sqlalchemy import insert
         
         try:
             # Calcular total
@@ -50,37 +45,43 @@ class SalesController:
                 discount=discount,
                 final_amount=final_amount,
                 payment_method=payment_method,
+                sale_type=sale_type,
                 notes=notes
             )
             
             db.add(sale)
             db.flush()  # Para obter o ID da venda
             
-            # Adicionar itens e atualizar estoque
-            product_controller = ProductController()
+            # Adicionar itens (executemany) e atualizar estoque em lote
+            # (executemany com lista vazia viraria INSERT ... DEFAULT VALUES)
+            if items:
+                db.execute(insert(SaleItem), [
+                    {
+                        'sale_id': sale.id,
+                        'product_id': item_data['product_id'],
+                        'quantity': item_data['quantity'],
+                        'unit_price': item_data['unit_price'],
+                        'subtotal': item_data['quantity'] * item_data['unit_price']
+                    }
+                    for item_data in items
+                ])
+            
+            ProductController().apply_stock_movements(
+                db,
+                items,
+                "saida",
+                f"Venda {sale_number}",
+                sale.id,
+                "sale"
+            )
             
-            for item_data in items:
-                # Criar item de venda
-                item = SaleItem(
-                    sale_id=sale.id,
-                    product_id=item_data['product_id'],
-                    quantity=item_data['quantity'],
-                    unit_price=item_data['unit_price'],
-                    subtotal=item_data['quantity'] * item_data['unit_price']
-                )
-                db.add(item)
-                
-                # Atualizar estoque
-                product_controller.update_stock(
-                    db, 
-                    item_data['product_id'], 
-                    item_data['quantity'],
-                    "saida",
-                    f"Venda {sale_number}",
-                    sale.id,
-                    "sale"
-                )
+            RollupController().record_sale(db, sale)
+            DataVersionController().bump(db, "sales", sale.sale_date)
+            bus.publish_after_commit(db, SaleCreated(
+                sale.id, sale.sale_number, sale.sale_date, sale.final_amount
+            ))
             
+            # Um único commit para venda, itens, estoque e consolidado
             db.commit()
             db.refresh(sale)
             return sale
@@ -91,8 +92,10 @@ class SalesController:
     
     def cancel_sale(self, db: Session, sale_id: int) -> bool:
         """Cancela uma venda e devolve itens ao estoque"""
-        from src.models import Sale, SaleItem
+        from src.models import Sale
         from src.controllers.product_controller import ProductController
+        from src.controllers.rollup_controller import RollupController
+        from src.controllers.data_version_controller import DataVersionController
         
         try:
             sale = db.query(Sale).filter(Sale.id == sale_id).first()
@@ -100,21 +103,21 @@ class SalesController:
                 return False
             
             # Devolver itens ao estoque
-            product_controller = ProductController()
-            for item in sale.items:
-                product_controller.update_stock(
-                    db,
-                    item.product_id,
-                    item.quantity,
-                    "entrada",
-                    f"Cancelamento da venda {sale.sale_number}",
-                    sale.id,
-                    "sale_cancellation"
-                )
+            ProductController().apply_stock_movements(
+                db,
+                [{'product_id': item.product_id, 'quantity': item.quantity} for item in sale.items],
+                "entrada",
+                f"Cancelamento da venda {sale.sale_number}",
+                sale.id,
+                "sale_cancellation"
+            )
             
             # Marcar venda como cancelada
             sale.is_cancelled = True
             sale.cancelled_at = datetime.now()
+            RollupController().record_sale_cancellation(db, sale)
+            DataVersionController().bump(db, "sales", sale.sale_date)
+            bus.publish_after_commit(db, SaleCancelled(sale.id, sale.final_amount))
             db.commit()
             return True
         except Exception as e:
@@ -122,18 +125,89 @@ class SalesController:
             print(f"Erro ao cancelar venda: {e}")
             return False
     
-    def get_sale(self, db: Session, sale_id: int) -> Optional[object]:
-        """Busca uma venda por ID"""
+    def get_sale(self, db: Session, sale_id: int, load=None) -> Optional[object]:
+        """Busca uma venda por ID (load: perfil de carregamento, ex.: 'details')"""
         from src.models import Sale
-        return db.query(Sale).filter(Sale.id == sale_id).first()
+        from src.controllers.load_profiles import apply_load_profile, SALE_PROFILES
+        
+        query = db.query(Sale).filter(Sale.id == sale_id)
+        return apply_load_profile(query, SALE_PROFILES, load).first()
     
     def list_sales(self, db: Session, start_date: datetime = None, 
                    end_date: datetime = None, customer_id: int = None,
-                   include_cancelled: bool = False) -> List:
-        """Lista vendas com filtros"""
+                   include_cancelled: bool = False, load=None) -> List:
+        """
+        Lista vendas com filtros
+        
+        Args:
+            load: Perfil de carregamento ('list', 'details', 'rows') ou
+                opções de loader; None mantém o carregamento lazy
+        """
         from src.models import Sale
+        from src.controllers.load_profiles import apply_load_profile, SALE_PROFILES
+        
+        query = self._filter_sales(db.query(Sale), start_date, end_date,
+                                   customer_id, include_cancelled)
         
-        query = db.query(Sale)
+        query = query.order_by(Sale.sale_date.desc())
+        return apply_load_profile(query, SALE_PROFILES, load).all()
+    
+    def iter_sales(self, db: Session, start_date: datetime = None,
+                   end_date: datetime = None, customer_id: int = None,
+                   include_cancelled: bool = False, yield_per: int = 1000):
+        """
+        Percorre as vendas em ordem cronológica, buscando yield_per linhas
+        por vez (projeção 'rows'); para relatórios de períodos longos
+        """
+        from src.models import Sale
+        from src.controllers.load_profiles import apply_load_profile, SALE_PROFILES
+        
+        query = self._filter_sales(db.query(Sale), start_date, end_date,
+                                   customer_id, include_cancelled)
+        query = query.order_by(Sale.sale_date, Sale.id)
+        return apply_load_profile(query, SALE_PROFILES, "rows").yield_per(yield_per)
+    
+    def list_sales_page(self, db: Session, cursor: tuple = None, limit: int = None,
+                        start_date: datetime = None, end_date: datetime = None,
+                        customer_id: int = None, include_cancelled: bool = False,
+                        load="rows", offset: int = None) -> tuple:
+        """
+        Lista uma página de vendas (mais recentes primeiro)
+        
+        Args:
+            cursor: (sale_date, id) da última venda da página anterior
+            limit: Vendas por página (padrão DEFAULT_PAGE_SIZE)
+            load: Perfil de carregamento (padrão: projeção 'rows')
+            offset: Posição inicial quando não há cursor (saltos de rolagem)
+        
+        Returns:
+            Tupla (vendas, próximo cursor ou None)
+        """
+        from src.models import Sale
+        from src.controllers.load_profiles import apply_load_profile, SALE_PROFILES
+        from src.controllers.pagination import keyset_page, DEFAULT_PAGE_SIZE
+        
+        query = self._filter_sales(db.query(Sale), start_date, end_date,
+                                   customer_id, include_cancelled)
+        query = apply_load_profile(query, SALE_PROFILES, load)
+        
+        return keyset_page(query, Sale.sale_date, Sale.id, cursor,
+                           limit or DEFAULT_PAGE_SIZE, offset)
+    
+    def count_sales(self, db: Session, start_date: datetime = None,
+                    end_date: datetime = None, customer_id: int = None,
+                    include_cancelled: bool = False) -> int:
+        """Conta as vendas com os mesmos filtros da listagem"""
+        from src.models import Sale
+        from sqlalchemy import func
+        
+        query = self._filter_sales(db.query(func.count(Sale.id)), start_date, end_date,
+                                   customer_id, include_cancelled)
+        return query.scalar()
+    
+    def _filter_sales(self, query, start_date, end_date, customer_id, include_cancelled):
+        """Aplica os filtros comuns das listagens de vendas"""
+        from src.models import Sale
         
         if start_date:
             query = query.filter(Sale.sale_date >= start_date)
@@ -144,27 +218,16 @@ class SalesController:
         if not include_cancelled:
             query = query.filter(Sale.is_cancelled == False)
         
-        return query.order_by(Sale.sale_date.desc()).all()
+        return query
     
     def get_sales_summary(self, db: Session, start_date: datetime = None, 
                           end_date: datetime = None) -> dict:
-        """Retorna resumo de vendas"""
-        from src.models import Sale
-        from sqlalchemy import func
-        
-        query = db.query(
-            func.count(Sale.id).label('total_sales'),
-            func.sum(Sale.final_amount).label('total_revenue')
-        ).filter(Sale.is_cancelled == False)
-        
-        if start_date:
-            query = query.filter(Sale.sale_date >= start_date)
-        if end_date:
-            query = query.filter(Sale.sale_date <= end_date)
+        """Retorna resumo de vendas (consolidado diário + pontas do período)"""
+        from src.controllers.rollup_controller import RollupController
         
-        result = query.first()
+        totals = RollupController().sales_totals(db, start_date, end_date)[()]
         
         return {
-            'total_sales': result.total_sales or 0,
-            'total_revenue': float(result.total_revenue or 0)
+            'total_sales': totals['sales_count'],
+            'total_revenue': float(totals['net_amount'])
         }
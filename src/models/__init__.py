@@ -2,11 +2,12 @@
 Modelos do Banco de Dados - ChefConta
 Definição de todas as tabelas do sistema
 """
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Text, Enum
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Boolean, ForeignKey, Text, Enum, Index, event
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
 from .database import Base
+from .search_index import create_product_search
 
 # Enums
 class UserRole(enum.Enum):
@@ -102,11 +103,13 @@ class Product(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     code = Column(String(50), unique=True, nullable=False, index=True)
+    barcode = Column(String(50), unique=True, nullable=True, index=True)  # EAN/GTIN
     name = Column(String(100), nullable=False)
     description = Column(Text, nullable=True)
     category_id = Column(Integer, ForeignKey("categories.id"), nullable=True)
     unit = Column(String(20), default="UN")  # UN, KG, L, etc
     cost_price = Column(Float, default=0.0)
+    average_cost = Column(Float, nullable=False, default=0.0, server_default="0")  # Custo médio ponderado (movimentações)
     sale_price = Column(Float, nullable=False)
     stock_quantity = Column(Float, default=0.0)
     min_stock = Column(Float, default=0.0)
@@ -119,6 +122,18 @@ class Product(Base):
     sale_items = relationship("SaleItem", back_populates="product")
     purchase_items = relationship("PurchaseItem", back_populates="product")
     stock_movements = relationship("StockMovement", back_populates="product")
+    
+    # Contagem de estoque baixo (dashboard) sem ler a tabela inteira. Índice
+    # parcial: um índice comum em is_active desviaria a listagem por código
+    __table_args__ = (
+        Index("ix_products_low_stock", "stock_quantity", "min_stock",
+              sqlite_where=is_active == True, postgresql_where=is_active == True),
+    )
+
+# Índice de busca (FTS5) criado junto com a tabela de produtos no SQLite
+@event.listens_for(Product.__table__, "after_create")
+def _create_product_search(target, connection, **kw):
+    create_product_search(connection)
 
 # Tabela de Vendas
 class Sale(Base):
@@ -133,6 +148,7 @@ class Sale(Base):
     discount = Column(Float, default=0.0)
     final_amount = Column(Float, nullable=False)
     payment_method = Column(String(50), nullable=True)
+    sale_type = Column(String(20), nullable=True)  # comanda, balcao
     notes = Column(Text, nullable=True)
     is_cancelled = Column(Boolean, default=False)
     cancelled_at = Column(DateTime, nullable=True)
@@ -142,6 +158,13 @@ class Sale(Base):
     customer = relationship("Customer", back_populates="sales")
     user = relationship("User", back_populates="sales")
     items = relationship("SaleItem", back_populates="sale", cascade="all, delete-orphan")
+    
+    # Índices dos filtros de listagem (período, status e cliente)
+    __table_args__ = (
+        Index("ix_sales_sale_date", "sale_date"),
+        Index("ix_sales_cancelled_date", "is_cancelled", "sale_date"),
+        Index("ix_sales_customer_date", "customer_id", "sale_date"),
+    )
 
 # Tabela de Itens de Venda
 class SaleItem(Base):
@@ -157,6 +180,11 @@ class SaleItem(Base):
     # Relacionamentos
     sale = relationship("Sale", back_populates="items")
     product = relationship("Product", back_populates="sale_items")
+    
+    __table_args__ = (
+        Index("ix_sale_items_sale_id", "sale_id"),
+        Index("ix_sale_items_product_id", "product_id"),
+    )
 
 # Tabela de Compras
 class Purchase(Base):
@@ -175,6 +203,11 @@ class Purchase(Base):
     supplier = relationship("Supplier", back_populates="purchases")
     user = relationship("User", back_populates="purchases")
     items = relationship("PurchaseItem", back_populates="purchase", cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        Index("ix_purchases_purchase_date", "purchase_date"),
+        Index("ix_purchases_supplier_date", "supplier_id", "purchase_date"),
+    )
 
 # Tabela de Itens de Compra
 class PurchaseItem(Base):
@@ -190,6 +223,11 @@ class PurchaseItem(Base):
     # Relacionamentos
     purchase = relationship("Purchase", back_populates="items")
     product = relationship("Product", back_populates="purchase_items")
+    
+    __table_args__ = (
+        Index("ix_purchase_items_purchase_id", "purchase_id"),
+        Index("ix_purchase_items_product_id", "product_id"),
+    )
 
 # Tabela de Despesas
 class Expense(Base):
@@ -213,6 +251,14 @@ class Expense(Base):
     # Relacionamentos
     user = relationship("User", back_populates="expenses")
     supplier = relationship("Supplier", back_populates="expenses")
+    
+    # Índices de período, status de pagamento e vencimento
+    __table_args__ = (
+        Index("ix_expenses_expense_date", "expense_date"),
+        Index("ix_expenses_paid_expense_date", "paid", "expense_date"),
+        Index("ix_expenses_paid_due_date", "paid", "due_date"),
+        Index("ix_expenses_type_date", "expense_type", "expense_date"),
+    )
 
 # Tabela de Movimentação de Estoque
 class StockMovement(Base):
@@ -222,6 +268,7 @@ class StockMovement(Base):
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
     movement_type = Column(String(20), nullable=False)  # entrada, saida, ajuste
     quantity = Column(Float, nullable=False)
+    unit_cost = Column(Float, nullable=True)  # Entrada: custo da compra; saída: custo médio
     reason = Column(String(100), nullable=True)
     reference_id = Column(Integer, nullable=True)  # ID da venda/compra relacionada
     reference_type = Column(String(50), nullable=True)  # sale, purchase, adjustment
@@ -231,6 +278,11 @@ class StockMovement(Base):
     
     # Relacionamentos
     product = relationship("Product", back_populates="stock_movements")
+    
+    __table_args__ = (
+        Index("ix_stock_movements_created_at", "created_at"),
+        Index("ix_stock_movements_product_created", "product_id", "created_at"),
+    )
 
 # Tabela de Configurações
 class SystemConfig(Base):
@@ -242,6 +294,59 @@ class SystemConfig(Base):
     description = Column(Text, nullable=True)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
 
+# Tabela de Contadores de Numeração (por prefixo e dia)
+class DocumentCounter(Base):
+    __tablename__ = "document_counters"
+    
+    prefix = Column(String(10), primary_key=True)  # VD, DP, CP
+    day = Column(String(8), primary_key=True)  # AAAAMMDD
+    last_value = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+# Consolidado diário de vendas (por forma de pagamento e tipo de venda)
+# Mantido pelo RollupController na mesma transação das vendas; chaves
+# ausentes (sem forma de pagamento/tipo) são gravadas como ''
+class DailySalesSummary(Base):
+    __tablename__ = "daily_sales_summary"
+    
+    day = Column(Date, primary_key=True)
+    payment_method = Column(String(50), primary_key=True, default="")
+    sale_type = Column(String(20), primary_key=True, default="")
+    sales_count = Column(Integer, nullable=False, default=0)  # Vendas válidas
+    gross_amount = Column(Float, nullable=False, default=0.0)  # Soma de total_amount
+    discount_amount = Column(Float, nullable=False, default=0.0)
+    net_amount = Column(Float, nullable=False, default=0.0)  # Soma de final_amount
+    cancelled_count = Column(Integer, nullable=False, default=0)
+    cancelled_amount = Column(Float, nullable=False, default=0.0)
+
+# Consolidado diário de despesas (por tipo, pela data da despesa)
+class DailyExpenseSummary(Base):
+    __tablename__ = "daily_expense_summary"
+    
+    day = Column(Date, primary_key=True)
+    expense_type = Column(String(50), primary_key=True)
+    expense_count = Column(Integer, nullable=False, default=0)
+    total_amount = Column(Float, nullable=False, default=0.0)
+    paid_amount = Column(Float, nullable=False, default=0.0)
+
+# Consolidado diário de compras
+class DailyPurchaseSummary(Base):
+    __tablename__ = "daily_purchase_summary"
+    
+    day = Column(Date, primary_key=True)
+    purchase_count = Column(Integer, nullable=False, default=0)
+    total_amount = Column(Float, nullable=False, default=0.0)
+
+# Versão dos dados por tabela e mês (AAAA-MM da data do documento).
+# Incrementada pelos controllers na mesma transação da alteração; serve de
+# carimbo para o cache de relatórios
+class DataVersion(Base):
+    __tablename__ = "data_versions"
+    
+    table_name = Column(String(50), primary_key=True)
+    month = Column(String(7), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
 # Tabela de Licenciamento (opcional)
 class License(Base):
     __tablename__ = "licenses"
@@ -280,6 +385,11 @@ class CashRegister(Base):
     # Relacionamentos
     user = relationship("User")
     movements = relationship("CashMovement", back_populates="cash_register", cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        Index("ix_cash_registers_open_date", "is_open", "opening_date"),
+        Index("ix_cash_registers_opening_date", "opening_date"),
+    )
 
 # Tabela de Movimentações do Caixa
 class CashMovement(Base):
@@ -298,3 +408,7 @@ class CashMovement(Base):
     
     # Relacionamentos
     cash_register = relationship("CashRegister", back_populates="movements")
+    
+    __table_args__ = (
+        Index("ix_cash_movements_register_created", "cash_register_id", "created_at"),
+    )
@@ -1,10 +1,14 @@
 """
 Configuração do Banco de Dados - ChefConta
 """
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 from dotenv import load_dotenv
 import os
+import weakref
+from urllib.parse import quote
 
 # Carregar variáveis de ambiente
 load_dotenv()
@@ -12,15 +16,157 @@ load_dotenv()
 # URL do banco de dados
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///database/chefconta.db")
 
+# Perfil de conexão do SQLite (performance, safe ou default)
+DB_PROFILE = os.getenv("DB_PROFILE", "performance")
+
+# Perfis de PRAGMAs aplicados a cada nova conexão SQLite
+SQLITE_PROFILES = {
+    # WAL + synchronous=NORMAL: leitores não bloqueiam o escritor e o commit
+    # não faz fsync do arquivo principal (apenas nos checkpoints)
+    "performance": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -64000,  # ~64 MB (valor negativo = KiB)
+        "mmap_size": 268435456,  # 256 MB
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,  # ms
+    },
+    # Máxima durabilidade, mantendo WAL para não bloquear leituras
+    "safe": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -16000,
+        "temp_store": "MEMORY",
+        "busy_timeout": 10000,
+    },
+    # Comportamento padrão do pysqlite (rollback journal, sync FULL)
+    "default": {},
+}
+
+# Pool de conexões (SQLite em arquivo: um escritor por vez, poucas conexões
+# bastam; servidores: conexões verificadas e recicladas periodicamente)
+POOL_OPTIONS = {
+    "sqlite": {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "5")),
+        "pool_timeout": 30,
+    },
+    "server": {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),
+        "pool_timeout": 30,
+        "pool_pre_ping": True,
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),  # s
+    },
+}
+
+# Ordem de aplicação (journal_mode precisa vir antes de synchronous)
+_PRAGMA_ORDER = ("journal_mode", "synchronous", "cache_size", "mmap_size",
+                 "temp_store", "busy_timeout", "query_only")
+
+
+def get_sqlite_pragmas(profile: str = None) -> dict:
+    """Retorna os PRAGMAs do perfil, com sobrescritas via variáveis SQLITE_<PRAGMA>"""
+    profile = profile or DB_PROFILE
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"Perfil de banco desconhecido: {profile}")
+    
+    pragmas = dict(SQLITE_PROFILES[profile])
+    for name in _PRAGMA_ORDER:
+        override = os.getenv(f"SQLITE_{name.upper()}")
+        if override:
+            pragmas[name] = override
+    
+    return pragmas
+
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas: dict):
+    """Aplica os PRAGMAs em uma conexão DBAPI do sqlite3"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name in _PRAGMA_ORDER:
+            if name in pragmas:
+                cursor.execute(f"PRAGMA {name}={pragmas[name]}")
+    finally:
+        cursor.close()
+
+
+def create_db_engine(url: str = None, profile: str = None, readonly: bool = False, **kwargs):
+    """
+    Cria uma engine do SQLAlchemy com o perfil de conexão configurado
+    
+    Com readonly=True as conexões só leem: no SQLite o arquivo é aberto com
+    mode=ro e PRAGMA query_only (sem trocar o journal_mode, que exigiria
+    escrita); nos servidores cada transação começa como READ ONLY.
+    """
+    url = url or DATABASE_URL
+    is_sqlite = url.startswith("sqlite")
+    is_memory = ":memory:" in url or url.rstrip("/") in ("sqlite:", "sqlite+pysqlite:")
+    
+    if readonly and is_sqlite and not is_memory:
+        database = make_url(url).database
+        if database and not database.startswith("file:"):
+            url = f"sqlite:///file:{quote(os.path.abspath(database))}?mode=ro&uri=true"
+    
+    # Banco em memória usa o pool próprio do dialeto (uma conexão por thread)
+    if not is_memory:
+        for option, value in POOL_OPTIONS["sqlite" if is_sqlite else "server"].items():
+            kwargs.setdefault(option, value)
+    
+    # Garantir que a pasta do arquivo SQLite exista (ex.: database/)
+    if is_sqlite:
+        database = make_url(url).database
+        if database and database != ":memory:" and not database.startswith("file:"):
+            os.makedirs(os.path.dirname(os.path.abspath(database)), exist_ok=True)
+    
+    engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False} if is_sqlite else {},
+        echo=False,
+        **kwargs
+    )
+    
+    if is_sqlite:
+        pragmas = get_sqlite_pragmas(profile)
+        
+        # Em banco em memória não existe WAL nem mmap
+        if is_memory:
+            pragmas.pop("journal_mode", None)
+            pragmas.pop("mmap_size", None)
+        
+        if readonly:
+            pragmas.pop("journal_mode", None)
+            pragmas["query_only"] = "ON"
+        
+        if pragmas:
+            @event.listens_for(engine, "connect")
+            def _on_connect(dbapi_connection, connection_record):
+                apply_sqlite_pragmas(dbapi_connection, pragmas)
+    elif readonly:
+        @event.listens_for(engine, "begin")
+        def _on_begin(connection):
+            connection.exec_driver_sql("SET TRANSACTION READ ONLY")
+    
+    return engine
+
+
 # Engine do SQLAlchemy
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {},
-    echo=False
-)
+engine = create_db_engine(DATABASE_URL)
+
+# Sessões vivas, para diagnóstico (referências fracas: não impedem a coleta)
+_live_sessions = weakref.WeakSet()
+
+
+class TrackedSession(Session):
+    """Sessão registrada para o diagnóstico de sessões abertas"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        _live_sessions.add(self)
+
 
 # Session maker
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=TrackedSession)
 
 # Base para os modelos
 Base = declarative_base()
@@ -34,7 +180,54 @@ def get_db():
     finally:
         db.close()
 
+@contextmanager
+def session_scope(**kwargs):
+    """
+    Sessão de curta duração para uma operação (unidade de trabalho)
+    
+    Confirma ao final, desfaz em caso de erro e sempre fecha a sessão,
+    devolvendo a conexão ao pool e liberando o identity map. Por padrão
+    usa expire_on_commit=False: os objetos carregados continuam legíveis
+    (colunas já carregadas) depois que o bloco termina.
+    
+    Uso:
+        with session_scope() as db:
+            products = ProductController().list_products(db)
+    """
+    kwargs.setdefault("expire_on_commit", False)
+    db = SessionLocal(**kwargs)
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def get_session_stats() -> dict:
+    """
+    Retorna estatísticas das sessões e do pool de conexões
+    
+    Returns:
+        Dicionário com sessões vivas, sessões com transação (conexão) aberta,
+        tamanhos dos identity maps e o estado do pool
+    """
+    sessions = list(_live_sessions)
+    identity_sizes = [len(session.identity_map) for session in sessions]
+    pool = engine.pool
+    
+    return {
+        'live_sessions': len(sessions),
+        'open_transactions': sum(1 for session in sessions if session.in_transaction()),
+        'identity_map_total': sum(identity_sizes),
+        'identity_map_max': max(identity_sizes, default=0),
+        'pool_checked_out': pool.checkedout() if hasattr(pool, "checkedout") else None,
+        'pool_status': pool.status()
+    }
+
 # Função para criar todas as tabelas
 def create_tables():
-    """Cria todas as tabelas no banco de dados"""
+    """Cria todas as tabelas no banco de dados (sem versionamento; ver migrations)"""
     Base.metadata.create_all(bind=engine)
@@ -0,0 +1,74 @@
+"""
+Migrações do Banco de Dados - ChefConta
+Controle de versões do schema com Alembic
+"""
+import os
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from ..database import engine
+from ..search_index import is_search_index_table
+
+# Revisão mais recente em versions/ (atualizar a cada nova migração)
+HEAD_REVISION = "0009"
+
+# Revisão que corresponde aos bancos criados pelo antigo create_all
+BASELINE_REVISION = "0001"
+
+MIGRATIONS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def get_alembic_config(connection=None):
+    """Monta a configuração do Alembic sem depender do alembic.ini"""
+    from alembic.config import Config
+    
+    config = Config()
+    config.set_main_option("script_location", MIGRATIONS_DIR)
+    if connection is not None:
+        config.attributes["connection"] = connection
+    return config
+
+
+def include_name(name, type_, parent_names):
+    """Filtro do autogenerate: ignora as tabelas do índice FTS (criadas por SQL próprio)"""
+    if type_ == "table":
+        return not is_search_index_table(name)
+    return True
+
+
+def get_schema_version(bind=None):
+    """Retorna a revisão atual do banco (um único SELECT) ou None se não versionado"""
+    bind = bind or engine
+    
+    try:
+        with bind.connect() as connection:
+            return connection.execute(text("SELECT version_num FROM alembic_version")).scalar()
+    except (OperationalError, ProgrammingError):
+        return None
+
+
+def upgrade_database(bind=None, revision: str = "head") -> str:
+    """Aplica as migrações pendentes e retorna a revisão final"""
+    from alembic import command
+    
+    bind = bind or engine
+    
+    with bind.begin() as connection:
+        config = get_alembic_config(connection)
+        
+        # Banco legado (create_all, sem alembic_version): marcar como baseline
+        inspector = inspect(connection)
+        if not inspector.has_table("alembic_version") and inspector.has_table("users"):
+            command.stamp(config, BASELINE_REVISION)
+        
+        command.upgrade(config, revision)
+    
+    return get_schema_version(bind)
+
+
+def ensure_schema(bind=None) -> bool:
+    """Garante o schema atualizado; retorna True se alguma migração foi aplicada"""
+    if get_schema_version(bind) == HEAD_REVISION:
+        return False
+    
+    upgrade_database(bind)
+    return True
@@ -0,0 +1,63 @@
+"""
+Ambiente do Alembic - ChefConta
+Executado pelo Alembic tanto pela linha de comando quanto por upgrade_database()
+"""
+import os
+import sys
+
+from alembic import context
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+from src.models.database import Base, create_db_engine, DATABASE_URL
+from src.models.migrations import include_name
+import src.models  # noqa: F401 - registra as tabelas no metadata
+
+config = context.config
+target_metadata = Base.metadata
+
+
+def run_migrations_offline():
+    """Gera o SQL das migrações sem conectar ao banco"""
+    url = config.get_main_option("sqlalchemy.url") or DATABASE_URL
+    context.configure(
+        url=url,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        include_name=include_name,
+        render_as_batch=url.startswith("sqlite"),
+    )
+    
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    """Aplica as migrações usando a conexão recebida ou uma nova engine"""
+    connection = config.attributes.get("connection")
+    
+    if connection is None:
+        engine = create_db_engine(config.get_main_option("sqlalchemy.url") or DATABASE_URL)
+        with engine.connect() as connection:
+            _run(connection)
+        engine.dispose()
+    else:
+        _run(connection)
+
+
+def _run(connection):
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_name=include_name,
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+    
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
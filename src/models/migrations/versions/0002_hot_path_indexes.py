@@ -0,0 +1,56 @@
+"""
+Índices compostos dos filtros de listagem e resumo
+
+Bancos que já receberam os índices pelo antigo upgrade_indexes() mantêm
+os existentes; apenas os que faltam são criados.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_sales_sale_date", "sales", ["sale_date"]),
+    ("ix_sales_cancelled_date", "sales", ["is_cancelled", "sale_date"]),
+    ("ix_sales_customer_date", "sales", ["customer_id", "sale_date"]),
+    ("ix_sale_items_sale_id", "sale_items", ["sale_id"]),
+    ("ix_sale_items_product_id", "sale_items", ["product_id"]),
+    ("ix_purchases_purchase_date", "purchases", ["purchase_date"]),
+    ("ix_purchases_supplier_date", "purchases", ["supplier_id", "purchase_date"]),
+    ("ix_purchase_items_purchase_id", "purchase_items", ["purchase_id"]),
+    ("ix_purchase_items_product_id", "purchase_items", ["product_id"]),
+    ("ix_expenses_expense_date", "expenses", ["expense_date"]),
+    ("ix_expenses_paid_expense_date", "expenses", ["paid", "expense_date"]),
+    ("ix_expenses_paid_due_date", "expenses", ["paid", "due_date"]),
+    ("ix_expenses_type_date", "expenses", ["expense_type", "expense_date"]),
+    ("ix_stock_movements_created_at", "stock_movements", ["created_at"]),
+    ("ix_stock_movements_product_created", "stock_movements", ["product_id", "created_at"]),
+    ("ix_cash_registers_open_date", "cash_registers", ["is_open", "opening_date"]),
+    ("ix_cash_registers_opening_date", "cash_registers", ["opening_date"]),
+    ("ix_cash_movements_register_created", "cash_movements", ["cash_register_id", "created_at"]),
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    existing = {
+        index["name"]
+        for table in {table for _, table, _ in INDEXES}
+        for index in inspector.get_indexes(table)
+    }
+    
+    for name, table, columns in INDEXES:
+        if name not in existing:
+            op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
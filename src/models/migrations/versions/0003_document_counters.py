@@ -0,0 +1,28 @@
+"""
+Contadores de numeração de documentos
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('document_counters',
+    sa.Column('prefix', sa.String(length=10), nullable=False),
+    sa.Column('day', sa.String(length=8), nullable=False),
+    sa.Column('last_value', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('prefix', 'day')
+    )
+
+
+def downgrade():
+    op.drop_table('document_counters')
@@ -0,0 +1,34 @@
+"""
+Índice de busca de produtos (FTS5)
+
+Tabela virtual products_fts com triggers de sincronização; o índice é
+reconstruído a partir dos produtos existentes. Apenas no SQLite: nos
+demais bancos a busca continua por LIKE.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+from src.models.search_index import (
+    create_product_search, drop_product_search, PRODUCT_SEARCH_REBUILD
+)
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    connection = op.get_bind()
+    if connection.dialect.name != "sqlite":
+        return
+    
+    create_product_search(connection)
+    connection.exec_driver_sql(PRODUCT_SEARCH_REBUILD)
+
+
+def downgrade():
+    drop_product_search(op.get_bind())
@@ -0,0 +1,25 @@
+"""
+Código de barras dos produtos
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # ADD COLUMN simples (sem recriar a tabela, preservando os triggers de busca)
+    op.add_column('products', sa.Column('barcode', sa.String(length=50), nullable=True))
+    op.create_index(op.f('ix_products_barcode'), 'products', ['barcode'], unique=True)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_products_barcode'), table_name='products')
+    op.drop_column('products', 'barcode')
@@ -0,0 +1,26 @@
+"""
+Índice parcial de estoque baixo dos produtos ativos (dashboard)
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_products_low_stock', 'products', ['stock_quantity', 'min_stock'],
+        sqlite_where=sa.text('is_active = 1'),
+        postgresql_where=sa.text('is_active = true')
+    )
+
+
+def downgrade():
+    op.drop_index('ix_products_low_stock', table_name='products')
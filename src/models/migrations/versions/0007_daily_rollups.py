@@ -0,0 +1,94 @@
+"""
+Consolidados diários de vendas, despesas e compras
+
+Cria sales.sale_type (balcão/comanda, antes gravado apenas no caixa) e as
+tabelas de totais por dia, carregadas a partir dos documentos existentes.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+BACKFILL = [
+    """
+    INSERT INTO daily_sales_summary (day, payment_method, sale_type, sales_count,
+        gross_amount, discount_amount, net_amount, cancelled_count, cancelled_amount)
+    SELECT {day_sale}, COALESCE(payment_method, ''), COALESCE(sale_type, ''),
+        SUM(CASE WHEN is_cancelled = false THEN 1 ELSE 0 END),
+        COALESCE(SUM(CASE WHEN is_cancelled = false THEN total_amount END), 0),
+        COALESCE(SUM(CASE WHEN is_cancelled = false THEN discount END), 0),
+        COALESCE(SUM(CASE WHEN is_cancelled = false THEN final_amount END), 0),
+        SUM(CASE WHEN is_cancelled = true THEN 1 ELSE 0 END),
+        COALESCE(SUM(CASE WHEN is_cancelled = true THEN final_amount END), 0)
+    FROM sales
+    GROUP BY {day_sale}, COALESCE(payment_method, ''), COALESCE(sale_type, '')
+    """,
+    """
+    INSERT INTO daily_expense_summary (day, expense_type, expense_count, total_amount, paid_amount)
+    SELECT {day_expense}, expense_type, COUNT(id), COALESCE(SUM(amount), 0),
+        COALESCE(SUM(CASE WHEN paid = true THEN amount END), 0)
+    FROM expenses
+    GROUP BY {day_expense}, expense_type
+    """,
+    """
+    INSERT INTO daily_purchase_summary (day, purchase_count, total_amount)
+    SELECT {day_purchase}, COUNT(id), COALESCE(SUM(total_amount), 0)
+    FROM purchases
+    GROUP BY {day_purchase}
+    """,
+]
+
+
+def upgrade():
+    # ADD COLUMN simples (sem recriar a tabela)
+    op.add_column('sales', sa.Column('sale_type', sa.String(length=20), nullable=True))
+    
+    op.create_table('daily_sales_summary',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('payment_method', sa.String(length=50), nullable=False),
+    sa.Column('sale_type', sa.String(length=20), nullable=False),
+    sa.Column('sales_count', sa.Integer(), nullable=False),
+    sa.Column('gross_amount', sa.Float(), nullable=False),
+    sa.Column('discount_amount', sa.Float(), nullable=False),
+    sa.Column('net_amount', sa.Float(), nullable=False),
+    sa.Column('cancelled_count', sa.Integer(), nullable=False),
+    sa.Column('cancelled_amount', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'payment_method', 'sale_type')
+    )
+    op.create_table('daily_expense_summary',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('expense_type', sa.String(length=50), nullable=False),
+    sa.Column('expense_count', sa.Integer(), nullable=False),
+    sa.Column('total_amount', sa.Float(), nullable=False),
+    sa.Column('paid_amount', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'expense_type')
+    )
+    op.create_table('daily_purchase_summary',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('purchase_count', sa.Integer(), nullable=False),
+    sa.Column('total_amount', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('day')
+    )
+    
+    connection = op.get_bind()
+    day = "date({})" if connection.dialect.name == "sqlite" else "CAST({} AS DATE)"
+    for statement in BACKFILL:
+        op.execute(statement.format(
+            day_sale=day.format("sale_date"),
+            day_expense=day.format("expense_date"),
+            day_purchase=day.format("purchase_date")
+        ))
+
+
+def downgrade():
+    op.drop_table('daily_purchase_summary')
+    op.drop_table('daily_expense_summary')
+    op.drop_table('daily_sales_summary')
+    op.drop_column('sales', 'sale_type')
@@ -0,0 +1,31 @@
+"""
+Versões dos dados por tabela e mês
+
+Contadores incrementados a cada alteração de vendas, despesas, compras e
+produtos; o cache de relatórios usa a soma das versões do período como
+carimbo. Bancos existentes começam na versão 0 (cache ainda vazio).
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('data_versions',
+    sa.Column('table_name', sa.String(length=50), nullable=False),
+    sa.Column('month', sa.String(length=7), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('table_name', 'month')
+    )
+
+
+def downgrade():
+    op.drop_table('data_versions')
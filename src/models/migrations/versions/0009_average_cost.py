@@ -0,0 +1,41 @@
+"""
+Custo médio ponderado dos produtos
+
+O custo médio passa a ser mantido a cada movimentação de estoque, e cada
+movimentação guarda o seu custo unitário. Bancos existentes começam com o
+preço de custo cadastrado e com o custo das entradas de compra copiado dos
+itens; o histórico completo pode ser recalculado com:
+    python -m chefconta valuation rebuild
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # ADD COLUMN simples (sem recriar a tabela, preservando os triggers de busca)
+    op.add_column('products', sa.Column('average_cost', sa.Float(), server_default='0', nullable=False))
+    op.add_column('stock_movements', sa.Column('unit_cost', sa.Float(), nullable=True))
+    
+    op.execute("UPDATE products SET average_cost = COALESCE(cost_price, 0)")
+    op.execute(
+        "UPDATE stock_movements SET unit_cost = ("
+        " SELECT SUM(purchase_items.subtotal) / SUM(purchase_items.quantity)"
+        " FROM purchase_items"
+        " WHERE purchase_items.purchase_id = stock_movements.reference_id"
+        " AND purchase_items.product_id = stock_movements.product_id"
+        ") WHERE reference_type = 'purchase'"
+    )
+
+
+def downgrade():
+    op.drop_column('stock_movements', 'unit_cost')
+    op.drop_column('products', 'average_cost')
@@ -0,0 +1,143 @@
+"""
+Índice de Busca de Produtos
+Tabela FTS5 (SQLite) sobre código, nome e descrição dos produtos
+"""
+import re
+import weakref
+from sqlalchemy import column, func, inspect, literal, literal_column, select, table, union_all
+
+# Tabela virtual de conteúdo externo: o texto fica apenas em products e o
+# índice é mantido pelos triggers abaixo. O tokenizador unicode61 com
+# remove_diacritics 2 normaliza caixa e acentos ("acucar" encontra
+# "Açúcar") e os índices de prefixo aceleram a busca enquanto se digita.
+PRODUCT_SEARCH_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        code, name, description,
+        content='products', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, code, name, description)
+        VALUES (new.id, new.code, new.name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, code, name, description)
+        VALUES ('delete', old.id, old.code, old.name, old.description);
+    END
+    """,
+    # Apenas alterações de texto reindexam (movimentos de estoque não)
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF code, name, description ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, code, name, description)
+        VALUES ('delete', old.id, old.code, old.name, old.description);
+        INSERT INTO products_fts(rowid, code, name, description)
+        VALUES (new.id, new.code, new.name, new.description);
+    END
+    """,
+]
+
+PRODUCT_SEARCH_DROP = [
+    "DROP TRIGGER IF EXISTS products_fts_au",
+    "DROP TRIGGER IF EXISTS products_fts_ad",
+    "DROP TRIGGER IF EXISTS products_fts_ai",
+    "DROP TABLE IF EXISTS products_fts",
+]
+
+# Reconstrói o índice a partir da tabela products
+PRODUCT_SEARCH_REBUILD = "INSERT INTO products_fts(products_fts) VALUES ('rebuild')"
+
+# Pesos do bm25 por coluna (código, nome, descrição)
+RANK_WEIGHTS = (10.0, 5.0, 1.0)
+
+_available = weakref.WeakKeyDictionary()
+
+products_fts = table("products_fts", column("rowid"))
+products = table("products", column("id"), column("code"))
+
+# Rank dos produtos encontrados só pelo trecho do código: depois dos
+# resultados do FTS (o bm25 é negativo, menor = melhor)
+CODE_MATCH_RANK = 0.0
+
+
+def is_search_index_table(name: str) -> bool:
+    """Indica se a tabela pertence ao índice FTS (tabela virtual e auxiliares)"""
+    return name == "products_fts" or name.startswith("products_fts_")
+
+
+def has_product_search(bind) -> bool:
+    """Indica se o banco possui o índice FTS de produtos (resultado em cache por engine)"""
+    engine = getattr(bind, "engine", bind)
+    if engine not in _available:
+        _available[engine] = (
+            engine.dialect.name == "sqlite" and inspect(engine).has_table("products_fts")
+        )
+    return _available[engine]
+
+
+def build_match_query(search_term: str) -> str:
+    """
+    Converte o termo digitado em uma consulta FTS5 de prefixos
+    
+    Cada palavra vira um prefixo entre aspas ("acu"* "cris"*), o que
+    neutraliza a sintaxe do FTS5 (aspas, operadores, parênteses).
+    
+    Returns:
+        Consulta MATCH ou string vazia se o termo não tiver palavras
+    """
+    words = re.findall(r"\w+", search_term)
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def search_ranking(match_query: str, code_term: str = None):
+    """
+    Subconsulta (product_id, rank) ordenável por relevância (bm25, menor = melhor)
+    
+    Args:
+        code_term: Trecho do código (LIKE '%trecho%'), para o que o FTS de
+            prefixos não encontra (ex.: "001" em "P001"); um produto por linha
+    """
+    ranked = select(
+        products_fts.c.rowid.label("product_id"),
+        func.bm25(literal_column("products_fts"), *RANK_WEIGHTS).label("rank")
+    ).where(
+        literal_column("products_fts").match(match_query)
+    )
+    if not code_term:
+        return ranked.subquery()
+    
+    code_matches = select(
+        products.c.id.label("product_id"),
+        literal(CODE_MATCH_RANK).label("rank")
+    ).where(products.c.code.like(f"%{code_term}%"))
+    
+    candidates = union_all(ranked, code_matches).subquery()
+    return select(
+        candidates.c.product_id,
+        func.min(candidates.c.rank).label("rank")
+    ).group_by(candidates.c.product_id).subquery()
+
+
+def create_product_search(connection):
+    """Cria o índice FTS e os triggers (bancos SQLite)"""
+    if connection.dialect.name != "sqlite":
+        return
+    
+    for statement in PRODUCT_SEARCH_DDL:
+        connection.exec_driver_sql(statement)
+    _available.pop(connection.engine, None)
+
+
+def drop_product_search(connection):
+    """Remove o índice FTS e os triggers"""
+    if connection.dialect.name != "sqlite":
+        return
+    
+    for statement in PRODUCT_SEARCH_DROP:
+        connection.exec_driver_sql(statement)
+    _available.pop(connection.engine, None)
@@ -1,8 +1,17 @@
 """
 Arquivo __init__ para o pacote utils
+
+Importações sob demanda: importar src.utils.<módulo> não carrega o
+reportlab/openpyxl do gerador de relatórios (CLI e workers)
 """
-from .report_generator import ReportGenerator
 
 __all__ = [
     'ReportGenerator',
 ]
+
+
+def __getattr__(name):
+    if name == 'ReportGenerator':
+        from .report_generator import ReportGenerator
+        return ReportGenerator
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
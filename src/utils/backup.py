@@ -0,0 +1,92 @@
+"""
+Backup do Banco de Dados
+Cópia consistente do SQLite, mesmo com o sistema em uso
+"""
+import glob
+import os
+import sqlite3
+from datetime import datetime
+
+# Pasta dos backups automáticos (CLI / agendamento)
+BACKUP_DIR = os.getenv("BACKUP_DIR", "backups")
+
+# Quantidade de backups automáticos mantidos na pasta (os mais antigos são apagados)
+BACKUP_KEEP = int(os.getenv("BACKUP_KEEP", "30"))
+
+BACKUP_PREFIX = "chefconta_backup_"
+
+
+def get_database_path(url: str = None) -> str:
+    """
+    Caminho do arquivo SQLite configurado
+    
+    Raises:
+        ValueError: Banco não é um arquivo SQLite (servidores usam as
+            ferramentas próprias, ex.: pg_dump)
+    """
+    from sqlalchemy.engine import make_url
+    from src.models.database import DATABASE_URL
+    
+    url = make_url(url or DATABASE_URL)
+    database = url.database
+    if not url.drivername.startswith("sqlite") or not database or database == ":memory:":
+        raise ValueError("Backup disponível apenas para banco SQLite em arquivo")
+    if database.startswith("file:"):
+        database = database[len("file:"):].split("?", 1)[0]
+    return os.path.abspath(database)
+
+
+def create_backup(filepath: str = None, backup_dir: str = None, keep: int = None,
+                  url: str = None) -> str:
+    """
+    Cria um backup pela API de backup online do SQLite
+    
+    Diferente de copiar o arquivo, inclui as transações ainda no WAL e não
+    corre o risco de pegar uma escrita pela metade.
+    
+    Args:
+        filepath: Arquivo de destino (padrão: backup_dir/chefconta_backup_<data>.db)
+        backup_dir: Pasta dos backups automáticos (padrão BACKUP_DIR)
+        keep: Backups automáticos mantidos (padrão BACKUP_KEEP; 0 = todos)
+    
+    Returns:
+        Caminho do backup criado
+    """
+    source_path = get_database_path(url)
+    if not os.path.exists(source_path):
+        raise FileNotFoundError(f"Banco de dados não encontrado: {source_path}")
+    
+    rotate = filepath is None
+    if rotate:
+        backup_dir = backup_dir or BACKUP_DIR
+        os.makedirs(backup_dir, exist_ok=True)
+        filepath = os.path.join(
+            backup_dir, f"{BACKUP_PREFIX}{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
+        )
+    
+    source = sqlite3.connect(source_path)
+    try:
+        target = sqlite3.connect(filepath)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+    finally:
+        source.close()
+    
+    if rotate:
+        prune_backups(backup_dir, BACKUP_KEEP if keep is None else keep)
+    return filepath
+
+
+def prune_backups(backup_dir: str, keep: int) -> list:
+    """Apaga os backups automáticos mais antigos além de `keep`; retorna os removidos"""
+    if keep <= 0:
+        return []
+    
+    # O nome tem a data (AAAAMMDD_HHMMSS): ordem alfabética = cronológica
+    backups = sorted(glob.glob(os.path.join(backup_dir, f"{BACKUP_PREFIX}*.db")))
+    removed = backups[:-keep]
+    for path in removed:
+        os.remove(path)
+    return removed
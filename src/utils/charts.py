@@ -0,0 +1,267 @@
+"""
+Gráficos do Dashboard e do Relatório Financeiro
+Vendas x despesas por dia e vendas por forma de pagamento, a partir dos
+consolidados diários
+
+Os gráficos são desenhados pelo backend Agg do matplotlib (sem janela, sem
+pyplot) e guardados em PNG no cache, por gráfico, período e carimbo de
+versão dos dados: o dashboard e o PDF do relatório financeiro usam o mesmo
+arquivo enquanto as vendas e despesas do período não mudam.
+
+O matplotlib só é importado ao desenhar o primeiro gráfico (em uma thread
+do TaskRunner ou na geração do relatório), nunca na abertura do programa.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+from datetime import datetime, time, timedelta
+from typing import Dict, Optional
+
+from src.utils.report_cache import ReportCache
+
+# Pasta dos gráficos em cache
+CHART_CACHE_DIR = os.getenv("CHART_CACHE_DIR", os.path.join("reports", ".cache", "charts"))
+
+# Tamanho máximo do cache de gráficos em disco (MB)
+CHART_CACHE_MAX_MB = float(os.getenv("CHART_CACHE_MAX_MB", "20"))
+
+# Tamanho (polegadas) e resolução dos gráficos: a mesma imagem serve ao
+# dashboard (reduzida) e ao PDF (17 cm de largura)
+CHART_SIZE = (8.0, 3.6)
+CHART_DPI = int(os.getenv("CHART_DPI", "120"))
+
+# Gráficos disponíveis e as tabelas de que dependem (carimbo de versão)
+CHART_TABLES = {
+    'trend': ('sales', 'expenses'),
+    'payment_mix': ('sales',),
+}
+
+PAYMENT_LABELS = {
+    'dinheiro': 'Dinheiro',
+    'cartao': 'Cartão',
+    'pix': 'PIX',
+    'outros': 'Outros',
+    '': 'Não informado',
+}
+
+SALES_COLOR = '#2ca02c'
+EXPENSES_COLOR = '#d62728'
+PAYMENT_COLORS = ['#1f77b4', '#ff7f0e', '#2ca02c', '#9467bd', '#8c564b', '#7f7f7f']
+
+# A montagem de fontes e o cache de texto do matplotlib não são seguros
+# entre threads: um gráfico desenhado por vez
+_render_lock = threading.Lock()
+
+
+class ChartCache(ReportCache):
+    """Cache LRU dos gráficos em PNG (usados direto do cache, sem cópia)"""
+    
+    SUFFIX = ".png"
+    
+    def __init__(self, cache_dir: str = None, max_bytes: int = None):
+        super().__init__(
+            cache_dir or CHART_CACHE_DIR,
+            max_bytes if max_bytes is not None else int(CHART_CACHE_MAX_MB * 2**20)
+        )
+    
+    def make_chart_key(self, db, chart: str, start_date, end_date) -> str:
+        """Chave do gráfico com o carimbo de versão atual dos dados do período"""
+        from src.controllers.data_version_controller import DataVersionController
+        
+        stamp = DataVersionController().get_stamp(db, CHART_TABLES[chart], start_date, end_date)
+        parts = [
+            str(db.get_bind().url),
+            chart,
+            start_date.isoformat() if start_date else "",
+            end_date.isoformat() if end_date else "",
+            f"{CHART_SIZE[0]}x{CHART_SIZE[1]}@{CHART_DPI}",
+            stamp
+        ]
+        return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+    
+    def lookup(self, key: str) -> Optional[str]:
+        """Caminho do gráfico em cache (marcado como usado) ou None"""
+        path = self._path(key)
+        try:
+            os.utime(path)  # Uso recente (LRU)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+    
+    def store(self, key: str, figure) -> str:
+        """Salva a figura no cache (arquivo temporário + replace) e retorna o caminho"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                figure.savefig(file, format="png", dpi=CHART_DPI)
+            path = self._path(key)
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        
+        self.evict()
+        return path
+
+
+_chart_cache = None
+
+
+def get_chart_cache() -> ChartCache:
+    """Retorna o cache de gráficos da aplicação"""
+    global _chart_cache
+    if _chart_cache is None:
+        _chart_cache = ChartCache()
+    return _chart_cache
+
+
+def get_chart(db, chart: str, start_date, end_date) -> str:
+    """
+    Caminho do PNG do gráfico no período, desenhado só se não estiver em cache
+    
+    Args:
+        chart: 'trend' (vendas x despesas por dia) ou 'payment_mix'
+            (vendas por forma de pagamento)
+    
+    Raises:
+        ValueError: Gráfico desconhecido
+    """
+    if chart not in CHART_TABLES:
+        raise ValueError(f"Gráfico desconhecido: {chart}")
+    
+    # Gráficos por dia: dias inteiros, e a chave de um período que vai "até
+    # agora" (relatório do mês corrente) não muda a cada geração
+    if start_date is not None:
+        start_date = datetime.combine(start_date.date(), time.min)
+    if end_date is not None:
+        end_date = datetime.combine(end_date.date(), time.max)
+    
+    cache = get_chart_cache()
+    # Carimbo lido antes das consultas (ver ReportCache.make_key)
+    key = cache.make_chart_key(db, chart, start_date, end_date)
+    path = cache.lookup(key)
+    if path is not None:
+        return path
+    
+    data = CHART_BUILDERS[chart][0](db, start_date, end_date)
+    with _render_lock:
+        figure = _new_figure()
+        CHART_BUILDERS[chart][1](figure, data)
+        return cache.store(key, figure)
+
+
+def get_charts(db, start_date, end_date) -> Dict[str, str]:
+    """Todos os gráficos do período: {gráfico: caminho do PNG}"""
+    return {chart: get_chart(db, chart, start_date, end_date) for chart in CHART_TABLES}
+
+
+# --- Dados (consolidados diários)
+
+def _trend_data(db, start_date, end_date) -> dict:
+    """Vendas líquidas e despesas de cada dia do período (dias sem movimento = 0)"""
+    from src.controllers.rollup_controller import RollupController
+    
+    rollups = RollupController()
+    sales = rollups.sales_totals(db, start_date, end_date, group_by=('day',))
+    expenses = rollups.expense_totals(db, start_date, end_date, group_by=('day',))
+    
+    if start_date is not None and end_date is not None:
+        first, last = start_date.date(), end_date.date()
+        days = [first + timedelta(days=offset) for offset in range((last - first).days + 1)]
+    else:
+        days = sorted(day for (day,) in set(sales) | set(expenses))
+    
+    return {
+        'days': days,
+        'sales': [float(sales.get((day,), {}).get('net_amount', 0)) for day in days],
+        'expenses': [float(expenses.get((day,), {}).get('total_amount', 0)) for day in days],
+    }
+
+
+def _payment_mix_data(db, start_date, end_date) -> dict:
+    """Vendas líquidas por forma de pagamento, da maior para a menor"""
+    from src.controllers.rollup_controller import RollupController
+    
+    totals = RollupController().sales_totals(db, start_date, end_date, group_by=('payment_method',))
+    mix = sorted(
+        ((PAYMENT_LABELS.get(method, method.capitalize()), float(values['net_amount']))
+         for (method,), values in totals.items() if values['net_amount'] > 0),
+        key=lambda item: item[1],
+        reverse=True
+    )
+    return {'labels': [label for label, _ in mix], 'values': [value for _, value in mix]}
+
+
+# --- Desenho (Figure + FigureCanvasAgg, sem o estado global do pyplot)
+
+def _new_figure():
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    
+    figure = Figure(figsize=CHART_SIZE, layout="constrained")
+    FigureCanvasAgg(figure)
+    return figure
+
+
+def _money(value, _position=None) -> str:
+    return f"R$ {value:,.0f}".replace(",", ".")
+
+
+def _draw_trend(figure, data: dict):
+    from matplotlib.dates import AutoDateLocator, DateFormatter
+    from matplotlib.ticker import FuncFormatter
+    
+    axes = figure.add_subplot()
+    axes.set_title("Vendas x Despesas por dia", fontsize=11)
+    
+    if not data['days']:
+        axes.text(0.5, 0.5, "Sem movimento no período", ha="center", va="center",
+                  transform=axes.transAxes, color="gray")
+        axes.set_axis_off()
+        return
+    
+    axes.plot(data['days'], data['sales'], color=SALES_COLOR, marker="o", markersize=3,
+              linewidth=1.8, label="Vendas")
+    axes.fill_between(data['days'], data['sales'], color=SALES_COLOR, alpha=0.12)
+    axes.plot(data['days'], data['expenses'], color=EXPENSES_COLOR, marker="o", markersize=3,
+              linewidth=1.8, label="Despesas")
+    
+    axes.xaxis.set_major_locator(AutoDateLocator(maxticks=10))
+    axes.xaxis.set_major_formatter(DateFormatter("%d/%m"))
+    axes.yaxis.set_major_formatter(FuncFormatter(_money))
+    axes.set_ylim(bottom=0)
+    axes.grid(axis="y", alpha=0.3)
+    axes.spines[['top', 'right']].set_visible(False)
+    axes.legend(loc="upper left", frameon=False, fontsize=9)
+
+
+def _draw_payment_mix(figure, data: dict):
+    axes = figure.add_subplot()
+    axes.set_title("Vendas por forma de pagamento", fontsize=11)
+    
+    if not data['values']:
+        axes.text(0.5, 0.5, "Sem vendas no período", ha="center", va="center",
+                  transform=axes.transAxes, color="gray")
+        axes.set_axis_off()
+        return
+    
+    total = sum(data['values'])
+    labels = [f"{label} ({value / total:.0%})" for label, value in zip(data['labels'], data['values'])]
+    axes.pie(data['values'], colors=PAYMENT_COLORS[:len(labels)], startangle=90,
+             counterclock=False, wedgeprops={'width': 0.45, 'edgecolor': 'white'})
+    axes.legend(labels, loc="center left", bbox_to_anchor=(1, 0.5), frameon=False, fontsize=9)
+    axes.text(0, 0, _money(total), ha="center", va="center", fontsize=10, fontweight="bold")
+    axes.set_aspect("equal")
+
+
+# Gráfico -> (consulta dos dados, desenho)
+CHART_BUILDERS = {
+    'trend': (_trend_data, _draw_trend),
+    'payment_mix': (_payment_mix_data, _draw_payment_mix),
+}
@@ -1,23 +1,37 @@
 """
 Utilitário para inicializar o banco de dados
-Cria as tabelas e usuário admin padrão
+Aplica as migrações e cria o usuário admin padrão
+
+Uso:
+    python src/utils/init_db.py            # migra até a última versão e cria dados padrão
+    python src/utils/init_db.py --migrate  # apenas aplica as migrações
 """
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
-from src.models.database import create_tables, SessionLocal
+from src.models.database import SessionLocal
+from src.models.migrations import upgrade_database, get_schema_version
 from src.models import User, SystemConfig
 from src.controllers.auth_controller import AuthController
 from datetime import datetime
 
+def migrate_database():
+    """Aplica as migrações pendentes do schema"""
+    current = get_schema_version()
+    revision = upgrade_database()
+    
+    if current == revision:
+        print(f"ℹ️  Schema já está na versão {revision}")
+    else:
+        print(f"✅ Schema migrado: {current or 'vazio'} → {revision}")
+
 def init_database():
     """Inicializa o banco de dados e cria dados padrão"""
     print("🔧 Inicializando banco de dados ChefConta...")
     
-    # Criar todas as tabelas
-    create_tables()
-    print("✅ Tabelas criadas com sucesso!")
+    # Aplicar migrações
+    migrate_database()
     
     # Criar sessão
     db = SessionLocal()
@@ -78,4 +92,7 @@ def init_database():
         db.close()
 
 if __name__ == "__main__":
-    init_database()
+    if "--migrate" in sys.argv:
+        migrate_database()
+    else:
+        init_database()
@@ -105,6 +105,10 @@ def create_colored_card(parent, title, value, subtitle, color, icon):
     )
     subtitle_label.pack(anchor="w", padx=25, pady=(0, 25))
     
+    # Permite atualizar o card sem recriá-lo
+    card.value_label = value_label
+    card.subtitle_label = subtitle_label
+    
     return card
 
 
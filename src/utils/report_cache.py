@@ -0,0 +1,187 @@
+"""
+Cache de Relatórios
+Arquivos já gerados, reaproveitados enquanto os dados do período não mudam
+
+A chave combina banco, tipo de relatório, período, formato e o carimbo de
+versão das tabelas do relatório (DataVersionController). Uma venda
+cancelada ou despesa lançada com data retroativa incrementa a versão do mês
+do documento e o relatório do período deixa de ser encontrado. O espaço em
+disco é limitado: os arquivos menos usados recentemente são removidos.
+
+Só períodos encerrados vão para o cache: os que terminam hoje (ou sem fim),
+como os atalhos "hoje" e "este mês" que vão até agora, mudam a cada geração.
+"""
+import hashlib
+import os
+from datetime import date, datetime, time
+import shutil
+import tempfile
+import threading
+from typing import Optional
+
+# Liga/desliga o cache de relatórios
+REPORT_CACHE_ENABLED = os.getenv("REPORT_CACHE_ENABLED", "1") not in ("0", "false", "False")
+
+# Pasta dos arquivos em cache
+REPORT_CACHE_DIR = os.getenv("REPORT_CACHE_DIR", os.path.join("reports", ".cache"))
+
+# Tamanho máximo do cache em disco (MB)
+REPORT_CACHE_MAX_MB = float(os.getenv("REPORT_CACHE_MAX_MB", "200"))
+
+# Tabelas de que cada relatório depende (cujas versões formam o carimbo).
+# O relatório de estoque fica fora: é a posição atual, com a data e hora da
+# geração no subtítulo, e uma cópia do cache mostraria a data antiga
+REPORT_TABLES = {
+    'sales': ('sales',),
+    'expenses': ('expenses',),
+    'purchases': ('purchases',),
+    'financial': ('sales', 'expenses'),
+}
+
+
+def is_open_period(end_date) -> bool:
+    """Indica se o período termina hoje ou depois (ou não tem fim)"""
+    return end_date is None or end_date >= datetime.combine(date.today(), time.min)
+
+
+class ReportCache:
+    """
+    Cache LRU de relatórios em disco
+    
+    O uso recente fica na data de modificação dos arquivos (atualizada a
+    cada acerto), então o cache é compartilhado entre processos (pacote
+    do mês) e sobrevive ao fechamento do programa.
+    """
+    
+    SUFFIX = ".report"
+    
+    def __init__(self, cache_dir: str = None, max_bytes: int = None):
+        self.cache_dir = cache_dir or REPORT_CACHE_DIR
+        self.max_bytes = max_bytes if max_bytes is not None else int(REPORT_CACHE_MAX_MB * 2**20)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def make_key(self, db, report_type: str, start_date, end_date, output_format: str) -> Optional[str]:
+        """
+        Chave do relatório com o carimbo de versão atual dos dados
+        
+        Deve ser lida antes das consultas do relatório: uma alteração
+        concorrente faz o arquivo ficar com um carimbo antigo (nunca o
+        contrário, o que serviria dados desatualizados).
+        
+        Returns:
+            Chave (hash) ou None se o tipo de relatório não é cacheável ou o
+            período ainda está aberto (termina hoje, no futuro ou sem fim)
+        """
+        from src.controllers.data_version_controller import DataVersionController
+        
+        tables = REPORT_TABLES.get(report_type)
+        if tables is None or is_open_period(end_date):
+            return None
+        
+        stamp = DataVersionController().get_stamp(db, tables, start_date, end_date)
+        parts = [
+            str(db.get_bind().url),
+            report_type,
+            start_date.isoformat() if start_date else "",
+            end_date.isoformat() if end_date else "",
+            output_format,
+            stamp
+        ]
+        return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+    
+    def get(self, key: str, filepath: str) -> bool:
+        """Copia o relatório em cache para filepath; False se não estiver em cache"""
+        cached = self._path(key)
+        try:
+            shutil.copyfile(cached, filepath)
+            os.utime(cached)  # Uso recente (LRU)
+        except FileNotFoundError:
+            self.misses += 1
+            return False
+        self.hits += 1
+        return True
+    
+    def put(self, key: str, filepath: str):
+        """Guarda uma cópia do relatório gerado e aplica o limite de espaço"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        
+        # Cópia temporária + replace: outro processo nunca lê um arquivo pela metade
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        os.close(fd)
+        try:
+            shutil.copyfile(filepath, temp_path)
+            os.replace(temp_path, self._path(key))
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        
+        self.evict()
+    
+    def evict(self):
+        """Remove os arquivos menos usados até o cache caber em max_bytes"""
+        with self._lock:
+            entries = []
+            for entry in self._entries():
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue  # Removido por outro processo
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+            
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+    
+    def clear(self):
+        """Esvazia o cache (após restaurar um backup: ver clear_caches)"""
+        for entry in self._entries():
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+    
+    def size(self) -> int:
+        """Espaço ocupado pelo cache (bytes)"""
+        return sum(entry.stat().st_size for entry in self._entries())
+    
+    def _entries(self):
+        if not os.path.isdir(self.cache_dir):
+            return []
+        return [entry for entry in os.scandir(self.cache_dir)
+                if entry.is_file() and entry.name.endswith(self.SUFFIX)]
+    
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}{self.SUFFIX}")
+
+
+_cache = None
+
+
+def get_report_cache() -> Optional[ReportCache]:
+    """Retorna o cache de relatórios da aplicação (None se desligado)"""
+    global _cache
+    if not REPORT_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        _cache = ReportCache()
+    return _cache
+
+
+def clear_caches():
+    """
+    Esvazia os relatórios e os gráficos em cache (ex.: após restaurar um
+    backup, quando os carimbos de versão voltam a valores já usados)
+    """
+    from src.utils.charts import get_chart_cache
+    
+    (get_report_cache() or ReportCache()).clear()
+    get_chart_cache().clear()
@@ -1,201 +1,539 @@
 """
 Gerador de Relatórios
-Gera relatórios em PDF e Excel
+Gera relatórios em PDF, Excel e CSV
+
+Todo relatório passa pelas mesmas três etapas:
+1. Consulta: linhas em projeção plana, lidas do banco em blocos (yield_per)
+2. Agregação: totais calculados pelo banco (consolidados diários/SQL)
+3. Renderização: PDF, XLSX ou CSV a partir do mesmo Report
+
+O reportlab e o openpyxl só são importados pelo renderizador que os usa.
 """
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from reportlab.lib.units import cm
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER, TA_RIGHT
+from dataclasses import dataclass, field
 from datetime import datetime
+from typing import Callable, Iterable, List, Optional
+import csv
 import os
 
-class ReportGenerator:
-    """Gerador de relatórios"""
+# Linhas por bloco de tabela nos relatórios longos (cada bloco fecha com subtotal)
+REPORT_CHUNK_ROWS = int(os.getenv("REPORT_CHUNK_ROWS", "500"))
+
+# Linhas buscadas por vez do banco ao gerar relatórios (yield_per)
+REPORT_YIELD_PER = int(os.getenv("REPORT_YIELD_PER", "1000"))
+
+# Formatos de número das planilhas
+MONEY_FORMAT = '"R$" #,##0.00'
+DATE_FORMAT = 'DD/MM/YYYY'
+DATETIME_FORMAT = 'DD/MM/YYYY HH:MM'
+QUANTITY_FORMAT = '#,##0.###'
+
+# Extensão do arquivo por formato de saída
+FORMAT_EXTENSIONS = {'pdf': 'pdf', 'xlsx': 'xlsx', 'csv': 'csv'}
+
+
+@dataclass(frozen=True)
+class ReportColumn:
+    """Coluna de uma seção do relatório"""
+    header: str
+    kind: str = 'text'  # text, date, datetime, money, quantity, integer
+    width: float = 3.0  # cm no PDF (também usada como largura no Excel)
+    pdf: bool = True  # False: só nas planilhas (PDF em A4 retrato)
+    formula: Optional[str] = None  # Fórmula do Excel no lugar do valor ({row} = linha)
+
+
+@dataclass(frozen=True)
+class ReportTotal:
+    """
+    Total de uma seção
     
-    def __init__(self, output_dir="reports"):
-        self.output_dir = output_dir
-        os.makedirs(output_dir, exist_ok=True)
-        self.styles = getSampleStyleSheet()
+    O valor vem da etapa de agregação (SQL); no Excel o total é escrito como
+    fórmula sobre as linhas: SUM/SUMIF na coluna `column` ou COUNTIF quando
+    function='COUNT', filtrando por match=(coluna, valor).
+    """
+    label: str
+    value: float
+    kind: str = 'money'
+    column: Optional[int] = None
+    match: Optional[tuple] = None
+    function: str = 'SUM'
+
+
+@dataclass
+class ReportSection:
+    """Tabela do relatório (uma aba no Excel)"""
+    title: str
+    columns: List[ReportColumn]
+    rows: Iterable[tuple]  # Consumido uma única vez
+    totals: List[ReportTotal] = field(default_factory=list)
+    subtotal_column: Optional[int] = None  # Subtotal acumulado dos blocos no PDF
+    subtotal_when: Optional[Callable[[tuple], bool]] = None  # Linhas somadas (padrão: todas)
+    summary: bool = False  # Quadro de resumo: última linha destacada, sem blocos
+    row_count: Optional[int] = None  # Linhas previstas (contagem do consolidado), para o progresso
+
+
+@dataclass
+class Report:
+    """Relatório pronto para renderizar"""
+    report_type: str
+    title: str
+    subtitle: str
+    color: str
+    sections: List[ReportSection]
+    images: List[str] = field(default_factory=list)  # Gráficos em PNG (só no PDF)
+
+
+# --- Etapas de consulta e agregação (uma função por tipo de relatório)
+
+def _period_text(start_date, end_date) -> str:
+    return f"Período: {start_date.strftime('%d/%m/%Y')} a {end_date.strftime('%d/%m/%Y')}"
+
+
+def _sales_section(db, start_date, end_date) -> ReportSection:
+    """Vendas do período; totais pelo consolidado diário"""
+    from src.controllers.sales_controller import SalesController
+    from src.controllers.rollup_controller import RollupController
     
-    def generate_sales_report(self, sales_data, start_date, end_date):
-        """Gera relatório de vendas em PDF"""
-        filename = f"relatorio_vendas_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-        filepath = os.path.join(self.output_dir, filename)
-        
-        doc = SimpleDocTemplate(filepath, pagesize=A4)
-        story = []
-        
-        # Título
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=self.styles['Heading1'],
-            fontSize=20,
-            textColor=colors.HexColor('#1f77b4'),
-            spaceAfter=30,
-            alignment=TA_CENTER
-        )
-        
-        title = Paragraph("Relatório de Vendas", title_style)
-        story.append(title)
-        
-        # Período
-        period_text = f"Período: {start_date.strftime('%d/%m/%Y')} a {end_date.strftime('%d/%m/%Y')}"
-        period = Paragraph(period_text, self.styles['Normal'])
-        story.append(period)
-        story.append(Spacer(1, 20))
-        
-        # Tabela de vendas
-        data = [['Nº Venda', 'Data', 'Cliente', 'Valor', 'Status']]
-        
-        for sale in sales_data:
-            data.append([
+    totals = RollupController().sales_totals(db, start_date, end_date)[()]
+    sales = SalesController().iter_sales(
+        db,
+        start_date=start_date,
+        end_date=end_date,
+        include_cancelled=True,
+        yield_per=REPORT_YIELD_PER
+    )
+    
+    return ReportSection(
+        title="Vendas",
+        columns=[
+            ReportColumn('Nº Venda', width=3),
+            ReportColumn('Data', 'datetime', width=2.5),
+            ReportColumn('Cliente', width=6),
+            ReportColumn('Pagamento', pdf=False),
+            ReportColumn('Total', 'money', pdf=False),
+            ReportColumn('Desconto', 'money', pdf=False),
+            ReportColumn('Valor', 'money', width=3),
+            ReportColumn('Status', width=2.5)
+        ],
+        rows=(
+            (
                 sale.sale_number,
-                sale.sale_date.strftime('%d/%m/%Y'),
-                sale.customer.name if sale.customer else 'N/A',
-                f"R$ {sale.final_amount:.2f}",
+                sale.sale_date,
+                sale.customer_name or 'N/A',
+                sale.payment_method,
+                sale.total_amount,
+                sale.discount,
+                sale.final_amount,
                 'Cancelada' if sale.is_cancelled else 'OK'
-            ])
-        
-        table = Table(data, colWidths=[3*cm, 2.5*cm, 6*cm, 3*cm, 2.5*cm])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1f77b4')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        story.append(table)
-        story.append(Spacer(1, 20))
-        
-        # Total
-        total = sum(s.final_amount for s in sales_data if not s.is_cancelled)
-        total_text = f"<b>Total de Vendas: R$ {total:.2f}</b>"
-        total_para = Paragraph(total_text, self.styles['Normal'])
-        story.append(total_para)
+            )
+            for sale in sales
+        ),
+        totals=[
+            ReportTotal('Total de Vendas', float(totals['net_amount']), column=6, match=(7, 'OK')),
+            ReportTotal('Vendas Canceladas', float(totals['cancelled_amount']), column=6, match=(7, 'Cancelada')),
+            ReportTotal('Quantidade de Vendas', totals['sales_count'], 'integer',
+                        match=(7, 'OK'), function='COUNT')
+        ],
+        subtotal_column=6,
+        subtotal_when=lambda row: row[7] == 'OK',
+        row_count=totals['sales_count'] + totals['cancelled_count']
+    )
+
+
+def _expenses_section(db, start_date, end_date) -> ReportSection:
+    """Despesas do período; totais pelo consolidado diário"""
+    from src.controllers.expense_controller import ExpenseController
+    from src.controllers.rollup_controller import RollupController
+    
+    totals = RollupController().expense_totals(db, start_date, end_date)[()]
+    total_amount = float(totals['total_amount'])
+    paid_amount = float(totals['paid_amount'])
+    expenses = ExpenseController().iter_expenses(
+        db,
+        start_date=start_date,
+        end_date=end_date,
+        yield_per=REPORT_YIELD_PER
+    )
+    
+    return ReportSection(
+        title="Despesas",
+        columns=[
+            ReportColumn('Nº Despesa', width=2.5),
+            ReportColumn('Data', 'date', width=2),
+            ReportColumn('Tipo', width=2.5),
+            ReportColumn('Descrição', width=5),
+            ReportColumn('Fornecedor', pdf=False),
+            ReportColumn('Valor', 'money', width=2.5),
+            ReportColumn('Vencimento', 'date', pdf=False),
+            ReportColumn('Status', width=2.5)
+        ],
+        rows=(
+            (
+                expense.expense_number,
+                expense.expense_date,
+                expense.expense_type,
+                expense.description,
+                expense.supplier_name,
+                expense.amount,
+                expense.due_date,
+                'Paga' if expense.paid else 'Pendente'
+            )
+            for expense in expenses
+        ),
+        totals=[
+            ReportTotal('Total de Despesas', total_amount, column=5),
+            ReportTotal('Despesas Pagas', paid_amount, column=5, match=(7, 'Paga')),
+            ReportTotal('Despesas Pendentes', total_amount - paid_amount, column=5, match=(7, 'Pendente'))
+        ],
+        subtotal_column=5,
+        row_count=totals['expense_count']
+    )
+
+
+def _sales_report(db, start_date, end_date) -> Report:
+    return Report('sales', "Relatório de Vendas", _period_text(start_date, end_date),
+                  '#1f77b4', [_sales_section(db, start_date, end_date)])
+
+
+def _expenses_report(db, start_date, end_date) -> Report:
+    return Report('expenses', "Relatório de Despesas", _period_text(start_date, end_date),
+                  '#d62728', [_expenses_section(db, start_date, end_date)])
+
+
+def _purchases_report(db, start_date, end_date) -> Report:
+    """Compras do período; totais pelo consolidado diário"""
+    from src.controllers.purchase_controller import PurchaseController
+    from src.controllers.rollup_controller import RollupController
+    
+    totals = RollupController().purchase_totals(db, start_date, end_date)[()]
+    # Projeção plana: fornecedor e quantidade de itens na mesma consulta
+    purchases = PurchaseController().iter_purchases(
+        db,
+        start_date=start_date,
+        end_date=end_date,
+        yield_per=REPORT_YIELD_PER
+    )
+    
+    section = ReportSection(
+        title="Compras",
+        columns=[
+            ReportColumn('Nº Compra', width=3),
+            ReportColumn('Data', 'date', width=2.5),
+            ReportColumn('Fornecedor', width=4.5),
+            ReportColumn('Valor', 'money', width=3),
+            ReportColumn('Itens', 'integer', width=2)
+        ],
+        rows=(
+            (
+                purchase.purchase_number,
+                purchase.purchase_date,
+                purchase.supplier_name or 'N/A',
+                purchase.total_amount,
+                purchase.item_count
+            )
+            for purchase in purchases
+        ),
+        totals=[
+            ReportTotal('Total de Compras', float(totals['total_amount']), column=3),
+            ReportTotal('Quantidade de Compras', totals['purchase_count'], 'integer',
+                        column=0, function='COUNT')
+        ],
+        subtotal_column=3,
+        row_count=totals['purchase_count']
+    )
+    return Report('purchases', "Relatório de Compras", _period_text(start_date, end_date),
+                  '#1f77b4', [section])
+
+
+def _stock_report(db, start_date, end_date) -> Report:
+    """
+    Posição atual do estoque pelo custo médio ponderado; valores totais e
+    itens em baixa calculados no SQL (duas consultas, qualquer quantidade de
+    produtos)
+    """
+    from src.controllers.product_controller import ProductController
+    
+    controller = ProductController()
+    totals = controller.get_stock_summary(db)
+    products = controller.iter_products(db, yield_per=REPORT_YIELD_PER)
+    
+    section = ReportSection(
+        title="Estoque",
+        columns=[
+            ReportColumn('Código', width=2),
+            ReportColumn('Produto', width=3.5),
+            ReportColumn('Categoria', pdf=False),
+            ReportColumn('Quantidade', 'quantity', width=1.8),
+            ReportColumn('Estoque Mínimo', 'quantity', pdf=False),
+            ReportColumn('Custo Médio', 'money', width=2.2),
+            ReportColumn('Valor (Custo)', 'money', width=2.5, formula="=D{row}*F{row}"),
+            ReportColumn('Preço Venda', 'money', width=2),
+            ReportColumn('Valor (Venda)', 'money', pdf=False, formula="=D{row}*H{row}"),
+            ReportColumn('Status', width=1.5)
+        ],
+        rows=(
+            (
+                product.code,
+                product.name,
+                product.category_name,
+                product.stock_quantity,
+                product.min_stock,
+                product.average_cost,
+                product.stock_quantity * product.average_cost,
+                product.sale_price,
+                product.stock_quantity * product.sale_price,
+                'Baixo' if product.stock_quantity <= product.min_stock else 'OK'
+            )
+            for product in products
+        ),
+        totals=[
+            ReportTotal('Valor do Estoque (custo médio)', totals['cost_value'], column=6),
+            ReportTotal('Valor do Estoque (preço de venda)', totals['stock_value'], column=8),
+            ReportTotal('Produtos em Baixa', totals['low_stock_count'], 'integer',
+                        match=(9, 'Baixo'), function='COUNT')
+        ],
+        subtotal_column=6,
+        row_count=totals['product_count']
+    )
+    return Report('stock', "Relatório de Estoque",
+                  f"Data do Relatório: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}",
+                  '#ff7f0e', [section])
+
+
+def _financial_report(db, start_date, end_date) -> Report:
+    """Receitas, despesas e saldo do período, todos vindos do consolidado, com gráficos"""
+    from src.controllers.rollup_controller import RollupController
+    from src.utils.charts import get_charts
+    
+    rollups = RollupController()
+    revenue = float(rollups.sales_totals(db, start_date, end_date)[()]['net_amount'])
+    expenses = float(rollups.expense_totals(db, start_date, end_date)[()]['total_amount'])
+    
+    section = ReportSection(
+        title="Resumo",
+        columns=[ReportColumn('Descrição', width=10), ReportColumn('Valor', 'money', width=5)],
+        rows=[
+            ('Receitas (Vendas)', revenue),
+            ('Despesas', expenses),
+            ('Saldo', revenue - expenses)
+        ],
+        summary=True,
+        row_count=3
+    )
+    # Os mesmos PNGs do dashboard (cache por período e versão dos dados)
+    charts = get_charts(db, start_date, end_date)
+    return Report('financial', "Relatório Financeiro Consolidado",
+                  _period_text(start_date, end_date), '#2ca02c', [section],
+                  images=list(charts.values()))
+
+
+REPORT_BUILDERS = {
+    'sales': _sales_report,
+    'expenses': _expenses_report,
+    'financial': _financial_report,
+    'stock': _stock_report,
+    'purchases': _purchases_report,
+}
+
+
+def build_report(db, report_type: str, start_date, end_date) -> Report:
+    """
+    Monta o relatório: totais já calculados e linhas prontas para serem lidas
+    
+    Raises:
+        ValueError: Tipo de relatório desconhecido
+    """
+    if report_type not in REPORT_BUILDERS:
+        raise ValueError(f"Tipo de relatório desconhecido: {report_type}")
+    return REPORT_BUILDERS[report_type](db, start_date, end_date)
+
+
+# --- Renderização
+
+def format_value(value, kind: str) -> str:
+    """Texto de um valor no PDF"""
+    if value is None:
+        return ''
+    if kind == 'money':
+        return f"R$ {value:.2f}"
+    if kind in ('date', 'datetime'):
+        return value.strftime('%d/%m/%Y')
+    if kind == 'quantity':
+        return f"{value:g}"
+    return str(value)
+
+
+class FlowableStream(list):
+    """
+    História do documento gerada sob demanda
+    
+    O doc.build do reportlab consome a lista pela frente (len, [0], del [0]);
+    aqui ela é reabastecida a partir de um gerador sempre que consultada,
+    mantendo só alguns flowables em memória em vez do relatório inteiro.
+    """
+    
+    def __init__(self, flowables, lookahead: int = 4):
+        super().__init__()
+        self._source = iter(flowables)
+        self._lookahead = lookahead
+    
+    def __len__(self):
+        while self._source is not None and super().__len__() < self._lookahead:
+            try:
+                self.append(next(self._source))
+            except StopIteration:
+                self._source = None
+        return super().__len__()
+
+
+class PdfRenderer:
+    """PDF em A4 com tabelas em blocos de LongTable (memória limitada)"""
+    
+    def __init__(self, chunk_rows: int = None):
+        from reportlab.lib.styles import getSampleStyleSheet
         
-        doc.build(story)
-        return filepath
+        self.chunk_rows = chunk_rows or REPORT_CHUNK_ROWS
+        self.styles = getSampleStyleSheet()
     
-    def generate_expenses_report(self, expenses_data, start_date, end_date):
-        """Gera relatório de despesas em PDF"""
-        filename = f"relatorio_despesas_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-        filepath = os.path.join(self.output_dir, filename)
+    def render(self, report: Report, filepath: str) -> str:
+        from reportlab.lib.pagesizes import A4
+        from reportlab.platypus import SimpleDocTemplate
         
         doc = SimpleDocTemplate(filepath, pagesize=A4)
-        story = []
+        doc.build(FlowableStream(self._story(report)))
+        return filepath
+    
+    def _story(self, report: Report):
+        """Flowables do relatório, gerados conforme o PDF é montado"""
+        from reportlab.lib import colors
+        from reportlab.lib.enums import TA_CENTER
+        from reportlab.lib.styles import ParagraphStyle
+        from reportlab.platypus import Paragraph, Spacer
         
-        # Título
         title_style = ParagraphStyle(
             'CustomTitle',
             parent=self.styles['Heading1'],
             fontSize=20,
-            textColor=colors.HexColor('#d62728'),
+            textColor=colors.HexColor(report.color),
             spaceAfter=30,
             alignment=TA_CENTER
         )
         
-        title = Paragraph("Relatório de Despesas", title_style)
-        story.append(title)
-        
-        # Período
-        period_text = f"Período: {start_date.strftime('%d/%m/%Y')} a {end_date.strftime('%d/%m/%Y')}"
-        period = Paragraph(period_text, self.styles['Normal'])
-        story.append(period)
-        story.append(Spacer(1, 20))
+        yield Paragraph(report.title, title_style)
+        yield Paragraph(report.subtitle, self.styles['Normal'])
+        yield Spacer(1, 20)
         
-        # Tabela de despesas
-        data = [['Nº Despesa', 'Data', 'Tipo', 'Descrição', 'Valor', 'Status']]
-        
-        for expense in expenses_data:
-            data.append([
-                expense.expense_number,
-                expense.expense_date.strftime('%d/%m/%Y'),
-                expense.expense_type,
-                expense.description[:30] + '...' if len(expense.description) > 30 else expense.description,
-                f"R$ {expense.amount:.2f}",
-                'Pago' if expense.paid else 'Pendente'
-            ])
+        for section in report.sections:
+            if section.summary:
+                yield self._summary_table(report, section)
+                continue
+            
+            yield from self._stream_table(report, section)
+            yield Spacer(1, 20)
+            
+            if section.totals:
+                totals_text = "<br/>".join(
+                    f"<b>{total.label}: {format_value(total.value, total.kind)}</b>"
+                    for total in section.totals
+                )
+                yield Paragraph(totals_text, self.styles['Normal'])
+        
+        for path in report.images:
+            yield Spacer(1, 20)
+            yield self._image(path)
+    
+    @staticmethod
+    def _image(path: str):
+        """Gráfico na largura útil da página, mantendo a proporção"""
+        from reportlab.lib.units import cm
+        from reportlab.lib.utils import ImageReader
+        from reportlab.platypus import Image
+        
+        width, height = ImageReader(path).getSize()
+        return Image(path, width=17 * cm, height=17 * cm * height / width)
+    
+    def _table_style(self, report: Report) -> list:
+        from reportlab.lib import colors
         
-        table = Table(data, colWidths=[2.5*cm, 2*cm, 2.5*cm, 5*cm, 2.5*cm, 2.5*cm])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#d62728')),
+        return [
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor(report.color)),
             ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
             ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
             ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
+            ('FONTSIZE', (0, 0), (-1, 0), 11),
+            ('FONTSIZE', (0, 1), (-1, -1), 9),
             ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
             ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('FONTSIZE', (0, 1), (-1, -1), 9),
-        ]))
-        
-        story.append(table)
-        story.append(Spacer(1, 20))
-        
-        # Totais
-        total = sum(e.amount for e in expenses_data)
-        paid = sum(e.amount for e in expenses_data if e.paid)
-        pending = sum(e.amount for e in expenses_data if not e.paid)
-        
-        totals_text = f"""
-        <b>Total de Despesas: R$ {total:.2f}</b><br/>
-        <b>Despesas Pagas: R$ {paid:.2f}</b><br/>
-        <b>Despesas Pendentes: R$ {pending:.2f}</b>
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ]
+    
+    def _stream_table(self, report: Report, section: ReportSection):
         """
-        totals_para = Paragraph(totals_text, self.styles['Normal'])
-        story.append(totals_para)
+        Gera a tabela em blocos de LongTable com cabeçalho repetido
         
-        doc.build(story)
-        return filepath
+        Cada bloco termina com o subtotal acumulado até ali, de modo que nem
+        as linhas nem a tabela inteira precisam ficar em memória.
+        """
+        from reportlab.lib import colors
+        from reportlab.lib.units import cm
+        from reportlab.platypus import LongTable, TableStyle
+        
+        visible = [index for index, column in enumerate(section.columns) if column.pdf]
+        header = [section.columns[index].header for index in visible]
+        widths = [section.columns[index].width * cm for index in visible]
+        has_subtotal = section.subtotal_column in visible
+        
+        subtotal = 0.0
+        count = 0
+        chunk = []
+        
+        def make_table():
+            data = [header] + chunk
+            style = self._table_style(report)
+            if has_subtotal:
+                row = [''] * len(header)
+                row[0] = 'Subtotal acumulado'
+                row[visible.index(section.subtotal_column)] = format_value(subtotal, 'money')
+                data.append(row)
+                style += [
+                    ('BACKGROUND', (0, -1), (-1, -1), colors.lightgrey),
+                    ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+                    ('ALIGN', (0, -1), (0, -1), 'LEFT'),
+                ]
+            table = LongTable(data, colWidths=widths, repeatRows=1)
+            table.setStyle(TableStyle(style))
+            return table
+        
+        for row in section.rows:
+            chunk.append([
+                format_value(row[index], section.columns[index].kind)[:40]
+                for index in visible
+            ])
+            count += 1
+            if has_subtotal and (section.subtotal_when is None or section.subtotal_when(row)):
+                subtotal += row[section.subtotal_column] or 0.0
+            if len(chunk) >= self.chunk_rows:
+                yield make_table()
+                chunk = []
+        
+        if chunk or not count:
+            yield make_table()
     
-    def generate_financial_report(self, sales_data, expenses_data, start_date, end_date):
-        """Gera relatório financeiro consolidado em PDF"""
-        filename = f"relatorio_financeiro_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-        filepath = os.path.join(self.output_dir, filename)
-        
-        doc = SimpleDocTemplate(filepath, pagesize=A4)
-        story = []
-        
-        # Título
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=self.styles['Heading1'],
-            fontSize=22,
-            textColor=colors.HexColor('#2ca02c'),
-            spaceAfter=30,
-            alignment=TA_CENTER
-        )
-        
-        title = Paragraph("Relatório Financeiro Consolidado", title_style)
-        story.append(title)
-        
-        # Período
-        period_text = f"Período: {start_date.strftime('%d/%m/%Y')} a {end_date.strftime('%d/%m/%Y')}"
-        period = Paragraph(period_text, self.styles['Normal'])
-        story.append(period)
-        story.append(Spacer(1, 30))
-        
-        # Resumo Financeiro
-        total_revenue = sum(s.final_amount for s in sales_data if not s.is_cancelled)
-        total_expenses = sum(e.amount for e in expenses_data)
-        balance = total_revenue - total_expenses
-        
-        summary_data = [
-            ['Descrição', 'Valor'],
-            ['Receitas (Vendas)', f"R$ {total_revenue:.2f}"],
-            ['Despesas', f"R$ {total_expenses:.2f}"],
-            ['Saldo', f"R$ {balance:.2f}"]
+    def _summary_table(self, report: Report, section: ReportSection):
+        """Quadro de resumo; a última linha (saldo) fica verde ou vermelha"""
+        from reportlab.lib import colors
+        from reportlab.lib.units import cm
+        from reportlab.platypus import Table, TableStyle
+        
+        rows = list(section.rows)
+        data = [[column.header for column in section.columns]] + [
+            [format_value(value, column.kind) for value, column in zip(row, section.columns)]
+            for row in rows
         ]
+        last_value = rows[-1][-1] if rows else 0
         
-        summary_table = Table(summary_data, colWidths=[10*cm, 5*cm])
-        summary_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2ca02c')),
+        table = Table(data, colWidths=[column.width * cm for column in section.columns])
+        table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor(report.color)),
             ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
             ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
             ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
@@ -203,216 +541,306 @@ class ReportGenerator:
             ('FONTSIZE', (0, 0), (-1, -1), 12),
             ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
             ('BACKGROUND', (0, 1), (-1, -2), colors.beige),
-            ('BACKGROUND', (0, -1), (-1, -1), colors.lightgreen if balance >= 0 else colors.lightcoral),
+            ('BACKGROUND', (0, -1), (-1, -1), colors.lightgreen if last_value >= 0 else colors.lightcoral),
             ('GRID', (0, 0), (-1, -1), 1, colors.black),
             ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
         ]))
+        return table
+
+
+class XlsxRenderer:
+    """
+    Excel no modo write-only do openpyxl
+    
+    As linhas são gravadas direto no arquivo, sem manter a planilha em
+    memória. Valores e datas são células tipadas e os totais são fórmulas.
+    """
+    
+    NUMBER_FORMATS = {
+        'money': MONEY_FORMAT,
+        'date': DATE_FORMAT,
+        'datetime': DATETIME_FORMAT,
+        'quantity': QUANTITY_FORMAT,
+    }
+    
+    def render(self, report: Report, filepath: str) -> str:
+        from openpyxl import Workbook
         
-        story.append(summary_table)
-        
-        doc.build(story)
+        workbook = Workbook(write_only=True)
+        for section in report.sections:
+            self._write_section(workbook, report, section)
+        workbook.save(filepath)
         return filepath
     
-    def generate_expenses_report_complete(self, db, start_date, end_date, filepath):
-        """Gera relatório de despesas em PDF"""
-        from src.models import Expense
-        
-        expenses = db.query(Expense).filter(
-            Expense.expense_date >= start_date,
-            Expense.expense_date <= end_date
-        ).all()
-        
-        doc = SimpleDocTemplate(filepath, pagesize=A4)
-        story = []
-        
-        # Título
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=self.styles['Heading1'],
-            fontSize=20,
-            textColor=colors.HexColor('#d62728'),
-            spaceAfter=30,
-            alignment=TA_CENTER
-        )
-        
-        title = Paragraph("Relatório de Despesas", title_style)
-        story.append(title)
-        
-        # Período
-        period_text = f"Período: {start_date.strftime('%d/%m/%Y')} a {end_date.strftime('%d/%m/%Y')}"
-        period = Paragraph(period_text, self.styles['Normal'])
-        story.append(period)
-        story.append(Spacer(1, 20))
-        
-        # Tabela de despesas
-        data = [['Nº Despesa', 'Data', 'Tipo', 'Descrição', 'Valor', 'Status']]
-        
-        for expense in expenses:
-            data.append([
-                expense.expense_number,
-                expense.expense_date.strftime('%d/%m/%Y'),
-                expense.expense_type.upper(),
-                expense.description[:30],
-                f"R$ {expense.amount:.2f}",
-                'Paga ✓' if expense.paid else 'Pendente'
+    def _write_section(self, workbook, report: Report, section: ReportSection):
+        from openpyxl.utils import get_column_letter
+        
+        sheet = workbook.create_sheet(section.title)
+        for index, column in enumerate(section.columns, start=1):
+            sheet.column_dimensions[get_column_letter(index)].width = max(column.width * 4.5, 10)
+        sheet.freeze_panes = "A2"
+        sheet.append([self._cell(sheet, column.header, bold=True) for column in section.columns])
+        
+        formats = [self.NUMBER_FORMATS.get(column.kind) for column in section.columns]
+        # No quadro de resumo (poucas linhas) a última linha (saldo) fica em negrito
+        rows = list(section.rows) if section.summary else section.rows
+        bold_row = len(rows) + 1 if section.summary else None
+        last = 1
+        for row in rows:
+            last += 1
+            values = [
+                column.formula.format(row=last) if column.formula else value
+                for value, column in zip(row, section.columns)
+            ]
+            sheet.append([
+                self._cell(sheet, value, number_format, bold=last == bold_row)
+                if number_format or last == bold_row else value
+                for value, number_format in zip(values, formats)
             ])
         
-        table = Table(data, colWidths=[2.5*cm, 2.5*cm, 2*cm, 4*cm, 2.5*cm, 2.5*cm])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#d62728')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
+        if section.totals:
+            sheet.append([])
+            for total in section.totals:
+                self._append_total(sheet, section, total, last)
         
-        story.append(table)
-        story.append(Spacer(1, 20))
-        
-        # Total
-        total = sum(e.amount for e in expenses)
-        total_text = f"<b>Total de Despesas: R$ {total:.2f}</b>"
-        total_para = Paragraph(total_text, self.styles['Normal'])
-        story.append(total_para)
-        
-        doc.build(story)
+        if section.summary:
+            sheet.append([])
+            sheet.append([report.subtitle])
+    
+    def _append_total(self, sheet, section: ReportSection, total: ReportTotal, last: int):
+        """Total como fórmula sobre as linhas (ou o valor agregado, se não houver linhas)"""
+        value = self._total_formula(total, last) or total.value
+        
+        # Totais alinhados na coluna do subtotal, com o rótulo à esquerda
+        value_column = section.subtotal_column
+        if value_column is None:
+            value_column = total.column if total.column is not None else len(section.columns) - 1
+        value_column = max(value_column, 1)
+        row = [None] * (value_column + 1)
+        row[value_column - 1] = self._cell(sheet, total.label, bold=True)
+        row[value_column] = self._cell(sheet, value, self.NUMBER_FORMATS.get(total.kind), bold=True)
+        sheet.append(row)
+    
+    @staticmethod
+    def _total_formula(total: ReportTotal, last: int) -> Optional[str]:
+        """Fórmula SUM/SUMIF/COUNTA/COUNTIF do total sobre as linhas 2..last"""
+        if last < 2:
+            return None  # Sem linhas: o intervalo incluiria o cabeçalho
+        
+        from openpyxl.utils import get_column_letter
+        
+        def column_range(index):
+            letter = get_column_letter(index + 1)
+            return f"{letter}2:{letter}{last}"
+        
+        if total.function == 'COUNT':
+            if total.match:
+                return f'=COUNTIF({column_range(total.match[0])},"{total.match[1]}")'
+            if total.column is not None:
+                return f"=COUNTA({column_range(total.column)})"
+            return None
+        
+        if total.column is None:
+            return None
+        if total.match:
+            return (f'=SUMIF({column_range(total.match[0])},"{total.match[1]}",'
+                    f'{column_range(total.column)})')
+        return f"=SUM({column_range(total.column)})"
+    
+    @staticmethod
+    def _cell(sheet, value, number_format=None, bold=False):
+        """Célula do modo write-only com formato de número e/ou negrito"""
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font
+        
+        cell = WriteOnlyCell(sheet, value=value)
+        if number_format:
+            cell.number_format = number_format
+        if bold:
+            cell.font = Font(bold=True)
+        return cell
+
+
+class CsvRenderer:
+    """
+    CSV no padrão das planilhas em português: separador ';', vírgula
+    decimal e BOM UTF-8 (acentos corretos ao abrir no Excel)
+    
+    Relatórios com mais de uma seção gravam as seções em sequência,
+    separadas por uma linha em branco.
+    """
+    
+    def render(self, report: Report, filepath: str) -> str:
+        with open(filepath, 'w', newline='', encoding='utf-8-sig') as file:
+            writer = csv.writer(file, delimiter=';')
+            for position, section in enumerate(report.sections):
+                if position:
+                    writer.writerow([])
+                self._write_section(writer, section)
         return filepath
     
-    def generate_stock_report(self, db, start_date, end_date, filepath):
-        """Gera relatório de estoque em PDF"""
-        from src.models import Product
-        
-        products = db.query(Product).all()
-        
-        doc = SimpleDocTemplate(filepath, pagesize=A4)
-        story = []
-        
-        # Título
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=self.styles['Heading1'],
-            fontSize=20,
-            textColor=colors.HexColor('#ff7f0e'),
-            spaceAfter=30,
-            alignment=TA_CENTER
-        )
-        
-        title = Paragraph("Relatório de Estoque", title_style)
-        story.append(title)
-        
-        # Período
-        period_text = f"Data do Relatório: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}"
-        period = Paragraph(period_text, self.styles['Normal'])
-        story.append(period)
-        story.append(Spacer(1, 20))
-        
-        # Tabela de estoque
-        data = [['Código', 'Produto', 'Quantidade', 'Preço Unit.', 'Valor Total', 'Status']]
-        
-        total_value = 0
-        for product in products:
-            status = 'Baixo ⚠️' if product.quantity < product.min_quantity else 'OK ✓'
-            value = product.quantity * product.sale_price
-            total_value += value
-            
-            data.append([
-                product.code,
-                product.name[:20],
-                str(product.quantity),
-                f"R$ {product.sale_price:.2f}",
-                f"R$ {value:.2f}",
-                status
+    def _write_section(self, writer, section: ReportSection):
+        writer.writerow([column.header for column in section.columns])
+        for row in section.rows:
+            writer.writerow([
+                self._format(value, column.kind)
+                for value, column in zip(row, section.columns)
             ])
         
-        table = Table(data, colWidths=[2*cm, 4*cm, 2*cm, 2.5*cm, 2.5*cm, 2.5*cm])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#ff7f0e')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        story.append(table)
-        story.append(Spacer(1, 20))
-        
-        # Total
-        total_text = f"<b>Valor Total do Estoque: R$ {total_value:.2f}</b>"
-        total_para = Paragraph(total_text, self.styles['Normal'])
-        story.append(total_para)
-        
-        doc.build(story)
-        return filepath
+        if section.totals:
+            writer.writerow([])
+            for total in section.totals:
+                writer.writerow([total.label, self._format(total.value, total.kind)])
     
-    def generate_purchases_report(self, db, start_date, end_date, filepath):
-        """Gera relatório de compras em PDF"""
-        from src.models import Purchase
-        
-        purchases = db.query(Purchase).filter(
-            Purchase.purchase_date >= start_date,
-            Purchase.purchase_date <= end_date
-        ).all()
-        
-        doc = SimpleDocTemplate(filepath, pagesize=A4)
-        story = []
-        
-        # Título
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=self.styles['Heading1'],
-            fontSize=20,
-            textColor=colors.HexColor('#1f77b4'),
-            spaceAfter=30,
-            alignment=TA_CENTER
-        )
-        
-        title = Paragraph("Relatório de Compras", title_style)
-        story.append(title)
-        
-        # Período
-        period_text = f"Período: {start_date.strftime('%d/%m/%Y')} a {end_date.strftime('%d/%m/%Y')}"
-        period = Paragraph(period_text, self.styles['Normal'])
-        story.append(period)
-        story.append(Spacer(1, 20))
-        
-        # Tabela de compras
-        data = [['Nº Compra', 'Data', 'Fornecedor', 'Valor', 'Itens']]
-        
-        for purchase in purchases:
-            data.append([
-                purchase.purchase_number,
-                purchase.purchase_date.strftime('%d/%m/%Y'),
-                purchase.supplier or 'N/A',
-                f"R$ {purchase.total_amount:.2f}",
-                str(len(purchase.items) if hasattr(purchase, 'items') else 0)
-            ])
+    @staticmethod
+    def _format(value, kind: str) -> str:
+        if value is None:
+            return ''
+        if kind in ('money', 'quantity'):
+            text = f"{value:.2f}" if kind == 'money' else f"{value:g}"
+            return text.replace('.', ',')
+        if kind == 'date':
+            return value.strftime('%d/%m/%Y')
+        if kind == 'datetime':
+            return value.strftime('%d/%m/%Y %H:%M')
+        return str(value)
+
+
+RENDERERS = {
+    'pdf': PdfRenderer,
+    'xlsx': XlsxRenderer,
+    'csv': CsvRenderer,
+}
+
+
+def normalize_format(output_format: str) -> str:
+    """Formato de saída canônico ('excel' é aceito como 'xlsx')"""
+    output_format = (output_format or 'pdf').lower()
+    if output_format == 'excel':
+        output_format = 'xlsx'
+    if output_format not in RENDERERS:
+        raise ValueError(f"Formato de relatório desconhecido: {output_format}")
+    return output_format
+
+
+class ReportGenerator:
+    """
+    Gerador de relatórios: consulta, agregação e renderização
+    
+    Com o cache ligado, um relatório cujo período não teve alterações desde
+    a última geração é copiado do cache, sem consultar nem renderizar.
+    """
+    
+    def __init__(self, output_dir="reports", chunk_rows: int = None, use_cache: bool = True):
+        from src.utils.report_cache import get_report_cache
         
-        table = Table(data, colWidths=[3*cm, 2.5*cm, 4.5*cm, 3*cm, 2*cm])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1f77b4')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
+        self.output_dir = output_dir
+        os.makedirs(output_dir, exist_ok=True)
+        self.chunk_rows = chunk_rows
+        self.cache = get_report_cache() if use_cache else None
+    
+    def generate(self, db, report_type: str, start_date, end_date,
+                 filepath: str = None, output_format: str = "pdf", task=None) -> str:
+        """
+        Gera o relatório no formato informado
         
-        story.append(table)
-        story.append(Spacer(1, 20))
+        Args:
+            report_type: sales, expenses, financial, stock ou purchases
+            filepath: Arquivo de saída (padrão: output_dir/relatorio_<tipo>_<data>)
+            output_format: pdf, xlsx (ou excel) ou csv
+            task: Task/ProcessTask do TaskRunner: recebe o progresso (linhas
+                processadas / previstas) e é verificada a cada bloco de linhas
         
-        # Total
-        total = sum(p.total_amount for p in purchases)
-        total_text = f"<b>Total de Compras: R$ {total:.2f}</b>"
-        total_para = Paragraph(total_text, self.styles['Normal'])
-        story.append(total_para)
+        Returns:
+            Caminho do arquivo gerado
         
-        doc.build(story)
+        Raises:
+            TaskCancelled: Geração cancelada (o arquivo parcial é removido)
+        """
+        output_format = normalize_format(output_format)
+        if filepath is None:
+            filename = (f"relatorio_{report_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+                        f".{FORMAT_EXTENSIONS[output_format]}")
+            filepath = os.path.join(self.output_dir, filename)
+        
+        # Carimbo lido antes das consultas (ver ReportCache.make_key)
+        cache_key = None
+        if self.cache is not None:
+            cache_format = output_format
+            if output_format == 'pdf':
+                cache_format += f":{self.chunk_rows or REPORT_CHUNK_ROWS}"
+            cache_key = self.cache.make_key(db, report_type, start_date, end_date, cache_format)
+            if cache_key and self.cache.get(cache_key, filepath):
+                return filepath
+        
+        try:
+            report = build_report(db, report_type, start_date, end_date)
+            if task is not None:
+                self._track_progress(report, task)
+            self._renderer(output_format).render(report, filepath)
+        except Exception:
+            # Cancelado ou com erro: não deixar um arquivo pela metade
+            if os.path.exists(filepath):
+                os.remove(filepath)
+            raise
+        
+        if cache_key:
+            try:
+                self.cache.put(cache_key, filepath)
+            except OSError as e:
+                # Sem cache o relatório gerado continua válido
+                print(f"Erro ao gravar relatório no cache: {e}")
         return filepath
+    
+    def _track_progress(self, report: Report, task):
+        """
+        Envolve as linhas das seções: a cada bloco (chunk_rows linhas) o
+        progresso é informado e o cancelamento verificado
+        
+        O total previsto vem das contagens do consolidado, já lidas para os
+        totais; linhas inseridas durante a geração não passam de 99%. Os
+        quadros de resumo ficam como estão (os renderizadores os leem
+        inteiros).
+        """
+        tracked = [section for section in report.sections if not section.summary]
+        total = sum(section.row_count or 0 for section in tracked)
+        step = self.chunk_rows or REPORT_CHUNK_ROWS
+        done = 0
+        
+        def track(rows):
+            nonlocal done
+            for row in rows:
+                yield row
+                done += 1
+                if done % step == 0:
+                    task.check_cancelled()
+                    task.progress(min(done / total, 0.99) if total else 0.0,
+                                  f"{done} de {total} linhas")
+        
+        task.check_cancelled()
+        task.progress(0.0, f"0 de {total} linhas")
+        for section in tracked:
+            section.rows = track(section.rows)
+    
+    def _renderer(self, output_format: str):
+        if output_format == 'pdf':
+            return PdfRenderer(self.chunk_rows)
+        return RENDERERS[output_format]()
+
+
+def generate_report(db, report_type: str, start_date, end_date, filepath: str,
+                    output_format: str = "pdf", task=None):
+    """
+    Gera o relatório do tipo informado (função de módulo, executável no
+    pool de processos do TaskRunner com sessão própria do worker)
+    
+    Args:
+        output_format: 'pdf', 'excel'/'xlsx' ou 'csv'
+        task: Progresso e cancelamento (submit_process com use_task=True)
+    
+    Returns:
+        Caminho do arquivo gerado
+    """
+    return ReportGenerator(os.path.dirname(filepath) or ".").generate(
+        db, report_type, start_date, end_date, filepath, output_format, task=task
+    )
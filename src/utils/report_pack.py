@@ -0,0 +1,169 @@
+"""
+Pacote de Relatórios
+Gera os relatórios do fechamento do mês juntos, em paralelo
+
+Cada relatório é renderizado em um processo do pool, com uma conexão
+somente leitura própria do worker; o tempo total fica próximo do tempo
+do relatório mais lento.
+"""
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional, Sequence
+
+# Processos do pool do pacote (0: um por relatório, limitado aos núcleos)
+REPORT_PACK_WORKERS = int(os.getenv("REPORT_PACK_WORKERS", "0"))
+
+# Relatórios do pacote, do mais demorado ao mais rápido (os longos começam primeiro)
+REPORT_PACK_TYPES = ('sales', 'expenses', 'purchases', 'stock', 'financial')
+
+# Nome do arquivo de cada relatório dentro da pasta do pacote
+REPORT_PACK_FILENAMES = {
+    'sales': 'vendas',
+    'expenses': 'despesas',
+    'purchases': 'compras',
+    'stock': 'estoque',
+    'financial': 'financeiro',
+}
+
+
+@dataclass
+class ReportPackResult:
+    """Resultado da geração do pacote"""
+    folder: str
+    files: Dict[str, str] = field(default_factory=dict)  # {tipo: arquivo}
+    timings: Dict[str, float] = field(default_factory=dict)  # {tipo: segundos no worker}
+    errors: Dict[str, str] = field(default_factory=dict)  # {tipo: mensagem}
+    elapsed: float = 0.0  # Tempo total (s)
+    zip_path: Optional[str] = None
+
+
+def pack_folder_name(start_date, end_date) -> str:
+    """Nome da pasta datada do pacote (ex.: pacote_2024-05 para um mês fechado)"""
+    if (start_date.year, start_date.month) == (end_date.year, end_date.month):
+        return f"pacote_{start_date.strftime('%Y-%m')}"
+    return f"pacote_{start_date.strftime('%Y%m%d')}_{end_date.strftime('%Y%m%d')}"
+
+
+def generate_report_pack(start_date, end_date, output_dir: str = "reports",
+                         output_format: str = "pdf", report_types: Sequence[str] = None,
+                         zip_pack: bool = False, max_workers: int = None,
+                         database_url: str = None,
+                         on_report_done: Callable = None, task=None) -> ReportPackResult:
+    """
+    Gera os relatórios do período em paralelo, em uma pasta datada
+    
+    Um relatório com erro não interrompe os demais: o erro fica em
+    result.errors e o arquivo parcial é removido.
+    
+    Args:
+        output_dir: Pasta onde a pasta do pacote é criada
+        output_format: pdf, xlsx (ou excel) ou csv
+        report_types: Relatórios do pacote (padrão REPORT_PACK_TYPES)
+        zip_pack: Também compacta a pasta em um .zip
+        max_workers: Processos do pool (padrão REPORT_PACK_WORKERS)
+        database_url: Banco lido pelos workers (padrão: o da aplicação)
+        on_report_done: Callback(tipo, segundos, concluídos, total) a cada relatório
+        task: Task do TaskRunner (progresso e cancelamento), se submetida com use_task
+    
+    Returns:
+        ReportPackResult com arquivos, tempos por relatório e tempo total
+    """
+    from src.models.database import DATABASE_URL
+    from src.utils.report_generator import FORMAT_EXTENSIONS, normalize_format
+    
+    output_format = normalize_format(output_format)
+    report_types = list(report_types or REPORT_PACK_TYPES)
+    workers = max_workers or REPORT_PACK_WORKERS or min(len(report_types), os.cpu_count() or 1)
+    
+    result = ReportPackResult(folder=os.path.join(output_dir, pack_folder_name(start_date, end_date)))
+    os.makedirs(result.folder, exist_ok=True)
+    
+    start_time = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_pack_worker,
+                             initargs=(database_url or DATABASE_URL,)) as pool:
+        futures = {}
+        for report_type in report_types:
+            filename = f"{REPORT_PACK_FILENAMES.get(report_type, report_type)}.{FORMAT_EXTENSIONS[output_format]}"
+            filepath = os.path.join(result.folder, filename)
+            future = pool.submit(_render_pack_report, report_type, start_date, end_date,
+                                 filepath, output_format)
+            futures[future] = (report_type, filepath)
+        
+        try:
+            for done, future in enumerate(as_completed(futures), start=1):
+                report_type, filepath = futures[future]
+                try:
+                    result.timings[report_type] = future.result()
+                    result.files[report_type] = filepath
+                except Exception as e:
+                    result.errors[report_type] = str(e)
+                    if os.path.exists(filepath):
+                        os.remove(filepath)
+                
+                if on_report_done:
+                    on_report_done(report_type, result.timings.get(report_type), done, len(futures))
+                if task is not None:
+                    task.progress(done / len(futures), f"{done} de {len(futures)} relatórios")
+                    task.check_cancelled()
+        except BaseException:
+            # Cancelado: os relatórios que ainda não começaram nem chegam a
+            # executar e os arquivos deste pacote são descartados
+            for future in futures:
+                future.cancel()
+            pool.shutdown(wait=True)
+            for report_type, filepath in futures.values():
+                if os.path.exists(filepath):
+                    os.remove(filepath)
+            raise
+    result.elapsed = time.perf_counter() - start_time
+    
+    if zip_pack and result.files:
+        result.zip_path = _zip_folder(result.folder)
+    
+    return result
+
+
+def _zip_folder(folder: str) -> str:
+    """Compacta a pasta do pacote em <pasta>.zip, ao lado dela"""
+    zip_path = f"{folder}.zip"
+    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for filename in sorted(os.listdir(folder)):
+            archive.write(os.path.join(folder, filename),
+                          os.path.join(os.path.basename(folder), filename))
+    return zip_path
+
+
+# --- Workers (funções de módulo: executadas nos processos do pool)
+
+_worker_sessions = None
+
+
+def _init_pack_worker(database_url: str):
+    """Abre a engine somente leitura do worker (uma conexão por processo)"""
+    global _worker_sessions
+    from sqlalchemy.orm import sessionmaker
+    from src.models.database import create_db_engine, engine
+    
+    # Conexões herdadas do processo pai (fork) não são usadas no worker
+    engine.dispose(close=False)
+    
+    readonly_engine = create_db_engine(database_url, readonly=True,
+                                       pool_size=1, max_overflow=0)
+    _worker_sessions = sessionmaker(bind=readonly_engine, autoflush=False)
+
+
+def _render_pack_report(report_type: str, start_date, end_date, filepath: str,
+                        output_format: str) -> float:
+    """Gera um relatório do pacote no worker; retorna o tempo gasto (s)"""
+    from src.utils.report_generator import generate_report
+    
+    start_time = time.perf_counter()
+    db = _worker_sessions()
+    try:
+        generate_report(db, report_type, start_date, end_date, filepath, output_format)
+    finally:
+        db.close()
+    return time.perf_counter() - start_time
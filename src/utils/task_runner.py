@@ -0,0 +1,334 @@
+"""
+Executor de Tarefas
+Executa o trabalho de banco e de relatórios fora da thread do Tkinter
+"""
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# Intervalo (ms) em que a thread do Tk recolhe resultados e progresso
+POLL_INTERVAL = 50
+
+
+class TaskCancelled(Exception):
+    """Tarefa cancelada pelo usuário"""
+
+
+class Task:
+    """
+    Tarefa submetida ao TaskRunner
+    
+    Funções submetidas com use_task=True recebem a própria tarefa no
+    argumento `task`, para informar progresso e verificar cancelamento.
+    """
+    
+    def __init__(self, runner, name: str):
+        self.runner = runner
+        self.name = name
+        self.future = None
+        self.on_success = None
+        self.on_error = None
+        self.on_progress = None
+        self.on_cancel = None
+        self.remote = None  # ProcessTask da tarefa em processo (use_task)
+        self._cancel_event = threading.Event()
+    
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+    
+    def cancel(self):
+        """Solicita o cancelamento (a tarefa para no próximo check_cancelled)"""
+        self._cancel_event.set()
+        if self.remote is not None:
+            self.remote.cancel()
+        if self.future is not None:
+            self.future.cancel()  # Ainda na fila: nem chega a executar
+    
+    def check_cancelled(self):
+        """Interrompe a tarefa se o cancelamento foi solicitado"""
+        if self.cancelled:
+            raise TaskCancelled()
+    
+    def progress(self, fraction: float, message: str = None):
+        """Informa o progresso (0 a 1); o callback roda na thread do Tk"""
+        self.runner._events.put((self, "progress", (fraction, message)))
+
+
+class ProcessTask:
+    """
+    Lado do processo de uma Task submetida com submit_process(use_task=True)
+    
+    Mesma interface da Task (progress, check_cancelled); o progresso e o
+    pedido de cancelamento atravessam os processos por uma fila e um
+    Event do multiprocessing.Manager do TaskRunner.
+    """
+    
+    def __init__(self, task_id: int, events, cancel_event):
+        self.task_id = task_id
+        self._events = events
+        self._cancel_event = cancel_event
+    
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+    
+    def cancel(self):
+        self._cancel_event.set()
+    
+    def check_cancelled(self):
+        """Interrompe a tarefa se o cancelamento foi solicitado"""
+        if self.cancelled:
+            raise TaskCancelled()
+    
+    def progress(self, fraction: float, message: str = None):
+        """Informa o progresso (0 a 1); o callback roda na thread do Tk"""
+        self._events.put((self.task_id, fraction, message))
+
+
+class TaskRunner:
+    """
+    Pool de threads (banco, I/O, bcrypt) e de processos (renderização
+    pesada) para as views
+    
+    Os callbacks (on_success, on_error, on_progress, on_cancel) são sempre
+    chamados na thread do Tk, via after(). Com use_session=True a função
+    recebe como primeiro argumento uma sessão própria do worker
+    (session_scope: commit ao terminar, rollback em erro).
+    """
+    
+    def __init__(self, widget, max_workers: int = None, max_processes: int = None):
+        self.root = widget._root()
+        self.max_processes = max_processes or int(os.getenv("TASK_PROCESSES", "2"))
+        self._threads = ThreadPoolExecutor(
+            max_workers=max_workers or int(os.getenv("TASK_WORKERS", "4")),
+            thread_name_prefix="chefconta-task"
+        )
+        self._processes = None
+        self._manager = None  # Progresso/cancelamento das tarefas em processo
+        self._process_events = None
+        self._remote_tasks = {}  # {task_id: Task}
+        self._next_remote_id = 0
+        self._events = queue.Queue()
+        self._active = {}  # Tarefas em andamento, na ordem de submissão
+        self._polling = False
+        self._busy_listeners = []
+    
+    @property
+    def busy_count(self) -> int:
+        """Quantidade de tarefas em andamento"""
+        return len(self._active)
+    
+    def submit(self, fn, *args, on_success=None, on_error=None, on_progress=None,
+               on_cancel=None, use_session: bool = False, use_task: bool = False,
+               name: str = None, **kwargs) -> Task:
+        """
+        Executa fn em uma thread do pool
+        
+        Args:
+            fn: Função a executar
+            use_session: Passa uma sessão do worker como primeiro argumento
+            use_task: Passa a Task no argumento `task` (progresso/cancelamento)
+            name: Nome exibido no indicador de atividade
+        
+        Returns:
+            Task (permite cancelar)
+        """
+        task = self._create_task(fn, name, on_success, on_error, on_progress, on_cancel)
+        task.future = self._threads.submit(
+            _run_in_thread, task, fn, args, kwargs, use_session, use_task
+        )
+        self._track(task)
+        return task
+    
+    def submit_process(self, fn, *args, on_success=None, on_error=None, on_progress=None,
+                       on_cancel=None, use_session: bool = False, use_task: bool = False,
+                       name: str = None, **kwargs) -> Task:
+        """
+        Executa fn em um processo do pool (trabalho de CPU, ex.: PDF grande)
+        
+        fn e os argumentos precisam ser serializáveis (funções de módulo).
+        Sem use_task, o cancelamento só impede tarefas que ainda não
+        começaram; com use_task, fn recebe uma ProcessTask no argumento
+        `task` (progresso e cancelamento cooperativo, como em submit).
+        """
+        if self._processes is None:
+            self._processes = ProcessPoolExecutor(
+                max_workers=self.max_processes,
+                initializer=_init_process_worker
+            )
+        
+        task = self._create_task(fn, name, on_success, on_error, on_progress, on_cancel)
+        if use_task:
+            task.remote = self._create_remote_task()
+            self._remote_tasks[task.remote.task_id] = task
+            kwargs = dict(kwargs, task=task.remote)
+        
+        task.future = self._processes.submit(_run_in_process, fn, args, kwargs, use_session)
+        self._track(task)
+        return task
+    
+    def call_soon(self, callback, *args):
+        """
+        Agenda callback(*args) na thread do Tk (chamável de qualquer thread)
+        
+        A entrega acontece na próxima coleta de eventos, que está ativa
+        enquanto houver tarefas em andamento (caso dos commits em workers).
+        """
+        self._events.put((None, "call", (callback, args)))
+    
+    def add_busy_listener(self, callback):
+        """Registra callback(ocupado, nomes das tarefas) para o indicador de atividade"""
+        self._busy_listeners.append(callback)
+    
+    def remove_busy_listener(self, callback):
+        if callback in self._busy_listeners:
+            self._busy_listeners.remove(callback)
+    
+    def shutdown(self):
+        """Cancela as tarefas pendentes e encerra os pools"""
+        for task in list(self._active):
+            task.cancel()
+        self._threads.shutdown(wait=False, cancel_futures=True)
+        if self._processes is not None:
+            self._processes.shutdown(wait=False, cancel_futures=True)
+        if self._manager is not None:
+            self._manager.shutdown()
+    
+    def _create_remote_task(self) -> ProcessTask:
+        # O Manager (um processo servidor) só é iniciado na primeira tarefa com progresso
+        if self._manager is None:
+            import multiprocessing
+            self._manager = multiprocessing.Manager()
+            self._process_events = self._manager.Queue()
+        
+        self._next_remote_id += 1
+        return ProcessTask(self._next_remote_id, self._process_events, self._manager.Event())
+    
+    def _create_task(self, fn, name, on_success, on_error, on_progress, on_cancel) -> Task:
+        task = Task(self, name or getattr(fn, "__name__", "tarefa"))
+        task.on_success = on_success
+        task.on_error = on_error
+        task.on_progress = on_progress
+        task.on_cancel = on_cancel
+        return task
+    
+    def _track(self, task: Task):
+        self._active[task] = None
+        task.future.add_done_callback(lambda future: self._events.put((task, "done", future)))
+        self._notify_busy()
+        self._schedule_poll()
+    
+    def _schedule_poll(self):
+        if not self._polling:
+            self._polling = True
+            self.root.after(POLL_INTERVAL, self._poll)
+    
+    def _poll(self):
+        """Entrega na thread do Tk os eventos produzidos pelos workers"""
+        self._polling = False
+        
+        while True:
+            try:
+                task, kind, payload = self._events.get_nowait()
+            except queue.Empty:
+                break
+            
+            if kind == "call":
+                callback, args = payload
+                self._call(callback, *args)
+            elif kind == "progress":
+                if not task.cancelled:
+                    self._call(task.on_progress, *payload)
+            else:
+                self._finish(task, payload)
+        
+        # Progresso das tarefas em processo
+        while self._process_events is not None:
+            try:
+                task_id, fraction, message = self._process_events.get_nowait()
+            except queue.Empty:
+                break
+            task = self._remote_tasks.get(task_id)
+            if task is not None and not task.cancelled:
+                self._call(task.on_progress, fraction, message)
+        
+        if self._active or not self._events.empty():
+            self._schedule_poll()
+    
+    def _finish(self, task: Task, future):
+        self._active.pop(task, None)
+        if task.remote is not None:
+            self._remote_tasks.pop(task.remote.task_id, None)
+        self._notify_busy()
+        
+        if task.cancelled or future.cancelled():
+            self._call(task.on_cancel)
+            return
+        
+        error = future.exception()
+        if isinstance(error, TaskCancelled):
+            self._call(task.on_cancel)
+        elif error is not None:
+            if task.on_error:
+                self._call(task.on_error, error)
+            else:
+                print(f"Erro na tarefa {task.name}: {error}")
+        else:
+            self._call(task.on_success, future.result())
+    
+    def _notify_busy(self):
+        names = [task.name for task in self._active]
+        for callback in list(self._busy_listeners):
+            self._call(callback, bool(names), names)
+    
+    @staticmethod
+    def _call(callback, *args):
+        """Executa um callback sem interromper a entrega dos demais"""
+        if callback is None:
+            return
+        try:
+            callback(*args)
+        except Exception as e:
+            # Ex.: diálogo fechado antes do resultado chegar
+            print(f"Erro no callback da tarefa: {e}")
+
+
+def _run_in_thread(task: Task, fn, args, kwargs, use_session: bool, use_task: bool):
+    task.check_cancelled()
+    if use_task:
+        kwargs = dict(kwargs, task=task)
+    
+    if use_session:
+        from src.models.database import session_scope
+        with session_scope() as db:
+            return fn(db, *args, **kwargs)
+    return fn(*args, **kwargs)
+
+
+def _init_process_worker():
+    """Descarta as conexões herdadas do processo pai (cada processo abre as suas)"""
+    from src.models.database import engine
+    engine.dispose(close=False)
+
+
+def _run_in_process(fn, args, kwargs, use_session: bool):
+    if use_session:
+        from src.models.database import session_scope
+        with session_scope() as db:
+            return fn(db, *args, **kwargs)
+    return fn(*args, **kwargs)
+
+
+_runner = None
+
+
+def get_task_runner(widget=None) -> TaskRunner:
+    """Retorna o TaskRunner da aplicação (criado na primeira chamada)"""
+    global _runner
+    if _runner is None:
+        if widget is None:
+            raise RuntimeError("TaskRunner ainda não foi criado: informe um widget")
+        _runner = TaskRunner(widget)
+    return _runner
@@ -0,0 +1,34 @@
+"""
+Eventos na Interface
+Inscreve telas no barramento de eventos de domínio, com entrega na thread do Tk
+"""
+import threading
+from src.controllers.events import bus
+from src.utils.task_runner import get_task_runner
+
+
+def listen(widget, event_type: type, callback):
+    """
+    Inscreve callback(evento) enquanto o widget existir
+    
+    Commits feitos na thread do Tk entregam o evento na hora; commits em
+    workers do TaskRunner entregam pela fila de resultados do executor.
+    A inscrição é cancelada quando o widget é destruído.
+    
+    Returns:
+        Função que cancela a inscrição
+    """
+    def deliver(domain_event):
+        if threading.current_thread() is threading.main_thread():
+            callback(domain_event)
+        else:
+            get_task_runner().call_soon(callback, domain_event)
+    
+    unsubscribe = bus.subscribe(event_type, deliver)
+    
+    def on_destroy(event):
+        if event.widget is widget:
+            unsubscribe()
+    
+    widget.bind("<Destroy>", on_destroy, add="+")
+    return unsubscribe
@@ -0,0 +1,307 @@
+"""
+Grade Virtual
+Treeview que materializa apenas as linhas visíveis, com dados paginados sob demanda
+"""
+from collections import OrderedDict
+from tkinter import ttk
+import customtkinter as ctk
+
+# Linhas roladas por "clique" da roda do mouse
+WHEEL_STEP = 3
+
+
+class PagedDataSource:
+    """
+    Fonte de dados paginada para a VirtualGrid
+    
+    Guarda o cursor inicial de cada página já visitada (a rolagem sequencial
+    segue por keyset) e mantém em cache as últimas páginas já formatadas.
+    Saltos para páginas ainda não visitadas usam a posição (OFFSET).
+    """
+    
+    def __init__(self, fetch_page, count, formatter, page_size=100, cache_pages=8):
+        """
+        Args:
+            fetch_page: Função (cursor, offset, limit) -> (linhas, próximo cursor),
+                normalmente um list_*_page dos controllers
+            count: Função () -> total de linhas com os filtros atuais
+            formatter: Função (linha) -> (valores, tags) exibidos na grade;
+                o primeiro valor identifica a linha (ex.: ID)
+            page_size: Linhas por consulta
+            cache_pages: Quantidade de páginas mantidas em memória
+        """
+        self.fetch_page = fetch_page
+        self.count = count
+        self.formatter = formatter
+        self.page_size = page_size
+        self.cache_pages = cache_pages
+        self.invalidate()
+    
+    def invalidate(self):
+        """Descarta total, cursores e páginas em cache (dados ou filtros mudaram)"""
+        self._total = None
+        self._cursors = {0: None}
+        self._pages = OrderedDict()
+    
+    def total(self) -> int:
+        """Total de linhas (consultado uma vez por invalidação)"""
+        if self._total is None:
+            self._total = self.count()
+        return self._total
+    
+    def get_rows(self, start: int, size: int) -> list:
+        """Retorna as linhas formatadas de start até start + size"""
+        end = min(start + size, self.total())
+        rows = []
+        position = start
+        
+        while position < end:
+            index, skip = divmod(position, self.page_size)
+            page = self._get_page(index)
+            chunk = page[skip:skip + end - position]
+            if not chunk:
+                break  # Linhas removidas desde a contagem
+            rows.extend(chunk)
+            position += len(chunk)
+        
+        return rows
+    
+    def loaded_keys(self) -> set:
+        """Chaves (primeiro valor) das linhas nas páginas em cache"""
+        return {values[0] for page in self._pages.values() for values, tags in page}
+    
+    def update_row(self, row) -> bool:
+        """
+        Substitui nas páginas em cache a linha com a mesma chave
+        
+        Returns:
+            True se a linha estava em cache
+        """
+        formatted = self.formatter(row)
+        key = formatted[0][0]
+        found = False
+        for page in self._pages.values():
+            for position, (values, tags) in enumerate(page):
+                if values[0] == key:
+                    page[position] = formatted
+                    found = True
+        return found
+    
+    def _get_page(self, index: int) -> list:
+        """Retorna uma página do cache ou do banco"""
+        if index in self._pages:
+            self._pages.move_to_end(index)
+            return self._pages[index]
+        
+        if index in self._cursors:
+            rows, next_cursor = self.fetch_page(self._cursors[index], None, self.page_size)
+        else:
+            rows, next_cursor = self.fetch_page(None, index * self.page_size, self.page_size)
+        
+        if next_cursor is not None:
+            self._cursors[index + 1] = next_cursor
+        
+        page = [self.formatter(row) for row in rows]
+        self._pages[index] = page
+        if len(self._pages) > self.cache_pages:
+            self._pages.popitem(last=False)
+        
+        return page
+
+
+class VirtualGrid(ctk.CTkFrame):
+    """
+    Treeview virtualizada
+    
+    Mantém apenas as linhas visíveis como itens do Treeview e reaproveita
+    esses itens ao rolar, buscando os dados na PagedDataSource. O Treeview
+    fica acessível em `tree` para configurar colunas, tags e eventos.
+    """
+    
+    def __init__(self, parent, columns, data_source: PagedDataSource = None,
+                 height: int = 15, style: str = None, **kwargs):
+        kwargs.setdefault("fg_color", "transparent")
+        super().__init__(parent, **kwargs)
+        
+        self.data_source = data_source
+        self.offset = 0
+        self.visible_rows = 0
+        self._items = []
+        self._row_keys = {}
+        self._selected_key = None
+        
+        self.scrollbar = ttk.Scrollbar(self, command=self._on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+        
+        options = {"columns": columns, "show": "headings", "height": height,
+                   "selectmode": "browse"}
+        if style:
+            options["style"] = style
+        self.tree = ttk.Treeview(self, **options)
+        self.tree.pack(fill="both", expand=True)
+        
+        self._resize_pool(height)
+        
+        # Rolagem
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", self._on_mousewheel)
+        self.tree.bind("<Button-5>", self._on_mousewheel)
+        self.tree.bind("<Up>", lambda e: self._on_arrow(-1))
+        self.tree.bind("<Down>", lambda e: self._on_arrow(1))
+        self.tree.bind("<Prior>", lambda e: self._scroll_by(-self.visible_rows))
+        self.tree.bind("<Next>", lambda e: self._scroll_by(self.visible_rows))
+        self.tree.bind("<Home>", lambda e: self.scroll_to(0))
+        self.tree.bind("<End>", lambda e: self.scroll_to(self._total()))
+        
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+        self.tree.bind("<Configure>", self._on_configure)
+    
+    def set_data_source(self, data_source: PagedDataSource):
+        """Troca a fonte de dados e volta ao início"""
+        self.data_source = data_source
+        self.reset()
+    
+    def reset(self):
+        """Recarrega os dados a partir da primeira linha (ex.: filtros mudaram)"""
+        self.offset = 0
+        self._selected_key = None
+        self.refresh()
+    
+    def refresh(self):
+        """Recarrega os dados mantendo a posição e a seleção"""
+        if self.data_source:
+            self.data_source.invalidate()
+        self.scroll_to(self.offset, force=True)
+    
+    def scroll_to(self, offset: int, force: bool = False):
+        """Posiciona a primeira linha visível em offset"""
+        offset = max(0, min(offset, self._total() - self.visible_rows))
+        if offset != self.offset or force:
+            self.offset = offset
+            self._render()
+    
+    def loaded_keys(self) -> set:
+        """Chaves das linhas já carregadas (as demais serão lidas atualizadas)"""
+        return self.data_source.loaded_keys() if self.data_source else set()
+    
+    def update_rows(self, rows):
+        """
+        Atualiza linhas já carregadas sem consultar as demais
+        
+        Args:
+            rows: Linhas no formato da fonte de dados (ex.: projeção 'rows')
+        """
+        if not self.data_source:
+            return
+        
+        changed = [self.data_source.update_row(row) for row in rows]
+        if any(changed):
+            self._render()  # Apenas a partir do cache
+    
+    def get_selected_values(self):
+        """Retorna os valores da linha selecionada (ou None)"""
+        selection = self.tree.selection()
+        if not selection:
+            return None
+        return self.tree.item(selection[0])['values']
+    
+    def _total(self) -> int:
+        return self.data_source.total() if self.data_source else 0
+    
+    def _render(self):
+        """Preenche os itens reaproveitados com as linhas da posição atual"""
+        rows = self.data_source.get_rows(self.offset, self.visible_rows) if self.data_source else []
+        
+        self._row_keys = {}
+        selected = []
+        for position, iid in enumerate(self._items):
+            if position < len(rows):
+                values, tags = rows[position]
+                self.tree.item(iid, values=values, tags=tags)
+                self.tree.move(iid, "", position)  # Reanexa itens desanexados
+                self._row_keys[iid] = values[0]
+                if self._selected_key is not None and values[0] == self._selected_key:
+                    selected.append(iid)
+            else:
+                self.tree.detach(iid)
+        
+        # A seleção acompanha a linha de dados, não o item reaproveitado
+        self.tree.selection_set(selected)
+        self.tree.yview_moveto(0)
+        self._update_scrollbar()
+    
+    def _update_scrollbar(self):
+        total = self._total()
+        if total <= self.visible_rows:
+            self.scrollbar.set(0, 1)
+        else:
+            self.scrollbar.set(self.offset / total, (self.offset + self.visible_rows) / total)
+    
+    def _resize_pool(self, size: int):
+        """Ajusta a quantidade de itens do Treeview às linhas visíveis"""
+        while len(self._items) < size:
+            self._items.append(self.tree.insert("", "end", values=()))
+        while len(self._items) > size:
+            self.tree.delete(self._items.pop())
+        self.visible_rows = size
+    
+    def _row_metrics(self):
+        """Altura do cabeçalho e de uma linha, medidas no próprio Treeview"""
+        for iid in self._items:
+            bbox = self.tree.bbox(iid)
+            if bbox:
+                return bbox[1], bbox[3]
+        return 25, 20
+    
+    def _scroll_by(self, rows: int):
+        self.scroll_to(self.offset + rows)
+        return "break"
+    
+    def _on_scrollbar(self, action, *args):
+        if action == "moveto":
+            self.scroll_to(int(float(args[0]) * self._total()))
+        elif action == "scroll":
+            amount = int(args[0])
+            if args[1] == "pages":
+                amount *= self.visible_rows
+            self.scroll_to(self.offset + amount)
+    
+    def _on_mousewheel(self, event):
+        if event.num == 4 or getattr(event, "delta", 0) > 0:
+            return self._scroll_by(-WHEEL_STEP)
+        return self._scroll_by(WHEEL_STEP)
+    
+    def _on_arrow(self, direction: int):
+        """Setas nas bordas da janela visível rolam os dados"""
+        attached = [iid for iid in self._items if self.tree.exists(iid) and self.tree.parent(iid) == ""
+                    and iid in self._row_keys]
+        selection = self.tree.selection()
+        if not attached or not selection:
+            return None
+        
+        at_edge = selection[0] == (attached[-1] if direction > 0 else attached[0])
+        if not at_edge:
+            return None  # Navegação normal do Treeview
+        
+        # Mantém a linha da borda selecionada após rolar
+        position = len(attached) - 1 if direction > 0 else 0
+        self.scroll_to(self.offset + direction)
+        if position < len(self._items):
+            iid = self._items[position]
+            if iid in self._row_keys:
+                self.tree.selection_set(iid)
+                self.tree.focus(iid)
+        return "break"
+    
+    def _on_select(self, event):
+        selection = self.tree.selection()
+        if selection:
+            self._selected_key = self._row_keys.get(selection[0])
+    
+    def _on_configure(self, event):
+        """Recalcula quantas linhas cabem quando a grade muda de tamanho"""
+        heading, row_height = self._row_metrics()
+        rows = max(1, (event.height - heading) // row_height)
+        if rows != self.visible_rows:
+            self._resize_pool(rows)
+            self.scroll_to(self.offset, force=True)
@@ -6,7 +6,11 @@ import customtkinter as ctk
 from tkinter import messagebox, ttk
 from datetime import datetime
 from src.controllers.cash_register_controller import CashRegisterController
-from src.models.database import SessionLocal
+from src.controllers.events import CashMovementAdded
+from src.models.database import session_scope
+from src.utils.task_runner import get_task_runner
+from src.utils.ui_events import listen
+from src.utils.virtual_grid import PagedDataSource, VirtualGrid
 from src.utils.window_utils import set_dialog_size
 
 class CashRegisterView(ctk.CTkFrame):
@@ -18,11 +22,14 @@ class CashRegisterView(ctk.CTkFrame):
         self.parent = parent
         self.user_data = user_data
         self.cash_controller = CashRegisterController()
-        self.db = SessionLocal()
         self.current_cash = None
+        self.summary_labels = {}  # {chave do resumo: label do card}
         
         self.create_widgets()
         self.check_cash_status()
+        
+        # Vendas, sangrias e reforços atualizam só os valores dos cards
+        listen(self, CashMovementAdded, self.on_cash_movement)
     
     def create_widgets(self):
         """Cria os widgets da tela"""
@@ -41,11 +48,13 @@ class CashRegisterView(ctk.CTkFrame):
     
     def check_cash_status(self):
         """Verifica status do caixa e exibe tela apropriada"""
-        self.current_cash = self.cash_controller.get_open_cash_register(self.db)
+        with session_scope() as db:
+            self.current_cash = self.cash_controller.get_open_cash_register(db)
         
         # Limpar container
         for widget in self.main_container.winfo_children():
             widget.destroy()
+        self.summary_labels = {}
         
         if self.current_cash:
             self.show_open_cash_view()
@@ -99,7 +108,8 @@ class CashRegisterView(ctk.CTkFrame):
         """Exibe view quando caixa está aberto"""
         
         # Obter resumo
-        summary = self.cash_controller.get_cash_register_summary(self.db, self.current_cash.id)
+        with session_scope() as db:
+            summary = self.cash_controller.get_cash_register_summary(db, self.current_cash.id)
         
         # Header com status
         header = ctk.CTkFrame(self.main_container)
@@ -155,26 +165,29 @@ class CashRegisterView(ctk.CTkFrame):
         cards_frame.pack(fill="x", pady=10)
         
         cards = [
-            ("💵 Saldo Inicial", f"R$ {self.current_cash.opening_balance:.2f}", "blue"),
-            ("💰 Total Vendas", f"R$ {summary['total_vendas']:.2f}", "green"),
-            ("📋 Comandas", f"R$ {summary['total_comanda']:.2f}", "purple"),
-            ("🛎️ Balcão", f"R$ {summary['total_balcao']:.2f}", "teal"),
-            ("💸 Saldo Atual", f"R$ {summary['saldo_atual']:.2f}", "orange"),
-            ("🧾 Qtd Vendas", f"{summary['quantidade_vendas']}", "gray")
+            ("💵 Saldo Inicial", None, f"R$ {self.current_cash.opening_balance:.2f}", "blue"),
+            ("💰 Total Vendas", 'total_vendas', None, "green"),
+            ("📋 Comandas", 'total_comanda', None, "purple"),
+            ("🛎️ Balcão", 'total_balcao', None, "teal"),
+            ("💸 Saldo Atual", 'saldo_atual', None, "orange"),
+            ("🧾 Qtd Vendas", 'quantidade_vendas', None, "gray")
         ]
         
-        for idx, (title, value, color) in enumerate(cards):
+        for idx, (title, key, value, color) in enumerate(cards):
             card = ctk.CTkFrame(cards_frame)
             card.grid(row=idx // 3, column=idx % 3, padx=10, pady=10, sticky="nsew")
             cards_frame.grid_columnconfigure(idx % 3, weight=1)
             
             ctk.CTkLabel(card, text=title, font=("Arial", 12)).pack(pady=(15, 5))
-            ctk.CTkLabel(
+            label = ctk.CTkLabel(
                 card,
-                text=value,
+                text=value or "",
                 font=("Arial", 20, "bold"),
                 text_color=color
-            ).pack(pady=(5, 15))
+            )
+            label.pack(pady=(5, 15))
+            if key:
+                self.summary_labels[key] = (label, None)
         
         # Detalhamento por forma de pagamento
         payment_frame = ctk.CTkFrame(self.main_container)
@@ -190,17 +203,20 @@ class CashRegisterView(ctk.CTkFrame):
         payment_grid.pack(fill="x", padx=10, pady=10)
         
         payments = [
-            ("💵 Dinheiro", summary['total_dinheiro']),
-            ("💳 Cartão", summary['total_cartao']),
-            ("📱 PIX", summary['total_pix'])
+            ("💵 Dinheiro", 'total_dinheiro'),
+            ("💳 Cartão", 'total_cartao'),
+            ("📱 PIX", 'total_pix')
         ]
         
-        for idx, (name, value) in enumerate(payments):
-            ctk.CTkLabel(
+        for idx, (name, key) in enumerate(payments):
+            label = ctk.CTkLabel(
                 payment_grid,
-                text=f"{name}: R$ {value:.2f}",
                 font=("Arial", 12, "bold")
-            ).grid(row=0, column=idx, padx=20, pady=5)
+            )
+            label.grid(row=0, column=idx, padx=20, pady=5)
+            self.summary_labels[key] = (label, name)
+        
+        self.update_summary_cards(summary)
         
         # Botões de operações
         operations_frame = ctk.CTkFrame(self.main_container)
@@ -236,6 +252,24 @@ class CashRegisterView(ctk.CTkFrame):
             command=self.show_movements_dialog
         ).pack(side="left", padx=5)
     
+    def update_summary_cards(self, summary: dict):
+        """Atualiza os valores exibidos nos cards e nas formas de pagamento"""
+        for key, (label, name) in self.summary_labels.items():
+            value = f"{summary[key]}" if key == 'quantidade_vendas' else f"R$ {summary[key]:.2f}"
+            label.configure(text=f"{name}: {value}" if name else value)
+    
+    def on_cash_movement(self, event):
+        """Movimentação no caixa aberto: recalcula o resumo (uma consulta agregada)"""
+        if not self.current_cash or event.cash_register_id != self.current_cash.id:
+            return
+        if not self.summary_labels:
+            return
+        
+        with session_scope() as db:
+            summary = self.cash_controller.get_cash_register_summary(db, self.current_cash.id)
+        if summary:
+            self.update_summary_cards(summary)
+    
     def show_open_cash_dialog(self):
         """Mostra diálogo de abertura de caixa"""
         dialog = OpenCashDialog(self, self.user_data)
@@ -244,7 +278,9 @@ class CashRegisterView(ctk.CTkFrame):
     
     def show_close_cash_dialog(self):
         """Mostra diálogo de fechamento de caixa"""
-        summary = self.cash_controller.get_cash_register_summary(self.db, self.current_cash.id)
+        with session_scope() as db:
+            summary = self.cash_controller.get_cash_register_summary(db, self.current_cash.id)
+        
         dialog = CloseCashDialog(self, self.current_cash, summary)
         self.wait_window(dialog)
         self.check_cash_status()
@@ -253,18 +289,15 @@ class CashRegisterView(ctk.CTkFrame):
         """Mostra diálogo de sangria"""
         dialog = SangriaDialog(self)
         self.wait_window(dialog)
-        self.check_cash_status()
     
     def show_reforco_dialog(self):
         """Mostra diálogo de reforço"""
         dialog = ReforcoDialog(self)
         self.wait_window(dialog)
-        self.check_cash_status()
     
     def show_movements_dialog(self):
-        """Mostra diálogo de movimentações"""
-        summary = self.cash_controller.get_cash_register_summary(self.db, self.current_cash.id)
-        dialog = MovementsDialog(self, summary)
+        """Mostra diálogo de movimentações (carregadas só ao abrir)"""
+        dialog = MovementsDialog(self, self.current_cash.id)
         self.wait_window(dialog)
     
     def show_cash_history(self):
@@ -282,7 +315,6 @@ class OpenCashDialog(ctk.CTkToplevel):
         self.parent = parent
         self.user_data = user_data
         self.cash_controller = CashRegisterController()
-        self.db = SessionLocal()
         
         self.title("Abrir Caixa")
         
@@ -385,12 +417,13 @@ class OpenCashDialog(ctk.CTkToplevel):
         
         notes = self.notes_entry.get().strip()
         
-        cash, error = self.cash_controller.open_cash_register(
-            self.db,
-            user_id=self.user_data['id'],
-            opening_balance=balance,
-            notes=notes if notes else None
-        )
+        with session_scope() as db:
+            cash, error = self.cash_controller.open_cash_register(
+                db,
+                user_id=self.user_data['id'],
+                opening_balance=balance,
+                notes=notes if notes else None
+            )
         
         if error:
             messagebox.showerror("Erro", error)
@@ -414,7 +447,6 @@ class CloseCashDialog(ctk.CTkToplevel):
         self.cash_register = cash_register
         self.summary = summary
         self.cash_controller = CashRegisterController()
-        self.db = SessionLocal()
         
         self.title("Fechar Caixa")
         
@@ -543,7 +575,7 @@ class CloseCashDialog(ctk.CTkToplevel):
             command=self.destroy
         ).pack(side="right", padx=5)
         
-        ctk.CTkButton(
+        self.close_btn = ctk.CTkButton(
             btn_frame,
             text="🔒 Fechar Caixa",
             width=200,
@@ -552,7 +584,8 @@ class CloseCashDialog(ctk.CTkToplevel):
             fg_color="red",
             hover_color="darkred",
             command=self.close_cash
-        ).pack(side="right", padx=5)
+        )
+        self.close_btn.pack(side="right", padx=5)
     
     def calculate_total(self):
         """Calcula total informado"""
@@ -596,15 +629,26 @@ class CloseCashDialog(ctk.CTkToplevel):
         
         notes = self.notes_entry.get().strip()
         
-        cash, error = self.cash_controller.close_cash_register(
-            self.db,
+        # Fechamento em segundo plano (a janela continua respondendo)
+        self.close_btn.configure(state="disabled", text="Fechando...")
+        get_task_runner(self).submit(
+            self.cash_controller.close_cash_register,
             cash_register_id=self.cash_register.id,
             total_cash=total_cash,
             total_card=total_card,
             total_pix=total_pix,
             total_other=total_other,
-            notes=notes if notes else None
+            notes=notes if notes else None,
+            use_session=True,
+            name="Fechando caixa",
+            on_success=self.on_cash_closed,
+            on_error=lambda error: self.on_cash_closed((None, str(error)))
         )
+    
+    def on_cash_closed(self, result):
+        """Exibe o resultado do fechamento"""
+        cash, error = result
+        self.close_btn.configure(state="normal", text="🔒 Fechar Caixa")
         
         if error:
             messagebox.showerror("Erro", error)
@@ -635,7 +679,6 @@ class SangriaDialog(ctk.CTkToplevel):
         
         self.parent = parent
         self.cash_controller = CashRegisterController()
-        self.db = SessionLocal()
         
         self.title("Sangria")
         
@@ -723,7 +766,8 @@ class SangriaDialog(ctk.CTkToplevel):
             messagebox.showerror("Erro", "Informe o motivo da sangria!")
             return
         
-        movement, error = self.cash_controller.add_sangria(self.db, amount, description)
+        with session_scope() as db:
+            movement, error = self.cash_controller.add_sangria(db, amount, description)
         
         if error:
             messagebox.showerror("Erro", error)
@@ -740,7 +784,6 @@ class ReforcoDialog(ctk.CTkToplevel):
         
         self.parent = parent
         self.cash_controller = CashRegisterController()
-        self.db = SessionLocal()
         
         self.title("Reforço de Caixa")
         
@@ -828,7 +871,8 @@ class ReforcoDialog(ctk.CTkToplevel):
             messagebox.showerror("Erro", "Informe o motivo do reforço!")
             return
         
-        movement, error = self.cash_controller.add_reforco(self.db, amount, description)
+        with session_scope() as db:
+            movement, error = self.cash_controller.add_reforco(db, amount, description)
         
         if error:
             messagebox.showerror("Erro", error)
@@ -840,10 +884,11 @@ class ReforcoDialog(ctk.CTkToplevel):
 class MovementsDialog(ctk.CTkToplevel):
     """Diálogo de movimentações"""
     
-    def __init__(self, parent, summary):
+    def __init__(self, parent, cash_register_id):
         super().__init__(parent)
         
-        self.summary = summary
+        self.cash_register_id = cash_register_id
+        self.cash_controller = CashRegisterController()
         
         self.title("Movimentações do Caixa")
         
@@ -854,6 +899,7 @@ class MovementsDialog(ctk.CTkToplevel):
         self.grab_set()
         
         self.create_widgets()
+        self.grid.reset()
     
     def create_widgets(self):
         """Cria widgets"""
@@ -878,17 +924,15 @@ class MovementsDialog(ctk.CTkToplevel):
                        fieldbackground="#2b2b2b",
                        font=("Arial", 10))
         
-        scrollbar = ttk.Scrollbar(table_frame)
-        scrollbar.pack(side="right", fill="y")
-        
-        tree = ttk.Treeview(
+        # Grade virtual: as movimentações são lidas por página conforme a rolagem
+        self.grid = VirtualGrid(
             table_frame,
             columns=("Hora", "Tipo", "Descrição", "Valor"),
-            show="headings",
-            yscrollcommand=scrollbar.set,
+            data_source=PagedDataSource(self.fetch_movements_page, self.count_movements,
+                                        self.format_movement),
             style="Cash.Treeview"
         )
-        scrollbar.config(command=tree.yview)
+        tree = self.grid.tree
         
         tree.heading("Hora", text="Hora")
         tree.heading("Tipo", text="Tipo")
@@ -900,20 +944,7 @@ class MovementsDialog(ctk.CTkToplevel):
         tree.column("Descrição", width=400)
         tree.column("Valor", width=150, anchor="center")
         
-        for mov in self.summary['movements']:
-            color = "green" if mov.movement_type in ["entrada", "reforco"] else "red"
-            valor = f"R$ {mov.amount:.2f}"
-            if mov.movement_type in ["saida", "sangria"]:
-                valor = f"-{valor}"
-            
-            tree.insert("", "end", values=(
-                mov.created_at.strftime("%H:%M:%S"),
-                mov.movement_type.upper(),
-                mov.description,
-                valor
-            ))
-        
-        tree.pack(fill="both", expand=True, padx=10, pady=10)
+        self.grid.pack(fill="both", expand=True, padx=10, pady=10)
         
         # Botão fechar
         ctk.CTkButton(
@@ -922,6 +953,31 @@ class MovementsDialog(ctk.CTkToplevel):
             width=150,
             command=self.destroy
         ).pack(pady=20)
+    
+    def fetch_movements_page(self, cursor, offset, limit):
+        """Busca uma página de movimentações para a grade"""
+        with session_scope() as db:
+            return self.cash_controller.list_movements_page(
+                db, self.cash_register_id, cursor, limit, offset
+            )
+    
+    def count_movements(self):
+        """Conta as movimentações do caixa"""
+        with session_scope() as db:
+            return self.cash_controller.count_movements(db, self.cash_register_id)
+    
+    def format_movement(self, mov):
+        """Formata uma movimentação como linha da grade"""
+        valor = f"R$ {mov.amount:.2f}"
+        if mov.movement_type in ["saida", "sangria"]:
+            valor = f"-{valor}"
+        
+        return (
+            mov.created_at.strftime("%H:%M:%S"),
+            mov.movement_type.upper(),
+            mov.description,
+            valor
+        ), ()
 
 
 class CashHistoryDialog(ctk.CTkToplevel):
@@ -932,7 +988,6 @@ class CashHistoryDialog(ctk.CTkToplevel):
         
         self.parent = parent
         self.cash_controller = CashRegisterController()
-        self.db = SessionLocal()
         
         self.title("Histórico de Caixas")
         
@@ -962,16 +1017,17 @@ class CashHistoryDialog(ctk.CTkToplevel):
         table_frame.pack(fill="both", expand=True)
         
         style = ttk.Style()
-        scrollbar = ttk.Scrollbar(table_frame)
-        scrollbar.pack(side="right", fill="y")
         
-        self.tree = ttk.Treeview(
+        # Grade virtual; o ID (oculto) identifica a linha para a seleção
+        self.grid = VirtualGrid(
             table_frame,
-            columns=("Data", "Abertura", "Fechamento", "Vendas", "Diferença", "Status"),
-            show="headings",
-            yscrollcommand=scrollbar.set
+            columns=("ID", "Data", "Abertura", "Fechamento", "Vendas", "Diferença", "Status"),
+            data_source=PagedDataSource(self.fetch_history_page, self.count_history,
+                                        self.format_register)
         )
-        scrollbar.config(command=self.tree.yview)
+        self.tree = self.grid.tree
+        self.tree.configure(displaycolumns=("Data", "Abertura", "Fechamento", "Vendas",
+                                            "Diferença", "Status"))
         
         self.tree.heading("Data", text="Data")
         self.tree.heading("Abertura", text="Abertura")
@@ -987,7 +1043,7 @@ class CashHistoryDialog(ctk.CTkToplevel):
         self.tree.column("Diferença", width=120, anchor="center")
         self.tree.column("Status", width=100, anchor="center")
         
-        self.tree.pack(fill="both", expand=True, padx=10, pady=10)
+        self.grid.pack(fill="both", expand=True, padx=10, pady=10)
         
         # Botão fechar
         ctk.CTkButton(
@@ -999,14 +1055,26 @@ class CashHistoryDialog(ctk.CTkToplevel):
     
     def load_history(self):
         """Carrega histórico"""
-        registers = self.cash_controller.list_cash_registers(self.db, limit=100)
-        
-        for reg in registers:
-            self.tree.insert("", "end", values=(
-                reg.opening_date.strftime("%d/%m/%Y"),
-                f"R$ {reg.opening_balance:.2f}",
-                f"R$ {reg.closing_balance:.2f}" if reg.closing_balance else "-",
-                f"R$ {reg.total_sales:.2f}" if reg.total_sales else "R$ 0,00",
-                f"R$ {reg.difference:+.2f}" if reg.difference else "-",
-                "ABERTO" if reg.is_open else "FECHADO"
-            ))
+        self.grid.reset()
+    
+    def fetch_history_page(self, cursor, offset, limit):
+        """Busca uma página do histórico para a grade"""
+        with session_scope() as db:
+            return self.cash_controller.list_cash_registers_page(db, cursor, limit, offset)
+    
+    def count_history(self):
+        """Conta os caixas do histórico"""
+        with session_scope() as db:
+            return self.cash_controller.count_cash_registers(db)
+    
+    def format_register(self, reg):
+        """Formata um caixa como linha da grade"""
+        return (
+            reg.id,
+            reg.opening_date.strftime("%d/%m/%Y"),
+            f"R$ {reg.opening_balance:.2f}",
+            f"R$ {reg.closing_balance:.2f}" if reg.closing_balance else "-",
+            f"R$ {reg.total_sales:.2f}" if reg.total_sales else "R$ 0,00",
+            f"R$ {reg.difference:+.2f}" if reg.difference else "-",
+            "ABERTO" if reg.is_open else "FECHADO"
+        ), ()
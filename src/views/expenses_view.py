@@ -6,7 +6,10 @@ import customtkinter as ctk
 from tkinter import messagebox, ttk
 from datetime import datetime
 from src.controllers.expense_controller import ExpenseController
-from src.models.database import SessionLocal
+from src.controllers.events import ExpensePaid
+from src.models.database import session_scope
+from src.utils.virtual_grid import PagedDataSource, VirtualGrid
+from src.utils.ui_events import listen
 from src.utils.window_utils import set_dialog_size
 
 class ExpensesView(ctk.CTkFrame):
@@ -18,10 +21,11 @@ class ExpensesView(ctk.CTkFrame):
         self.parent = parent
         self.user_data = user_data
         self.expense_controller = ExpenseController()
-        self.db = SessionLocal()
         
         self.create_widgets()
         self.load_expenses()
+        
+        listen(self, ExpensePaid, self.on_expense_paid)
     
     def create_widgets(self):
         """Cria os widgets da tela"""
@@ -111,19 +115,15 @@ class ExpensesView(ctk.CTkFrame):
                        font=("Arial", 11, "bold"))
         style.map("Treeview", background=[("selected", "#1f538d")])
         
-        # Scrollbar
-        scrollbar = ttk.Scrollbar(table_frame)
-        scrollbar.pack(side="right", fill="y")
-        
-        # Treeview
-        self.tree = ttk.Treeview(
+        # Grade virtual (apenas as linhas visíveis são materializadas)
+        self.grid = VirtualGrid(
             table_frame,
             columns=("ID", "Nº", "Data", "Tipo", "Descrição", "Valor", "Vencimento", "Status"),
-            show="headings",
-            yscrollcommand=scrollbar.set,
+            data_source=PagedDataSource(self.fetch_expenses_page, self.count_expenses,
+                                        self.format_expense),
             height=15
         )
-        scrollbar.config(command=self.tree.yview)
+        self.tree = self.grid.tree
         
         # Configurar colunas
         self.tree.heading("ID", text="ID")
@@ -144,7 +144,10 @@ class ExpensesView(ctk.CTkFrame):
         self.tree.column("Vencimento", width=100, anchor="center")
         self.tree.column("Status", width=80, anchor="center")
         
-        self.tree.pack(fill="both", expand=True, padx=10, pady=10)
+        self.tree.tag_configure("overdue", background="#8B0000")
+        self.tree.tag_configure("paid", foreground="gray")
+        
+        self.grid.pack(fill="both", expand=True, padx=10, pady=10)
         
         # Frame de botões
         btn_frame = ctk.CTkFrame(self)
@@ -169,53 +172,73 @@ class ExpensesView(ctk.CTkFrame):
         view_btn.pack(side="left", padx=5)
     
     def load_expenses(self):
-        """Carrega despesas no Treeview"""
-        # Limpar tabela
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        """Carrega as despesas a partir das mais recentes e o resumo"""
+        self.grid.reset()
         
-        # Determinar filtro
+        # Atualizar resumo
+        self.update_summary()
+    
+    def on_expense_paid(self, event):
+        """Despesa paga: atualiza a linha e o resumo sem recarregar a grade"""
+        if self.get_paid_filter() is False:
+            # Filtro "Pendentes": a despesa sai da lista
+            self.grid.refresh()
+        elif event.expense_id in self.grid.loaded_keys():
+            with session_scope() as db:
+                expense = self.expense_controller.get_expense(db, event.expense_id, load="rows")
+            if expense:
+                self.grid.update_rows([expense])
+        
+        self.update_summary()
+    
+    def get_paid_filter(self):
+        """Converte o filtro de status selecionado (None = todas)"""
         filter_status = self.filter_var.get()
-        paid_filter = None
         if filter_status == "Pagas":
-            paid_filter = True
+            return True
         elif filter_status == "Pendentes":
-            paid_filter = False
-        
-        # Buscar despesas
-        expenses = self.expense_controller.list_expenses(self.db, paid=paid_filter)
-        
-        for expense in expenses[:100]:  # Limitar a 100
-            status = "Paga" if expense.paid else "Pendente"
-            vencimento = expense.due_date.strftime('%d/%m/%Y') if expense.due_date else "N/A"
-            
-            # Verificar se está vencida
-            tag = ""
-            if not expense.paid and expense.due_date and expense.due_date < datetime.now():
-                tag = "overdue"
-            elif expense.paid:
-                tag = "paid"
-            
-            self.tree.insert("", "end", values=(
-                expense.id,
-                expense.expense_number,
-                expense.expense_date.strftime('%d/%m/%Y'),
-                expense.expense_type,
-                expense.description[:40] + "..." if len(expense.description) > 40 else expense.description,
-                f"R$ {expense.amount:.2f}",
-                vencimento,
-                status
-            ), tags=(tag,))
-        
-        self.tree.tag_configure("overdue", background="#8B0000")
-        self.tree.tag_configure("paid", foreground="gray")
-        
-        # Atualizar resumo
-        self.update_summary()
+            return False
+        return None
+    
+    def fetch_expenses_page(self, cursor, offset, limit):
+        """Busca uma página de despesas para a grade (LIMIT no SQL)"""
+        with session_scope() as db:
+            return self.expense_controller.list_expenses_page(
+                db, cursor, limit, paid=self.get_paid_filter(), offset=offset
+            )
+    
+    def count_expenses(self):
+        """Conta as despesas exibidas na grade"""
+        with session_scope() as db:
+            return self.expense_controller.count_expenses(db, paid=self.get_paid_filter())
+    
+    def format_expense(self, expense):
+        """Formata uma despesa como linha da grade"""
+        status = "Paga" if expense.paid else "Pendente"
+        vencimento = expense.due_date.strftime('%d/%m/%Y') if expense.due_date else "N/A"
+        
+        # Verificar se está vencida
+        tags = ()
+        if not expense.paid and expense.due_date and expense.due_date < datetime.now():
+            tags = ("overdue",)
+        elif expense.paid:
+            tags = ("paid",)
+        
+        return (
+            expense.id,
+            expense.expense_number,
+            expense.expense_date.strftime('%d/%m/%Y'),
+            expense.expense_type,
+            expense.description[:40] + "..." if len(expense.description) > 40 else expense.description,
+            f"R$ {expense.amount:.2f}",
+            vencimento,
+            status
+        ), tags
     
     def update_summary(self):
         """Atualiza cards de resumo"""
-        summary = self.expense_controller.get_expenses_summary(self.db)
+        with session_scope() as db:
+            summary = self.expense_controller.get_expenses_summary(db)
         
         self.total_card.configure(text=f"Total: R$ {summary['total_amount']:.2f}")
         self.paid_card.configure(text=f"Pagas: R$ {summary['paid_amount']:.2f}")
@@ -237,15 +260,19 @@ class ExpensesView(ctk.CTkFrame):
         item = self.tree.item(selection[0])
         expense_id = item['values'][0]
         
-        expense = self.expense_controller.get_expense(self.db, expense_id)
+        with session_scope() as db:
+            expense = self.expense_controller.get_expense(db, expense_id)
+        
         if expense and expense.paid:
             messagebox.showinfo("Informação", "Esta despesa já está marcada como paga.")
             return
         
         if messagebox.askyesno("Confirmar", "Marcar esta despesa como paga?"):
-            if self.expense_controller.mark_as_paid(self.db, expense_id):
+            with session_scope() as db:
+                success = self.expense_controller.mark_as_paid(db, expense_id)
+            
+            if success:
                 messagebox.showinfo("Sucesso", "Despesa marcada como paga!")
-                self.load_expenses()
             else:
                 messagebox.showerror("Erro", "Erro ao marcar despesa como paga.")
     
@@ -259,9 +286,14 @@ class ExpensesView(ctk.CTkFrame):
         item = self.tree.item(selection[0])
         expense_id = item['values'][0]
         
-        expense = self.expense_controller.get_expense(self.db, expense_id)
-        if expense:
-            dialog = ExpenseDetailsDialog(self, expense)
+        # O diálogo é montado dentro da sessão (fornecedor e usuário)
+        dialog = None
+        with session_scope() as db:
+            expense = self.expense_controller.get_expense(db, expense_id, load="details")
+            if expense:
+                dialog = ExpenseDetailsDialog(self, expense)
+        
+        if dialog:
             self.wait_window(dialog)
 
 
@@ -274,7 +306,6 @@ class ExpenseDialog(ctk.CTkToplevel):
         self.parent = parent
         self.user_data = user_data
         self.expense_controller = ExpenseController()
-        self.db = SessionLocal()
         
         self.title("Nova Despesa")
         
@@ -405,18 +436,19 @@ class ExpenseDialog(ctk.CTkToplevel):
         notes = self.notes_entry.get().strip() or None
         
         # Criar despesa
-        expense = self.expense_controller.create_expense(
-            self.db,
-            user_id=self.user_data['id'],
-            expense_type=expense_type,
-            description=description,
-            amount=amount,
-            expense_date=expense_date,
-            due_date=due_date,
-            paid=paid,
-            payment_method=payment_method,
-            notes=notes
-        )
+        with session_scope() as db:
+            expense = self.expense_controller.create_expense(
+                db,
+                user_id=self.user_data['id'],
+                expense_type=expense_type,
+                description=description,
+                amount=amount,
+                expense_date=expense_date,
+                due_date=due_date,
+                paid=paid,
+                payment_method=payment_method,
+                notes=notes
+            )
         
         if expense:
             messagebox.showinfo("Sucesso", f"Despesa registrada!\n\nNúmero: {expense.expense_number}\nValor: R$ {expense.amount:.2f}")
@@ -5,7 +5,8 @@ Tela de autenticação do sistema
 import customtkinter as ctk
 from tkinter import messagebox
 from src.controllers.auth_controller import AuthController
-from src.models.database import SessionLocal
+from src.controllers.product_catalog import catalog
+from src.utils.task_runner import get_task_runner
 
 class LoginView(ctk.CTkFrame):
     """Tela de login"""
@@ -77,7 +78,7 @@ class LoginView(ctk.CTkFrame):
         self.password_entry.pack(padx=40, pady=(0, 25))
         
         # Botão de login
-        login_button = ctk.CTkButton(
+        self.login_button = ctk.CTkButton(
             form_frame,
             text="Entrar",
             width=300,
@@ -85,7 +86,7 @@ class LoginView(ctk.CTkFrame):
             font=("Arial", 16, "bold"),
             command=self.perform_login
         )
-        login_button.pack(padx=40, pady=(10, 30))
+        self.login_button.pack(padx=40, pady=(10, 30))
         
         # Bind Enter para fazer login
         self.password_entry.bind("<Return>", lambda e: self.perform_login())
@@ -101,6 +102,9 @@ class LoginView(ctk.CTkFrame):
     
     def perform_login(self):
         """Realiza o login"""
+        if self.login_button.cget("state") == "disabled":
+            return  # Login em andamento
+        
         username = self.username_entry.get().strip()
         password = self.password_entry.get()
         
@@ -111,27 +115,49 @@ class LoginView(ctk.CTkFrame):
             )
             return
         
-        # Tentar fazer login
-        db = SessionLocal()
-        try:
-            user_data = self.auth_controller.login(db, username, password)
-            
-            if user_data:
-                messagebox.showinfo(
-                    "Login bem-sucedido",
-                    f"Bem-vindo(a), {user_data['full_name']}!"
-                )
-                self.on_login_success(user_data)
-            else:
-                messagebox.showerror(
-                    "Erro de login",
-                    "Usuário ou senha incorretos."
-                )
-                self.password_entry.delete(0, "end")
-        except Exception as e:
+        # Verificação do bcrypt e carga do catálogo fora da thread do Tk
+        self.login_button.configure(state="disabled", text="Entrando...")
+        get_task_runner(self).submit(
+            self.login_task,
+            username,
+            password,
+            use_session=True,
+            name="Login",
+            on_success=self.on_login_result,
+            on_error=self.on_login_error
+        )
+    
+    def login_task(self, db, username, password):
+        """Autentica e carrega o catálogo de produtos (executa no worker)"""
+        user_data = self.auth_controller.login(db, username, password)
+        
+        # Carregar o catálogo de produtos usado pela tela de vendas
+        if user_data:
+            catalog.warm(db)
+        
+        return user_data
+    
+    def on_login_result(self, user_data):
+        """Trata o resultado do login"""
+        self.login_button.configure(state="normal", text="Entrar")
+        
+        if user_data:
+            messagebox.showinfo(
+                "Login bem-sucedido",
+                f"Bem-vindo(a), {user_data['full_name']}!"
+            )
+            self.on_login_success(user_data)
+        else:
             messagebox.showerror(
-                "Erro",
-                f"Erro ao realizar login: {str(e)}"
+                "Erro de login",
+                "Usuário ou senha incorretos."
             )
-        finally:
-            db.close()
+            self.password_entry.delete(0, "end")
+    
+    def on_login_error(self, error):
+        """Trata erros do login"""
+        self.login_button.configure(state="normal", text="Entrar")
+        messagebox.showerror(
+            "Erro",
+            f"Erro ao realizar login: {str(error)}"
+        )
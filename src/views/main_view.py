@@ -11,7 +11,17 @@ from src.views.purchases_view import PurchasesView
 from src.views.reports_view import ReportsView
 from src.views.settings_view import SettingsView
 from src.views.cash_register_view import CashRegisterView
+from src.controllers.dashboard_controller import DashboardController
+from src.controllers.events import ExpenseCreated, ExpensePaid, SaleCancelled, SaleCreated, StockChanged
+from src.models.database import session_scope
+from src.utils.charts import get_charts
 from src.utils.modern_theme import COLORS, create_colored_card, create_info_card
+from src.utils.task_runner import get_task_runner
+from src.utils.ui_events import listen
+
+# Largura (px) de cada gráfico no dashboard
+CHART_DISPLAY_WIDTH = 480
+
 
 class MainView(ctk.CTkFrame):
     """Tela principal do sistema"""
@@ -127,6 +137,30 @@ class MainView(ctk.CTkFrame):
             command=self.perform_logout
         )
         logout_btn.grid(row=11, column=0, padx=15, pady=(10, 20), sticky="ew")
+        
+        # Indicador de tarefas em segundo plano
+        self.busy_label = ctk.CTkLabel(
+            sidebar,
+            text="",
+            font=("Arial", 11),
+            text_color=COLORS['sidebar_text_secondary']
+        )
+        self.busy_label.grid(row=12, column=0, padx=15, pady=(0, 10), sticky="w")
+        
+        get_task_runner(self).add_busy_listener(self.on_busy_changed)
+        self.bind("<Destroy>", self.on_destroy)
+    
+    def on_busy_changed(self, busy, names):
+        """Atualiza o indicador de atividade"""
+        if busy:
+            self.busy_label.configure(text=f"⏳ {', '.join(names)}...")
+        else:
+            self.busy_label.configure(text="")
+    
+    def on_destroy(self, event):
+        """Remove o indicador de atividade ao sair da tela principal (logout)"""
+        if event.widget is self:
+            get_task_runner().remove_busy_listener(self.on_busy_changed)
     
     def clear_content(self):
         """Limpa a área de conteúdo"""
@@ -137,6 +171,10 @@ class MainView(ctk.CTkFrame):
         """Exibe o dashboard"""
         self.clear_content()
         
+        # Indicadores do mês (uma consulta, em cache por alguns segundos)
+        with session_scope() as db:
+            summary = DashboardController().get_dashboard(db)
+        
         # Header
         header_frame = ctk.CTkFrame(self.content_frame, fg_color="transparent")
         header_frame.pack(fill="x", pady=(0, 30))
@@ -169,8 +207,8 @@ class MainView(ctk.CTkFrame):
         card1 = create_colored_card(
             cards_frame,
             "Vendas do Mês",
-            "R$ 0,00",
-            "Total de vendas",
+            "",
+            "",
             COLORS['success'],
             "📈"
         )
@@ -180,8 +218,8 @@ class MainView(ctk.CTkFrame):
         card2 = create_colored_card(
             cards_frame,
             "Despesas do Mês",
-            "R$ 0,00",
-            "Total de despesas",
+            "",
+            "",
             COLORS['warning'],
             "💸"
         )
@@ -191,8 +229,8 @@ class MainView(ctk.CTkFrame):
         card3 = create_colored_card(
             cards_frame,
             "Saldo do Mês",
-            "R$ 0,00",
-            "Saldo positivo",
+            "",
+            "",
             COLORS['info'],
             "💰"
         )
@@ -202,7 +240,7 @@ class MainView(ctk.CTkFrame):
         card4 = create_colored_card(
             cards_frame,
             "Estoque Baixo",
-            "0",
+            "",
             "Produtos em alerta",
             COLORS['secondary'],
             "📦"
@@ -211,7 +249,7 @@ class MainView(ctk.CTkFrame):
         
         # Card de resumo financeiro
         summary_card = create_info_card(self.content_frame, "Resumo Financeiro")
-        summary_card.pack(fill="both", expand=True, pady=(0, 20))
+        summary_card.pack(fill="x", pady=(0, 20))
         
         # Conteúdo do resumo
         summary_content = ctk.CTkFrame(summary_card, fg_color="transparent")
@@ -228,12 +266,12 @@ class MainView(ctk.CTkFrame):
             text_color=COLORS['text_secondary']
         ).pack(side="left")
         
-        ctk.CTkLabel(
+        sales_label = ctk.CTkLabel(
             row1,
-            text="+ R$ 0,00",
             font=("Arial", 14, "bold"),
             text_color=COLORS['success']
-        ).pack(side="right")
+        )
+        sales_label.pack(side="right")
         
         # Linha 2
         row2 = ctk.CTkFrame(summary_content, fg_color="transparent")
@@ -246,12 +284,12 @@ class MainView(ctk.CTkFrame):
             text_color=COLORS['text_secondary']
         ).pack(side="left")
         
-        ctk.CTkLabel(
+        expenses_label = ctk.CTkLabel(
             row2,
-            text="- R$ 0,00",
             font=("Arial", 14, "bold"),
             text_color=COLORS['danger']
-        ).pack(side="right")
+        )
+        expenses_label.pack(side="right")
         
         # Separador
         separator = ctk.CTkFrame(summary_content, height=2, fg_color=COLORS['border_light'])
@@ -268,12 +306,135 @@ class MainView(ctk.CTkFrame):
             text_color=COLORS['text_primary']
         ).pack(side="left")
         
-        ctk.CTkLabel(
+        balance_label = ctk.CTkLabel(
             row3,
-            text="R$ 0,00",
-            font=("Arial", 16, "bold"),
-            text_color=COLORS['success']
-        ).pack(side="right")
+            font=("Arial", 16, "bold")
+        )
+        balance_label.pack(side="right")
+        
+        # Gráficos do mês (desenhados em segundo plano; placeholder até lá)
+        charts_frame = ctk.CTkFrame(self.content_frame, fg_color="transparent")
+        charts_frame.pack(fill="both", expand=True)
+        charts_frame.grid_columnconfigure((0, 1), weight=1)
+        
+        chart_labels = {}
+        for column, chart in enumerate(('trend', 'payment_mix')):
+            chart_labels[chart] = ctk.CTkLabel(
+                charts_frame,
+                text="Carregando gráfico...",
+                font=("Arial", 12),
+                text_color=COLORS['text_secondary']
+            )
+            chart_labels[chart].grid(row=0, column=column, padx=8, pady=8, sticky="nsew")
+        
+        self.dashboard_widgets = {
+            'sales_card': card1,
+            'expenses_card': card2,
+            'balance_card': card3,
+            'stock_card': card4,
+            'sales_label': sales_label,
+            'expenses_label': expenses_label,
+            'balance_label': balance_label,
+            'chart_labels': chart_labels
+        }
+        self.update_dashboard(summary)
+        self.load_dashboard_charts()
+        
+        # Enquanto o dashboard estiver na tela, os cards acompanham os commits
+        for event_type in (SaleCreated, SaleCancelled, ExpenseCreated, ExpensePaid, StockChanged):
+            listen(cards_frame, event_type, self.on_dashboard_event)
+    
+    def update_dashboard(self, summary: dict):
+        """Atualiza os valores do dashboard sem recriar os widgets"""
+        widgets = self.dashboard_widgets
+        balance = summary['balance']
+        balance_color = COLORS['success'] if balance >= 0 else COLORS['danger']
+        
+        widgets['sales_card'].value_label.configure(text=f"R$ {summary['sales_total']:.2f}")
+        widgets['sales_card'].subtitle_label.configure(
+            text=f"{summary['sales_count']} venda(s) • hoje R$ {summary['sales_today']:.2f}"
+        )
+        widgets['expenses_card'].value_label.configure(text=f"R$ {summary['expenses_total']:.2f}")
+        widgets['expenses_card'].subtitle_label.configure(
+            text=f"A pagar: R$ {summary['expenses_pending']:.2f}"
+        )
+        widgets['balance_card'].value_label.configure(text=f"R$ {balance:.2f}")
+        widgets['balance_card'].subtitle_label.configure(
+            text="Saldo positivo" if balance >= 0 else "Saldo negativo"
+        )
+        widgets['stock_card'].value_label.configure(text=str(summary['low_stock_count']))
+        
+        widgets['sales_label'].configure(text=f"+ R$ {summary['sales_total']:.2f}")
+        widgets['expenses_label'].configure(text=f"- R$ {summary['expenses_total']:.2f}")
+        widgets['balance_label'].configure(text=f"R$ {balance:.2f}", text_color=balance_color)
+    
+    def on_dashboard_event(self, event):
+        """Venda, despesa ou estoque alterados: agenda o recálculo dos indicadores"""
+        # Uma venda gera SaleCreated e StockChanged: um único recálculo
+        if not getattr(self, '_dashboard_refresh_pending', False):
+            self._dashboard_refresh_pending = True
+            self.after_idle(self.refresh_dashboard)
+    
+    def refresh_dashboard(self):
+        """Recalcula os indicadores exibidos (o dashboard pode ter saído da tela)"""
+        self._dashboard_refresh_pending = False
+        widgets = getattr(self, 'dashboard_widgets', None)
+        if not widgets or not widgets['sales_card'].winfo_exists():
+            return
+        
+        # Sem cache: a ordem dos listeners de commit não garante a invalidação antes do evento
+        with session_scope() as db:
+            summary = DashboardController().get_dashboard(db, use_cache=False)
+        self.update_dashboard(summary)
+        self.load_dashboard_charts()
+    
+    def load_dashboard_charts(self):
+        """
+        Desenha (ou busca no cache) os gráficos do mês em uma thread do
+        TaskRunner; o matplotlib só é importado lá, no primeiro desenho
+        """
+        from datetime import datetime, time
+        
+        now = datetime.now()
+        # Fim do dia, não agora: a chave do cache só muda com os dados
+        start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        end = datetime.combine(now.date(), time.max)
+        
+        get_task_runner(self).submit(
+            get_charts, start, end,
+            use_session=True,
+            on_success=self.show_dashboard_charts,
+            on_error=self.on_dashboard_charts_error,
+            name="Gráficos do dashboard"
+        )
+    
+    def show_dashboard_charts(self, charts: dict):
+        """Exibe os PNGs como CTkImage (thread do Tk)"""
+        from PIL import Image
+        
+        widgets = getattr(self, 'dashboard_widgets', None)
+        if not widgets or not widgets['sales_card'].winfo_exists():
+            return
+        
+        for chart, label in widgets['chart_labels'].items():
+            # Cópia em memória: o PNG pode sair do cache com a imagem na tela
+            with Image.open(charts[chart]) as png:
+                image = png.copy()
+            width, height = image.size
+            size = (CHART_DISPLAY_WIDTH, round(CHART_DISPLAY_WIDTH * height / width))
+            label.configure(
+                image=ctk.CTkImage(light_image=image, dark_image=image, size=size),
+                text=""
+            )
+    
+    def on_dashboard_charts_error(self, error):
+        """Falha nos gráficos não impede o uso do dashboard"""
+        print(f"Erro ao gerar gráficos do dashboard: {error}")
+        widgets = getattr(self, 'dashboard_widgets', None)
+        if not widgets or not widgets['sales_card'].winfo_exists():
+            return
+        for label in widgets['chart_labels'].values():
+            label.configure(text="Gráfico indisponível")
     
     def show_cash_register(self):
         """Exibe a tela de caixa"""
@@ -5,7 +5,10 @@ Tela de gerenciamento de produtos
 import customtkinter as ctk
 from tkinter import messagebox, ttk
 from src.controllers.product_controller import ProductController
-from src.models.database import SessionLocal
+from src.controllers.events import StockChanged
+from src.models.database import session_scope
+from src.utils.virtual_grid import PagedDataSource, VirtualGrid
+from src.utils.ui_events import listen
 from src.utils.window_utils import set_dialog_size
 
 class ProductsView(ctk.CTkFrame):
@@ -16,10 +19,12 @@ class ProductsView(ctk.CTkFrame):
         
         self.parent = parent
         self.product_controller = ProductController()
-        self.db = SessionLocal()
         
         self.create_widgets()
         self.load_products()
+        
+        # Vendas, compras e ajustes atualizam só o estoque das linhas carregadas
+        listen(self, StockChanged, self.on_stock_changed)
     
     def create_widgets(self):
         """Cria os widgets da tela"""
@@ -90,19 +95,16 @@ class ProductsView(ctk.CTkFrame):
                        font=("Arial", 11, "bold"))
         style.map("Treeview", background=[("selected", "#1f538d")])
         
-        # Scrollbar
-        scrollbar = ttk.Scrollbar(table_frame)
-        scrollbar.pack(side="right", fill="y")
-        
-        # Treeview
-        self.tree = ttk.Treeview(
+        # Grade virtual (apenas as linhas visíveis são materializadas)
+        self.search_term = ""
+        self.grid = VirtualGrid(
             table_frame,
             columns=("ID", "Código", "Nome", "Categoria", "Preço Venda", "Estoque", "Status"),
-            show="headings",
-            yscrollcommand=scrollbar.set,
+            data_source=PagedDataSource(self.fetch_products_page, self.count_products,
+                                        self.format_product),
             height=15
         )
-        scrollbar.config(command=self.tree.yview)
+        self.tree = self.grid.tree
         
         # Configurar colunas
         self.tree.heading("ID", text="ID")
@@ -121,7 +123,10 @@ class ProductsView(ctk.CTkFrame):
         self.tree.column("Estoque", width=80, anchor="center")
         self.tree.column("Status", width=80, anchor="center")
         
-        self.tree.pack(fill="both", expand=True, padx=10, pady=10)
+        # Configurar cor para estoque baixo
+        self.tree.tag_configure("low_stock", background="#8B0000")
+        
+        self.grid.pack(fill="both", expand=True, padx=10, pady=10)
         
         # Bind duplo clique
         self.tree.bind("<Double-1>", lambda e: self.edit_product())
@@ -157,62 +162,56 @@ class ProductsView(ctk.CTkFrame):
         stock_btn.pack(side="left", padx=5)
     
     def load_products(self):
-        """Carrega produtos no Treeview"""
-        # Limpar tabela
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        # Buscar produtos
-        products = self.product_controller.list_products(self.db, active_only=False)
-        
-        for product in products:
-            category_name = product.category.name if product.category else "N/A"
-            status = "Ativo" if product.is_active else "Inativo"
-            
-            # Colorir linha se estoque baixo
-            tag = "low_stock" if product.stock_quantity <= product.min_stock else ""
-            
-            self.tree.insert("", "end", values=(
-                product.id,
-                product.code,
-                product.name,
-                category_name,
-                f"R$ {product.sale_price:.2f}",
-                f"{product.stock_quantity:.0f}",
-                status
-            ), tags=(tag,))
-        
-        # Configurar cor para estoque baixo
-        self.tree.tag_configure("low_stock", background="#8B0000")
+        """Carrega produtos na grade (mantém a posição atual)"""
+        self.grid.refresh()
+    
+    def on_stock_changed(self, event):
+        """Atualiza as linhas carregadas dos produtos com estoque alterado"""
+        product_ids = self.grid.loaded_keys() & set(event.stock_levels)
+        if not product_ids:
+            return
+        with session_scope() as db:
+            products = self.product_controller.get_product_rows(db, product_ids)
+        self.grid.update_rows(products)
     
     def search_products(self):
         """Busca produtos"""
-        search_term = self.search_entry.get().strip()
-        
-        # Limpar tabela
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        if not search_term:
-            self.load_products()
-            return
-        
-        # Buscar produtos
-        products = self.product_controller.search_products(self.db, search_term)
-        
-        for product in products:
-            category_name = product.category.name if product.category else "N/A"
-            status = "Ativo" if product.is_active else "Inativo"
-            
-            self.tree.insert("", "end", values=(
-                product.id,
-                product.code,
-                product.name,
-                category_name,
-                f"R$ {product.sale_price:.2f}",
-                f"{product.stock_quantity:.0f}",
-                status
-            ))
+        self.search_term = self.search_entry.get().strip()
+        self.grid.reset()
+    
+    def fetch_products_page(self, cursor, offset, limit):
+        """Busca uma página de produtos para a grade"""
+        with session_scope() as db:
+            return self.product_controller.list_products_page(
+                db, cursor, limit,
+                active_only=bool(self.search_term),
+                search=self.search_term or None,
+                offset=offset
+            )
+    
+    def count_products(self):
+        """Conta os produtos exibidos na grade"""
+        with session_scope() as db:
+            return self.product_controller.count_products(
+                db, active_only=bool(self.search_term), search=self.search_term or None
+            )
+    
+    def format_product(self, product):
+        """Formata um produto como linha da grade"""
+        status = "Ativo" if product.is_active else "Inativo"
+        
+        # Colorir linha se estoque baixo
+        tags = ("low_stock",) if product.stock_quantity <= product.min_stock else ()
+        
+        return (
+            product.id,
+            product.code,
+            product.name,
+            product.category_name or "N/A",
+            f"R$ {product.sale_price:.2f}",
+            f"{product.stock_quantity:.0f}",
+            status
+        ), tags
     
     def show_new_product_dialog(self):
         """Mostra diálogo de novo produto"""
@@ -230,7 +229,9 @@ class ProductsView(ctk.CTkFrame):
         item = self.tree.item(selection[0])
         product_id = item['values'][0]
         
-        product = self.product_controller.get_product(self.db, product_id)
+        with session_scope() as db:
+            product = self.product_controller.get_product(db, product_id)
+        
         if product:
             dialog = ProductDialog(self, "Editar Produto", product)
             self.wait_window(dialog)
@@ -248,7 +249,10 @@ class ProductsView(ctk.CTkFrame):
         product_name = item['values'][2]
         
         if messagebox.askyesno("Confirmar", f"Deseja inativar o produto '{product_name}'?"):
-            if self.product_controller.delete_product(self.db, product_id):
+            with session_scope() as db:
+                success = self.product_controller.delete_product(db, product_id)
+            
+            if success:
                 messagebox.showinfo("Sucesso", "Produto inativado com sucesso!")
                 self.load_products()
             else:
@@ -264,11 +268,12 @@ class ProductsView(ctk.CTkFrame):
         item = self.tree.item(selection[0])
         product_id = item['values'][0]
         
-        product = self.product_controller.get_product(self.db, product_id)
+        with session_scope() as db:
+            product = self.product_controller.get_product(db, product_id)
+        
         if product:
             dialog = StockAdjustDialog(self, product)
             self.wait_window(dialog)
-            self.load_products()
 
 
 class ProductDialog(ctk.CTkToplevel):
@@ -280,7 +285,6 @@ class ProductDialog(ctk.CTkToplevel):
         self.parent = parent
         self.product = product
         self.product_controller = ProductController()
-        self.db = SessionLocal()
         
         self.title(title)
         
@@ -308,6 +312,11 @@ class ProductDialog(ctk.CTkToplevel):
         self.code_entry = ctk.CTkEntry(main_frame, width=450, height=35)
         self.code_entry.pack(pady=(0, 10))
         
+        # Código de barras
+        ctk.CTkLabel(main_frame, text="Código de Barras:", font=("Arial", 12)).pack(pady=(5, 5), anchor="w")
+        self.barcode_entry = ctk.CTkEntry(main_frame, width=450, height=35, placeholder_text="EAN/GTIN (opcional)")
+        self.barcode_entry.pack(pady=(0, 10))
+        
         # Nome
         ctk.CTkLabel(main_frame, text="Nome:*", font=("Arial", 12)).pack(pady=(5, 5), anchor="w")
         self.name_entry = ctk.CTkEntry(main_frame, width=450, height=35)
@@ -387,6 +396,8 @@ class ProductDialog(ctk.CTkToplevel):
         self.code_entry.insert(0, self.product.code)
         self.code_entry.configure(state="disabled")
         self.name_entry.insert(0, self.product.name)
+        if self.product.barcode:
+            self.barcode_entry.insert(0, self.product.barcode)
         if self.product.description:
             self.desc_entry.insert(0, self.product.description)
         self.unit_entry.delete(0, "end")
@@ -401,6 +412,7 @@ class ProductDialog(ctk.CTkToplevel):
         """Salva produto"""
         code = self.code_entry.get().strip()
         name = self.name_entry.get().strip()
+        barcode = self.barcode_entry.get().strip() or None
         description = self.desc_entry.get().strip()
         unit = self.unit_entry.get().strip()
         
@@ -423,16 +435,18 @@ class ProductDialog(ctk.CTkToplevel):
         
         if self.product:
             # Atualizar
-            success = self.product_controller.update_product(
-                self.db,
-                self.product.id,
-                name=name,
-                description=description,
-                unit=unit,
-                cost_price=cost_price,
-                sale_price=sale_price,
-                min_stock=min_stock
-            )
+            with session_scope() as db:
+                success = self.product_controller.update_product(
+                    db,
+                    self.product.id,
+                    name=name,
+                    barcode=barcode,
+                    description=description,
+                    unit=unit,
+                    cost_price=cost_price,
+                    sale_price=sale_price,
+                    min_stock=min_stock
+                )
             
             if success:
                 messagebox.showinfo("Sucesso", "Produto atualizado com sucesso!")
@@ -441,17 +455,19 @@ class ProductDialog(ctk.CTkToplevel):
                 messagebox.showerror("Erro", "Erro ao atualizar produto.")
         else:
             # Criar novo
-            product = self.product_controller.create_product(
-                self.db,
-                code=code,
-                name=name,
-                description=description,
-                unit=unit,
-                cost_price=cost_price,
-                sale_price=sale_price,
-                stock_quantity=stock,
-                min_stock=min_stock
-            )
+            with session_scope() as db:
+                product = self.product_controller.create_product(
+                    db,
+                    code=code,
+                    barcode=barcode,
+                    name=name,
+                    description=description,
+                    unit=unit,
+                    cost_price=cost_price,
+                    sale_price=sale_price,
+                    stock_quantity=stock,
+                    min_stock=min_stock
+                )
             
             if product:
                 messagebox.showinfo("Sucesso", "Produto cadastrado com sucesso!")
@@ -469,7 +485,6 @@ class StockAdjustDialog(ctk.CTkToplevel):
         self.parent = parent
         self.product = product
         self.product_controller = ProductController()
-        self.db = SessionLocal()
         
         self.title("Ajustar Estoque")
         
@@ -568,13 +583,14 @@ class StockAdjustDialog(ctk.CTkToplevel):
         movement_type = self.type_var.get()
         reason = self.reason_entry.get().strip() or "Ajuste manual"
         
-        success = self.product_controller.update_stock(
-            self.db,
-            self.product.id,
-            quantity,
-            movement_type,
-            reason
-        )
+        with session_scope() as db:
+            success = self.product_controller.update_stock(
+                db,
+                self.product.id,
+                quantity,
+                movement_type,
+                reason
+            )
         
         if success:
             messagebox.showinfo("Sucesso", "Estoque ajustado com sucesso!")
@@ -7,7 +7,8 @@ from tkinter import messagebox, ttk
 from datetime import datetime
 from src.controllers.purchase_controller import PurchaseController
 from src.controllers.product_controller import ProductController
-from src.models.database import SessionLocal
+from src.models.database import session_scope
+from src.utils.virtual_grid import PagedDataSource, VirtualGrid
 from src.utils.window_utils import set_dialog_size
 
 class PurchasesView(ctk.CTkFrame):
@@ -19,7 +20,6 @@ class PurchasesView(ctk.CTkFrame):
         self.parent = parent
         self.user_data = user_data
         self.purchase_controller = PurchaseController()
-        self.db = SessionLocal()
         
         self.create_widgets()
         self.load_purchases()
@@ -81,19 +81,15 @@ class PurchasesView(ctk.CTkFrame):
                        font=("Arial", 11, "bold"))
         style.map("Treeview", background=[("selected", "#1f538d")])
         
-        # Scrollbar
-        scrollbar = ttk.Scrollbar(table_frame)
-        scrollbar.pack(side="right", fill="y")
-        
-        # Treeview
-        self.tree = ttk.Treeview(
+        # Grade virtual (apenas as linhas visíveis são materializadas)
+        self.grid = VirtualGrid(
             table_frame,
             columns=("ID", "Nº Compra", "Data", "Fornecedor", "Total", "Itens"),
-            show="headings",
-            yscrollcommand=scrollbar.set,
+            data_source=PagedDataSource(self.fetch_purchases_page, self.count_purchases,
+                                        self.format_purchase),
             height=15
         )
-        scrollbar.config(command=self.tree.yview)
+        self.tree = self.grid.tree
         
         # Configurar colunas
         self.tree.heading("ID", text="ID")
@@ -110,7 +106,7 @@ class PurchasesView(ctk.CTkFrame):
         self.tree.column("Total", width=150, anchor="center")
         self.tree.column("Itens", width=100, anchor="center")
         
-        self.tree.pack(fill="both", expand=True, padx=10, pady=10)
+        self.grid.pack(fill="both", expand=True, padx=10, pady=10)
         
         # Bind duplo clique
         self.tree.bind("<Double-1>", lambda e: self.view_purchase_details())
@@ -128,23 +124,29 @@ class PurchasesView(ctk.CTkFrame):
         view_btn.pack(side="left", padx=5)
     
     def load_purchases(self):
-        """Carrega compras no Treeview"""
-        # Limpar tabela
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        # Buscar compras
-        purchases = self.purchase_controller.list_purchases(self.db)
-        
-        for purchase in purchases[:100]:  # Limitar a 100
-            self.tree.insert("", "end", values=(
-                purchase.id,
-                purchase.purchase_number,
-                purchase.purchase_date.strftime('%d/%m/%Y %H:%M'),
-                purchase.supplier.name,
-                f"R$ {purchase.total_amount:.2f}",
-                len(purchase.items)
-            ))
+        """Carrega as compras a partir das mais recentes"""
+        self.grid.reset()
+    
+    def fetch_purchases_page(self, cursor, offset, limit):
+        """Busca uma página de compras para a grade (LIMIT no SQL)"""
+        with session_scope() as db:
+            return self.purchase_controller.list_purchases_page(db, cursor, limit, offset=offset)
+    
+    def count_purchases(self):
+        """Conta as compras exibidas na grade"""
+        with session_scope() as db:
+            return self.purchase_controller.count_purchases(db)
+    
+    def format_purchase(self, purchase):
+        """Formata uma compra como linha da grade"""
+        return (
+            purchase.id,
+            purchase.purchase_number,
+            purchase.purchase_date.strftime('%d/%m/%Y %H:%M'),
+            purchase.supplier_name,
+            f"R$ {purchase.total_amount:.2f}",
+            purchase.item_count
+        ), ()
     
     def show_new_purchase_dialog(self):
         """Mostra diálogo de nova compra"""
@@ -162,9 +164,14 @@ class PurchasesView(ctk.CTkFrame):
         item = self.tree.item(selection[0])
         purchase_id = item['values'][0]
         
-        purchase = self.purchase_controller.get_purchase(self.db, purchase_id)
-        if purchase:
-            dialog = PurchaseDetailsDialog(self, purchase)
+        # O diálogo é montado dentro da sessão (itens, fornecedor e comprador)
+        dialog = None
+        with session_scope() as db:
+            purchase = self.purchase_controller.get_purchase(db, purchase_id, load="details")
+            if purchase:
+                dialog = PurchaseDetailsDialog(self, purchase)
+        
+        if dialog:
             self.wait_window(dialog)
 
 
@@ -178,7 +185,6 @@ class NewPurchaseDialog(ctk.CTkToplevel):
         self.user_data = user_data
         self.purchase_controller = PurchaseController()
         self.product_controller = ProductController()
-        self.db = SessionLocal()
         
         self.title("Nova Compra")
         
@@ -331,7 +337,9 @@ class NewPurchaseDialog(ctk.CTkToplevel):
     
     def load_products(self):
         """Carrega produtos no combobox"""
-        products = self.product_controller.list_products(self.db, active_only=True)
+        with session_scope() as db:
+            products = self.product_controller.list_products(db, active_only=True)
+        
         self.products_dict = {f"{p.code} - {p.name}": p for p in products}
         self.product_combo.configure(values=list(self.products_dict.keys()))
     
@@ -413,20 +421,21 @@ class NewPurchaseDialog(ctk.CTkToplevel):
         # Por enquanto, criar um fornecedor temporário
         # Em produção, buscar da tabela de fornecedores
         from src.models import Supplier
-        supplier = self.db.query(Supplier).filter(Supplier.name == supplier_name).first()
-        if not supplier:
-            supplier = Supplier(name=supplier_name)
-            self.db.add(supplier)
-            self.db.commit()
-            self.db.refresh(supplier)
-        
-        # Criar compra
-        purchase = self.purchase_controller.create_purchase(
-            self.db,
-            user_id=self.user_data['id'],
-            supplier_id=supplier.id,
-            items=self.items
-        )
+        with session_scope() as db:
+            supplier = db.query(Supplier).filter(Supplier.name == supplier_name).first()
+            if not supplier:
+                supplier = Supplier(name=supplier_name)
+                db.add(supplier)
+                db.commit()
+                db.refresh(supplier)
+            
+            # Criar compra
+            purchase = self.purchase_controller.create_purchase(
+                db,
+                user_id=self.user_data['id'],
+                supplier_id=supplier.id,
+                items=self.items
+            )
         
         if purchase:
             messagebox.showinfo(
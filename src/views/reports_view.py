@@ -5,8 +5,8 @@ Tela de geração e visualização de relatórios
 import customtkinter as ctk
 from tkinter import messagebox, filedialog
 from datetime import datetime, timedelta
-from src.utils.report_generator import ReportGenerator
-from src.models.database import SessionLocal
+from src.utils.report_generator import ReportGenerator, generate_report
+from src.utils.task_runner import get_task_runner
 from src.utils.window_utils import set_dialog_size
 
 class ReportsView(ctk.CTkFrame):
@@ -18,7 +18,6 @@ class ReportsView(ctk.CTkFrame):
         self.parent = parent
         self.user_data = user_data
         self.report_generator = ReportGenerator()
-        self.db = SessionLocal()
         
         self.create_widgets()
     
@@ -93,6 +92,15 @@ class ReportsView(ctk.CTkFrame):
             
             main_frame.grid_columnconfigure(col, weight=1)
             main_frame.grid_rowconfigure(row, weight=1)
+        
+        # Pacote do fechamento do mês (todos os relatórios de uma vez)
+        ctk.CTkButton(
+            self,
+            text="🗂️ Pacote do Mês (todos os relatórios)",
+            font=("Arial", 14, "bold"),
+            height=45,
+            command=self.open_pack_dialog
+        ).pack(fill="x", padx=35, pady=(0, 20))
     
     def create_report_card(self, parent, card_info):
         """Cria um card de relatório"""
@@ -158,6 +166,11 @@ class ReportsView(ctk.CTkFrame):
         """Abre diálogo de configuração do relatório"""
         dialog = ReportConfigDialog(self, report_type)
         self.wait_window(dialog)
+    
+    def open_pack_dialog(self):
+        """Abre diálogo do pacote de relatórios do mês"""
+        dialog = ReportPackDialog(self)
+        self.wait_window(dialog)
 
 
 class ReportConfigDialog(ctk.CTkToplevel):
@@ -169,7 +182,7 @@ class ReportConfigDialog(ctk.CTkToplevel):
         self.parent = parent
         self.report_type = report_type
         self.report_generator = ReportGenerator()
-        self.db = SessionLocal()
+        self.task = None
         
         # Configurar janela
         self.title(f"Configurar Relatório - {self.get_report_name()}")
@@ -179,6 +192,7 @@ class ReportConfigDialog(ctk.CTkToplevel):
         
         # Maximizar janela
         set_dialog_size(self, 'medium', maximized=True)
+        self.protocol("WM_DELETE_WINDOW", self.close)
         
         self.create_widgets()
     
@@ -280,20 +294,30 @@ class ReportConfigDialog(ctk.CTkToplevel):
         self.format_var = ctk.StringVar(value="pdf")
         ctk.CTkRadioButton(format_frame, text="PDF", variable=self.format_var, value="pdf").pack(side="left", padx=5)
         ctk.CTkRadioButton(format_frame, text="Excel", variable=self.format_var, value="excel").pack(side="left", padx=5)
+        ctk.CTkRadioButton(format_frame, text="CSV", variable=self.format_var, value="csv").pack(side="left", padx=5)
+        
+        # Progresso (linhas processadas / previstas)
+        self.progress_bar = ctk.CTkProgressBar(main_frame)
+        self.progress_bar.set(0)
+        self.progress_bar.pack(fill="x", padx=10, pady=(15, 5))
+        
+        self.status_label = ctk.CTkLabel(main_frame, text="", font=("Arial", 11), text_color="gray")
+        self.status_label.pack(anchor="w", padx=10)
         
         # Botões
         btn_frame = ctk.CTkFrame(self, fg_color="transparent")
         btn_frame.pack(fill="x", padx=20, pady=(0, 20))
         
-        cancel_btn = ctk.CTkButton(
+        # Fecha o diálogo ou, durante a geração, interrompe o relatório
+        self.cancel_btn = ctk.CTkButton(
             btn_frame,
             text="Cancelar",
             width=150,
-            command=self.destroy
+            command=self.cancel
         )
-        cancel_btn.pack(side="right", padx=5)
+        self.cancel_btn.pack(side="right", padx=5)
         
-        generate_btn = ctk.CTkButton(
+        self.generate_btn = ctk.CTkButton(
             btn_frame,
             text="✅ Gerar Relatório",
             width=200,
@@ -303,7 +327,7 @@ class ReportConfigDialog(ctk.CTkToplevel):
             hover_color="darkblue",
             command=self.generate_report
         )
-        generate_btn.pack(side="right", padx=5)
+        self.generate_btn.pack(side="right", padx=5)
     
     def create_specific_options(self, parent):
         """Cria opções específicas por tipo de relatório"""
@@ -372,6 +396,8 @@ class ReportConfigDialog(ctk.CTkToplevel):
     
     def generate_report(self):
         """Gera o relatório"""
+        if self.task is not None:
+            return  # Relatório já em geração
         
         start_date, end_date = self.get_date_range()
         if not start_date or not end_date:
@@ -386,6 +412,9 @@ class ReportConfigDialog(ctk.CTkToplevel):
         if self.format_var.get() == "pdf":
             default_filename += ".pdf"
             filetypes = [("PDF files", "*.pdf")]
+        elif self.format_var.get() == "csv":
+            default_filename += ".csv"
+            filetypes = [("CSV files", "*.csv")]
         else:
             default_filename += ".xlsx"
             filetypes = [("Excel files", "*.xlsx")]
@@ -399,56 +428,267 @@ class ReportConfigDialog(ctk.CTkToplevel):
         if not filepath:
             return
         
+        # Geração em um processo separado (PDF é trabalho de CPU) com sessão própria
+        self.generate_btn.configure(state="disabled", text="Gerando...")
+        self.cancel_btn.configure(text="Cancelar geração")
+        self.progress_bar.set(0)
+        self.status_label.configure(text="Consultando...")
+        
+        self.task = get_task_runner(self).submit_process(
+            generate_report,
+            self.report_type,
+            start_date,
+            end_date,
+            filepath,
+            self.format_var.get(),
+            use_session=True,
+            use_task=True,
+            name=f"Relatório de {self.get_report_name()}",
+            on_success=self.on_report_generated,
+            on_error=self.on_report_error,
+            on_progress=self.on_report_progress,
+            on_cancel=self.on_report_cancelled
+        )
+    
+    def on_report_progress(self, fraction, message):
+        """Atualiza a barra a cada bloco de linhas"""
+        self.progress_bar.set(fraction)
+        self.status_label.configure(text=message or "")
+    
+    def on_report_generated(self, filepath):
+        """Informa o arquivo gerado"""
+        self.task = None
+        self.progress_bar.set(1)
+        messagebox.showinfo(
+            "Sucesso",
+            f"Relatório gerado com sucesso!\n\nArquivo: {filepath}"
+        )
+        self.destroy()
+    
+    def on_report_error(self, error):
+        """Informa erro na geração"""
+        self.reset_generation()
+        messagebox.showerror("Erro", f"Erro ao gerar relatório:\n{str(error)}")
+    
+    def on_report_cancelled(self):
+        """Geração interrompida; o arquivo parcial já foi removido"""
+        self.reset_generation()
+        if self.winfo_exists():
+            self.status_label.configure(text="Geração cancelada")
+    
+    def reset_generation(self):
+        """Volta o diálogo ao estado inicial (o diálogo pode ter sido fechado)"""
+        self.task = None
+        if not self.winfo_exists():
+            return
+        self.generate_btn.configure(state="normal", text="✅ Gerar Relatório")
+        self.cancel_btn.configure(state="normal", text="Cancelar")
+        self.progress_bar.set(0)
+        self.status_label.configure(text="")
+    
+    def cancel(self):
+        """Interrompe a geração em andamento ou fecha o diálogo"""
+        if self.task is None:
+            self.destroy()
+            return
+        self.task.cancel()
+        self.cancel_btn.configure(state="disabled", text="Cancelando...")
+        self.status_label.configure(text="Cancelando...")
+    
+    def close(self):
+        """Fecha o diálogo, interrompendo o relatório em geração"""
+        if self.task is not None:
+            self.task.cancel()
+        self.destroy()
+
+
+class ReportPackDialog(ctk.CTkToplevel):
+    """Diálogo do pacote de relatórios do fechamento do mês"""
+    
+    def __init__(self, parent):
+        super().__init__(parent)
+        
+        self.parent = parent
+        self.task = None
+        
+        self.title("Pacote de Relatórios do Mês")
+        
+        self.transient(parent)
+        self.grab_set()
+        
+        set_dialog_size(self, 'medium', maximized=False)
+        self.protocol("WM_DELETE_WINDOW", self.close)
+        
+        self.create_widgets()
+    
+    def create_widgets(self):
+        """Cria widgets do diálogo"""
+        
+        main_frame = ctk.CTkFrame(self)
+        main_frame.pack(fill="both", expand=True, padx=20, pady=20)
+        
+        ctk.CTkLabel(
+            main_frame,
+            text="🗂️ Pacote de Relatórios do Mês",
+            font=("Arial", 20, "bold")
+        ).pack(pady=(0, 10))
+        
+        ctk.CTkLabel(
+            main_frame,
+            text="Vendas, despesas, compras, estoque e financeiro, gerados juntos em uma pasta",
+            font=("Arial", 12),
+            text_color="gray"
+        ).pack(pady=(0, 15))
+        
+        # Mês
+        month_frame = ctk.CTkFrame(main_frame)
+        month_frame.pack(fill="x", pady=10)
+        
+        ctk.CTkLabel(month_frame, text="📅 Mês:", font=("Arial", 12)).pack(side="left", padx=10)
+        self.month_entry = ctk.CTkEntry(month_frame, width=120, placeholder_text="MM/AAAA")
+        self.month_entry.pack(side="left", padx=5)
+        self.month_entry.insert(0, datetime.now().strftime("%m/%Y"))
+        
+        # Formato
+        format_frame = ctk.CTkFrame(main_frame)
+        format_frame.pack(fill="x", pady=10)
+        
+        ctk.CTkLabel(format_frame, text="📄 Formato:", font=("Arial", 12)).pack(side="left", padx=10)
+        
+        self.format_var = ctk.StringVar(value="pdf")
+        ctk.CTkRadioButton(format_frame, text="PDF", variable=self.format_var, value="pdf").pack(side="left", padx=5)
+        ctk.CTkRadioButton(format_frame, text="Excel", variable=self.format_var, value="excel").pack(side="left", padx=5)
+        ctk.CTkRadioButton(format_frame, text="CSV", variable=self.format_var, value="csv").pack(side="left", padx=5)
+        
+        self.zip_var = ctk.BooleanVar(value=True)
+        ctk.CTkCheckBox(main_frame, text="Compactar em um arquivo .zip", variable=self.zip_var).pack(anchor="w", padx=10, pady=10)
+        
+        # Progresso
+        self.progress_bar = ctk.CTkProgressBar(main_frame)
+        self.progress_bar.set(0)
+        self.progress_bar.pack(fill="x", padx=10, pady=(15, 5))
+        
+        self.status_label = ctk.CTkLabel(main_frame, text="", font=("Arial", 11), text_color="gray")
+        self.status_label.pack(anchor="w", padx=10)
+        
+        # Botões
+        btn_frame = ctk.CTkFrame(self, fg_color="transparent")
+        btn_frame.pack(fill="x", padx=20, pady=(0, 20))
+        
+        ctk.CTkButton(
+            btn_frame,
+            text="Fechar",
+            width=150,
+            command=self.close
+        ).pack(side="right", padx=5)
+        
+        self.generate_btn = ctk.CTkButton(
+            btn_frame,
+            text="✅ Gerar Pacote",
+            width=200,
+            height=45,
+            font=("Arial", 14, "bold"),
+            fg_color="blue",
+            hover_color="darkblue",
+            command=self.generate_pack
+        )
+        self.generate_btn.pack(side="right", padx=5)
+    
+    def get_month_range(self):
+        """Retorna o primeiro e o último instante do mês informado"""
         try:
-            # Gerar relatório conforme tipo
-            if self.report_type == 'sales':
-                self.report_generator.generate_sales_report(
-                    self.db,
-                    start_date,
-                    end_date,
-                    filepath
-                )
-            elif self.report_type == 'expenses':
-                self.report_generator.generate_expenses_report_complete(
-                    self.db,
-                    start_date,
-                    end_date,
-                    filepath
-                )
-            elif self.report_type == 'financial':
-                self.report_generator.generate_financial_report(
-                    self.db,
-                    start_date,
-                    end_date,
-                    filepath
-                )
-            elif self.report_type == 'stock':
-                self.report_generator.generate_stock_report(
-                    self.db,
-                    start_date,
-                    end_date,
-                    filepath
-                )
-            elif self.report_type == 'purchases':
-                self.report_generator.generate_purchases_report(
-                    self.db,
-                    start_date,
-                    end_date,
-                    filepath
-                )
-            else:
-                self.report_generator.generate_sales_report(
-                    self.db,
-                    start_date,
-                    end_date,
-                    filepath
-                )
-            
+            start_date = datetime.strptime(self.month_entry.get().strip(), "%m/%Y")
+        except ValueError:
+            messagebox.showerror("Erro", "Mês inválido! Use o formato MM/AAAA")
+            return None, None
+        
+        next_month = (start_date.replace(day=28) + timedelta(days=4)).replace(day=1)
+        return start_date, next_month - timedelta(microseconds=1)
+    
+    def generate_pack(self):
+        """Gera o pacote em segundo plano (um processo por relatório)"""
+        from src.utils.report_pack import generate_report_pack
+        
+        if self.task is not None:
+            return  # Pacote já em geração
+        
+        start_date, end_date = self.get_month_range()
+        if not start_date:
+            return
+        
+        output_dir = filedialog.askdirectory(title="Pasta onde o pacote será salvo")
+        if not output_dir:
+            return
+        
+        self.generate_btn.configure(state="disabled", text="Gerando...")
+        self.progress_bar.set(0)
+        self.status_label.configure(text="Iniciando...")
+        
+        self.task = get_task_runner(self).submit(
+            generate_report_pack,
+            start_date,
+            end_date,
+            output_dir,
+            self.format_var.get(),
+            zip_pack=self.zip_var.get(),
+            use_task=True,
+            name="Pacote de relatórios",
+            on_success=self.on_pack_generated,
+            on_error=self.on_pack_error,
+            on_progress=self.on_pack_progress,
+            on_cancel=self.on_pack_cancelled
+        )
+    
+    def on_pack_progress(self, fraction, message):
+        """Atualiza a barra a cada relatório concluído"""
+        self.progress_bar.set(fraction)
+        self.status_label.configure(text=message or "")
+    
+    def on_pack_generated(self, result):
+        """Informa os arquivos gerados e o tempo de cada relatório"""
+        from src.utils.report_pack import REPORT_PACK_FILENAMES
+        
+        self.task = None
+        self.generate_btn.configure(state="normal", text="✅ Gerar Pacote")
+        self.progress_bar.set(1)
+        
+        lines = [
+            f"{REPORT_PACK_FILENAMES.get(report_type, report_type)}: {seconds:.1f} s"
+            for report_type, seconds in result.timings.items()
+        ]
+        lines += [
+            f"{REPORT_PACK_FILENAMES.get(report_type, report_type)}: ERRO - {error}"
+            for report_type, error in result.errors.items()
+        ]
+        
+        summary = "\n".join(lines)
+        location = result.zip_path or result.folder
+        self.status_label.configure(text=f"Concluído em {result.elapsed:.1f} s")
+        
+        if result.errors:
+            messagebox.showwarning(
+                "Atenção",
+                f"Pacote gerado com erros em {result.elapsed:.1f} s\n\n{summary}\n\nLocal: {location}"
+            )
+        else:
             messagebox.showinfo(
                 "Sucesso",
-                f"Relatório gerado com sucesso!\n\nArquivo: {filepath}"
+                f"Pacote gerado em {result.elapsed:.1f} s\n\n{summary}\n\nLocal: {location}"
             )
-            self.destroy()
-            
-        except Exception as e:
-            messagebox.showerror("Erro", f"Erro ao gerar relatório:\n{str(e)}")
+    
+    def on_pack_error(self, error):
+        """Informa erro na geração"""
+        self.task = None
+        self.generate_btn.configure(state="normal", text="✅ Gerar Pacote")
+        self.status_label.configure(text="")
+        messagebox.showerror("Erro", f"Erro ao gerar o pacote:\n{str(error)}")
+    
+    def on_pack_cancelled(self):
+        """Pacote interrompido (diálogo fechado durante a geração)"""
+        self.task = None
+    
+    def close(self):
+        """Fecha o diálogo, interrompendo o pacote em geração"""
+        if self.task is not None:
+            self.task.cancel()
+        self.destroy()
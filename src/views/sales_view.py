@@ -8,7 +8,12 @@ from datetime import datetime
 from src.controllers.sales_controller import SalesController
 from src.controllers.product_controller import ProductController
 from src.controllers.cash_register_controller import CashRegisterController
-from src.models.database import SessionLocal
+from src.controllers.product_catalog import catalog
+from src.controllers.events import SaleCancelled, SaleCreated
+from src.models.database import session_scope
+from src.utils.virtual_grid import PagedDataSource, VirtualGrid
+from src.utils.task_runner import get_task_runner
+from src.utils.ui_events import listen
 from src.utils.window_utils import set_dialog_size
 
 class SalesView(ctk.CTkFrame):
@@ -21,10 +26,13 @@ class SalesView(ctk.CTkFrame):
         self.user_data = user_data
         self.sales_controller = SalesController()
         self.product_controller = ProductController()
-        self.db = SessionLocal()
         
         self.create_widgets()
         self.load_sales()
+        
+        # Atualização incremental da grade a partir dos eventos de domínio
+        listen(self, SaleCreated, self.on_sale_created)
+        listen(self, SaleCancelled, self.on_sale_cancelled)
     
     def create_widgets(self):
         """Cria os widgets da tela"""
@@ -83,19 +91,15 @@ class SalesView(ctk.CTkFrame):
                        font=("Arial", 11, "bold"))
         style.map("Treeview", background=[("selected", "#1f538d")])
         
-        # Scrollbar
-        scrollbar = ttk.Scrollbar(table_frame)
-        scrollbar.pack(side="right", fill="y")
-        
-        # Treeview
-        self.tree = ttk.Treeview(
+        # Grade virtual (apenas as linhas visíveis são materializadas)
+        self.grid = VirtualGrid(
             table_frame,
             columns=("ID", "Nº Venda", "Data", "Cliente", "Total", "Desconto", "Final", "Status"),
-            show="headings",
-            yscrollcommand=scrollbar.set,
+            data_source=PagedDataSource(self.fetch_sales_page, self.count_sales,
+                                        self.format_sale),
             height=15
         )
-        scrollbar.config(command=self.tree.yview)
+        self.tree = self.grid.tree
         
         # Configurar colunas
         self.tree.heading("ID", text="ID")
@@ -116,7 +120,9 @@ class SalesView(ctk.CTkFrame):
         self.tree.column("Final", width=100, anchor="center")
         self.tree.column("Status", width=80, anchor="center")
         
-        self.tree.pack(fill="both", expand=True, padx=10, pady=10)
+        self.tree.tag_configure("cancelled", foreground="gray")
+        
+        self.grid.pack(fill="both", expand=True, padx=10, pady=10)
         
         # Bind duplo clique
         self.tree.bind("<Double-1>", lambda e: self.view_sale_details())
@@ -144,38 +150,56 @@ class SalesView(ctk.CTkFrame):
         cancel_btn.pack(side="left", padx=5)
     
     def load_sales(self):
-        """Carrega vendas no Treeview"""
-        # Limpar tabela
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        # Buscar vendas (últimos 30 dias)
-        sales = self.sales_controller.list_sales(self.db, include_cancelled=True)
-        
-        for sale in sales[:100]:  # Limitar a 100 registros
-            customer_name = sale.customer.name if sale.customer else "Cliente Avulso"
-            status = "Cancelada" if sale.is_cancelled else "OK"
-            
-            tag = "cancelled" if sale.is_cancelled else ""
-            
-            self.tree.insert("", "end", values=(
-                sale.id,
-                sale.sale_number,
-                sale.sale_date.strftime('%d/%m/%Y %H:%M'),
-                customer_name,
-                f"R$ {sale.total_amount:.2f}",
-                f"R$ {sale.discount:.2f}",
-                f"R$ {sale.final_amount:.2f}",
-                status
-            ), tags=(tag,))
-        
-        self.tree.tag_configure("cancelled", foreground="gray")
+        """Carrega as vendas a partir das mais recentes"""
+        self.grid.reset()
+    
+    def fetch_sales_page(self, cursor, offset, limit):
+        """Busca uma página de vendas para a grade (LIMIT no SQL)"""
+        with session_scope() as db:
+            return self.sales_controller.list_sales_page(
+                db, cursor, limit, include_cancelled=True, offset=offset
+            )
+    
+    def count_sales(self):
+        """Conta as vendas exibidas na grade"""
+        with session_scope() as db:
+            return self.sales_controller.count_sales(db, include_cancelled=True)
+    
+    def format_sale(self, sale):
+        """Formata uma venda como linha da grade"""
+        customer_name = sale.customer_name or "Cliente Avulso"
+        status = "Cancelada" if sale.is_cancelled else "OK"
+        
+        tags = ("cancelled",) if sale.is_cancelled else ()
+        
+        return (
+            sale.id,
+            sale.sale_number,
+            sale.sale_date.strftime('%d/%m/%Y %H:%M'),
+            customer_name,
+            f"R$ {sale.total_amount:.2f}",
+            f"R$ {sale.discount:.2f}",
+            f"R$ {sale.final_amount:.2f}",
+            status
+        ), tags
+    
+    def on_sale_created(self, event):
+        """Nova venda: recarrega apenas as páginas visíveis (a venda entra no topo)"""
+        self.grid.refresh()
+    
+    def on_sale_cancelled(self, event):
+        """Venda cancelada: atualiza somente a linha, se estiver carregada"""
+        if event.sale_id not in self.grid.loaded_keys():
+            return
+        with session_scope() as db:
+            sale = self.sales_controller.get_sale(db, event.sale_id, load="rows")
+        if sale:
+            self.grid.update_rows([sale])
     
     def show_new_sale_dialog(self):
         """Mostra diálogo de nova venda"""
         dialog = NewSaleDialog(self, self.user_data)
         self.wait_window(dialog)
-        self.load_sales()
     
     def view_sale_details(self):
         """Visualiza detalhes da venda"""
@@ -187,9 +211,14 @@ class SalesView(ctk.CTkFrame):
         item = self.tree.item(selection[0])
         sale_id = item['values'][0]
         
-        sale = self.sales_controller.get_sale(self.db, sale_id)
-        if sale:
-            dialog = SaleDetailsDialog(self, sale)
+        # O diálogo é montado dentro da sessão (itens, cliente e vendedor)
+        dialog = None
+        with session_scope() as db:
+            sale = self.sales_controller.get_sale(db, sale_id, load="details")
+            if sale:
+                dialog = SaleDetailsDialog(self, sale)
+        
+        if dialog:
             self.wait_window(dialog)
     
     def cancel_sale(self):
@@ -203,15 +232,19 @@ class SalesView(ctk.CTkFrame):
         sale_id = item['values'][0]
         sale_number = item['values'][1]
         
-        sale = self.sales_controller.get_sale(self.db, sale_id)
+        with session_scope() as db:
+            sale = self.sales_controller.get_sale(db, sale_id)
+        
         if sale and sale.is_cancelled:
             messagebox.showinfo("Informação", "Esta venda já está cancelada.")
             return
         
         if messagebox.askyesno("Confirmar", f"Deseja cancelar a venda {sale_number}?\n\nOs produtos serão devolvidos ao estoque."):
-            if self.sales_controller.cancel_sale(self.db, sale_id):
+            with session_scope() as db:
+                success = self.sales_controller.cancel_sale(db, sale_id)
+            
+            if success:
                 messagebox.showinfo("Sucesso", "Venda cancelada com sucesso!")
-                self.load_sales()
             else:
                 messagebox.showerror("Erro", "Erro ao cancelar venda.")
 
@@ -226,7 +259,6 @@ class NewSaleDialog(ctk.CTkToplevel):
         self.user_data = user_data
         self.sales_controller = SalesController()
         self.product_controller = ProductController()
-        self.db = SessionLocal()
         
         self.title("Nova Venda")
         
@@ -275,6 +307,7 @@ class NewSaleDialog(ctk.CTkToplevel):
         ctk.CTkLabel(select_frame, text="Quantidade:", font=("Arial", 12)).grid(row=0, column=2, padx=5, pady=5)
         self.qty_entry = ctk.CTkEntry(select_frame, width=100, placeholder_text="0")
         self.qty_entry.grid(row=0, column=3, padx=5, pady=5)
+        self.qty_entry.bind("<Return>", lambda e: self.add_item())
         
         # Preço unitário
         ctk.CTkLabel(select_frame, text="Preço Unit:", font=("Arial", 12)).grid(row=0, column=4, padx=5, pady=5)
@@ -290,6 +323,18 @@ class NewSaleDialog(ctk.CTkToplevel):
         )
         add_btn.grid(row=0, column=6, padx=5, pady=5)
         
+        # Busca de produto (código ou nome, sem distinção de acentos)
+        ctk.CTkLabel(select_frame, text="Buscar:", font=("Arial", 12)).grid(row=1, column=0, padx=5, pady=5, sticky="w")
+        self.product_search_entry = ctk.CTkEntry(
+            select_frame,
+            width=300,
+            placeholder_text="Código ou nome (ex.: acucar)"
+        )
+        self.product_search_entry.grid(row=1, column=1, padx=5, pady=5)
+        self.product_search_entry.bind("<KeyRelease>", lambda e: self.search_products())
+        # Enter (ex.: leitor de código de barras) vai direto para a quantidade
+        self.product_search_entry.bind("<Return>", lambda e: self.qty_entry.focus_set())
+        
         # Frame da tabela de itens
         items_frame = ctk.CTkFrame(main_frame)
         items_frame.pack(fill="both", expand=True, pady=10)
@@ -394,7 +439,7 @@ class NewSaleDialog(ctk.CTkToplevel):
         )
         cancel_btn.pack(side="right", padx=5)
         
-        save_btn = ctk.CTkButton(
+        self.save_btn = ctk.CTkButton(
             btn_frame,
             text="✅ Finalizar Venda",
             width=200,
@@ -404,29 +449,64 @@ class NewSaleDialog(ctk.CTkToplevel):
             hover_color="darkgreen",
             command=self.finalize_sale
         )
-        save_btn.pack(side="right", padx=5)
+        self.save_btn.pack(side="right", padx=5)
     
     def load_products(self):
-        """Carrega produtos no combobox"""
-        products = self.product_controller.list_products(self.db, active_only=True)
-        self.products_dict = {f"{p.code} - {p.name}": p for p in products}
-        self.product_combo.configure(values=list(self.products_dict.keys()))
+        """Carrega produtos no combobox a partir do catálogo em memória"""
+        if not catalog.is_warm:
+            with session_scope() as db:
+                catalog.ensure_warm(db)
+        
+        self.show_products(catalog.list_products())
+    
+    def show_products(self, products):
+        """Exibe os produtos no combobox"""
+        self.product_ids = {product.label: product.id for product in products}
+        self.product_combo.configure(values=list(self.product_ids.keys()))
+    
+    def search_products(self):
+        """Filtra o combobox pela busca e seleciona o resultado mais relevante"""
+        search_term = self.product_search_entry.get().strip()
+        if not search_term:
+            self.load_products()
+            return
+        
+        # Código/código de barras exato e prefixo do nome: direto do catálogo
+        exact = catalog.lookup(search_term)
+        products = [exact] if exact else catalog.search_prefix(search_term)
+        
+        # Sem resultado no nome: busca completa (descrição) pelo índice FTS
+        if not products:
+            with session_scope() as db:
+                found = self.product_controller.search_products(db, search_term, load="rows", limit=50)
+            products = [catalog.get(row.id) for row in found if catalog.get(row.id)]
+        
+        self.show_products(products)
+        
+        if products:
+            self.product_var.set(products[0].label)
+            self.on_product_selected(products[0].label)
+    
+    def get_selected_product(self):
+        """Produto selecionado no combobox (entrada do catálogo) ou None"""
+        product_id = self.product_ids.get(self.product_var.get())
+        return catalog.get(product_id) if product_id else None
     
     def on_product_selected(self, selected=None):
         """Quando produto é selecionado"""
         # Se não passou o valor, pega do StringVar
-        if selected is None:
-            selected = self.product_var.get()
+        if selected is not None:
+            self.product_var.set(selected)
         
-        if selected in self.products_dict:
-            product = self.products_dict[selected]
+        product = self.get_selected_product()
+        if product:
             self.price_entry.delete(0, "end")
             self.price_entry.insert(0, f"{product.sale_price:.2f}")
     
     def add_item(self):
         """Adiciona item à venda"""
-        selected = self.product_var.get()
-        if not selected or selected not in self.products_dict:
+        product = self.get_selected_product()
+        if not product:
             messagebox.showwarning("Aviso", "Selecione um produto.")
             return
         
@@ -441,8 +521,6 @@ class NewSaleDialog(ctk.CTkToplevel):
             messagebox.showwarning("Aviso", "Quantidade e preço devem ser maiores que zero.")
             return
         
-        product = self.products_dict[selected]
-        
         # Verificar estoque
         if product.stock_quantity < qty:
             messagebox.showwarning("Aviso", f"Estoque insuficiente! Disponível: {product.stock_quantity:.0f}")
@@ -467,10 +545,13 @@ class NewSaleDialog(ctk.CTkToplevel):
             f"R$ {subtotal:.2f}"
         ))
         
-        # Limpar campos
+        # Limpar campos e voltar para a busca (catálogo em memória, sem consulta)
         self.qty_entry.delete(0, "end")
         self.product_var.set("")
         self.price_entry.delete(0, "end")
+        self.product_search_entry.delete(0, "end")
+        self.load_products()
+        self.product_search_entry.focus_set()
         
         self.calculate_totals()
     
@@ -503,6 +584,9 @@ class NewSaleDialog(ctk.CTkToplevel):
     
     def finalize_sale(self):
         """Finaliza a venda"""
+        if self.save_btn.cget("state") == "disabled":
+            return  # Venda já sendo gravada
+        
         if not self.items:
             messagebox.showwarning("Aviso", "Adicione pelo menos um item à venda.")
             return
@@ -516,29 +600,60 @@ class NewSaleDialog(ctk.CTkToplevel):
         sale_type = self.sale_type_var.get()
         payment_method = self.payment_method_var.get()
         
-        # Criar venda
+        # Gravação em segundo plano (a janela continua respondendo)
+        self.save_btn.configure(state="disabled", text="Gravando...")
+        get_task_runner(self).submit(
+            self.save_sale_task,
+            list(self.items),
+            discount,
+            sale_type,
+            payment_method,
+            use_session=True,
+            name="Finalizando venda",
+            on_success=self.on_sale_saved,
+            on_error=self.on_sale_error
+        )
+    
+    def save_sale_task(self, db, items, discount, sale_type, payment_method):
+        """
+        Cria a venda e registra no caixa, se houver caixa aberto (executa no worker)
+        
+        Returns:
+            Tupla (venda, caixa aberto?, erro do registro no caixa, tipo, pagamento)
+        """
+        cash_register = None
+        error = None
         sale = self.sales_controller.create_sale(
-            self.db,
+            db,
             user_id=self.user_data['id'],
-            items=self.items,
+            items=items,
             discount=discount,
-            payment_method=payment_method
+            payment_method=payment_method,
+            sale_type=sale_type
         )
         
         if sale:
-            # Registrar no caixa (se houver caixa aberto)
             cash_controller = CashRegisterController()
-            cash_register = cash_controller.get_open_cash_register(self.db)
+            cash_register = cash_controller.get_open_cash_register(db)
             
             if cash_register:
                 movement, error = cash_controller.register_sale_in_cash(
-                    self.db,
+                    db,
                     sale_id=sale.id,
                     sale_type=sale_type,
                     payment_method=payment_method,
                     amount=sale.final_amount
                 )
-                
+        
+        return sale, cash_register is not None, error, sale_type, payment_method
+    
+    def on_sale_saved(self, result):
+        """Exibe o resultado da venda"""
+        sale, has_cash_register, error, sale_type, payment_method = result
+        self.save_btn.configure(state="normal", text="✅ Finalizar Venda")
+        
+        if sale:
+            if has_cash_register:
                 if error:
                     messagebox.showwarning(
                         "Aviso",
@@ -564,6 +679,11 @@ class NewSaleDialog(ctk.CTkToplevel):
             self.destroy()
         else:
             messagebox.showerror("Erro", "Erro ao realizar venda.")
+    
+    def on_sale_error(self, error):
+        """Trata erros inesperados ao gravar a venda"""
+        self.save_btn.configure(state="normal", text="✅ Finalizar Venda")
+        messagebox.showerror("Erro", f"Erro ao realizar venda:\n{error}")
 
 
 class SaleDetailsDialog(ctk.CTkToplevel):
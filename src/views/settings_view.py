@@ -6,8 +6,9 @@ import customtkinter as ctk
 from tkinter import messagebox, ttk
 from src.controllers.auth_controller import AuthController
 from src.models import User
-from src.models.database import SessionLocal
+from src.models.database import session_scope, get_session_stats
 from src.utils.window_utils import set_dialog_size
+from src.utils.backup import create_backup, get_database_path
 import shutil
 import os
 from datetime import datetime
@@ -21,7 +22,6 @@ class SettingsView(ctk.CTkFrame):
         self.parent = parent
         self.user_data = user_data
         self.auth_controller = AuthController()
-        self.db = SessionLocal()
         
         # Verificar permissão
         if user_data['role'] != 'admin':
@@ -316,6 +316,14 @@ class SettingsView(ctk.CTkFrame):
             ("🎨 Interface", "CustomTkinter")
         ]
         
+        # Diagnóstico de sessões e conexões
+        stats = get_session_stats()
+        info_data.append((
+            "🔌 Sessões",
+            f"{stats['live_sessions']} vivas, {stats['open_transactions']} com conexão, "
+            f"{stats['identity_map_total']} objetos em memória"
+        ))
+        
         for label, value in info_data:
             row = ctk.CTkFrame(content_frame)
             row.pack(fill="x", pady=8)
@@ -351,15 +359,16 @@ class SettingsView(ctk.CTkFrame):
         for item in self.users_tree.get_children():
             self.users_tree.delete(item)
         
-        users = self.db.query(User).all()
-        for user in users:
-            self.users_tree.insert("", "end", values=(
-                user.id,
-                user.username,
-                user.full_name,
-                user.role.upper(),
-                "Sim" if user.is_active else "Não"
-            ), tags=('active' if user.is_active else 'inactive',))
+        with session_scope() as db:
+            users = db.query(User).all()
+            for user in users:
+                self.users_tree.insert("", "end", values=(
+                    user.id,
+                    user.username,
+                    user.full_name,
+                    user.role.upper(),
+                    "Sim" if user.is_active else "Não"
+                ), tags=('active' if user.is_active else 'inactive',))
     
     def show_new_user_dialog(self):
         """Mostra diálogo de novo usuário"""
@@ -377,7 +386,9 @@ class SettingsView(ctk.CTkFrame):
         item = self.users_tree.item(selection[0])
         user_id = item['values'][0]
         
-        user = self.db.query(User).filter(User.id == user_id).first()
+        with session_scope() as db:
+            user = db.query(User).filter(User.id == user_id).first()
+        
         if user:
             dialog = UserDialog(self, user)
             self.wait_window(dialog)
@@ -393,15 +404,16 @@ class SettingsView(ctk.CTkFrame):
         item = self.users_tree.item(selection[0])
         user_id = item['values'][0]
         
-        user = self.db.query(User).filter(User.id == user_id).first()
+        if user_id == self.user_data['id']:
+            messagebox.showerror("Erro", "Você não pode desativar seu próprio usuário!")
+            return
+        
+        with session_scope() as db:
+            user = db.query(User).filter(User.id == user_id).first()
+            if user:
+                user.is_active = not user.is_active
+        
         if user:
-            if user.id == self.user_data['id']:
-                messagebox.showerror("Erro", "Você não pode desativar seu próprio usuário!")
-                return
-            
-            user.is_active = not user.is_active
-            self.db.commit()
-            
             status = "ativado" if user.is_active else "desativado"
             messagebox.showinfo("Sucesso", f"Usuário {status} com sucesso!")
             self.load_users()
@@ -416,7 +428,9 @@ class SettingsView(ctk.CTkFrame):
         item = self.users_tree.item(selection[0])
         user_id = item['values'][0]
         
-        user = self.db.query(User).filter(User.id == user_id).first()
+        with session_scope() as db:
+            user = db.query(User).filter(User.id == user_id).first()
+        
         if user:
             dialog = ChangePasswordDialog(self, user)
             self.wait_window(dialog)
@@ -444,8 +458,8 @@ class SettingsView(ctk.CTkFrame):
             )
             
             if filepath:
-                db_path = "database/chefconta.db"
-                shutil.copy2(db_path, filepath)
+                # Backup online: consistente mesmo com transações no WAL
+                create_backup(filepath)
                 messagebox.showinfo("Sucesso", f"Backup criado com sucesso!\n\n{filepath}")
         except Exception as e:
             messagebox.showerror("Erro", f"Erro ao criar backup:\n{str(e)}")
@@ -470,15 +484,22 @@ class SettingsView(ctk.CTkFrame):
             )
             
             if filepath:
-                db_path = "database/chefconta.db"
+                db_path = get_database_path()
                 
                 # Criar backup de segurança antes
-                safety_backup = f"database/chefconta_before_restore_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
-                shutil.copy2(db_path, safety_backup)
+                safety_backup = os.path.join(
+                    os.path.dirname(db_path),
+                    f"chefconta_before_restore_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
+                )
+                create_backup(safety_backup)
                 
                 # Restaurar
                 shutil.copy2(filepath, db_path)
                 
+                # Relatórios e gráficos em cache são do banco anterior
+                from src.utils.report_cache import clear_caches
+                clear_caches()
+                
                 messagebox.showinfo(
                     "Sucesso",
                     f"Backup restaurado com sucesso!\n\n"
@@ -498,7 +519,6 @@ class UserDialog(ctk.CTkToplevel):
         self.parent = parent
         self.user = user
         self.auth_controller = AuthController()
-        self.db = SessionLocal()
         
         self.title("Editar Usuário" if user else "Novo Usuário")
         
@@ -588,11 +608,12 @@ class UserDialog(ctk.CTkToplevel):
             return
         
         if self.user:  # Edição
-            self.user.username = username
-            self.user.full_name = fullname
-            self.user.email = email
-            self.user.role = self.role_var.get()
-            self.db.commit()
+            with session_scope() as db:
+                user = db.query(User).filter(User.id == self.user.id).first()
+                user.username = username
+                user.full_name = fullname
+                user.email = email
+                user.role = self.role_var.get()
             messagebox.showinfo("Sucesso", "Usuário atualizado com sucesso!")
         else:  # Novo
             password = self.password_entry.get()
@@ -607,19 +628,20 @@ class UserDialog(ctk.CTkToplevel):
                 return
             
             # Verificar se usuário já existe
-            existing = self.db.query(User).filter(User.username == username).first()
-            if existing:
-                messagebox.showerror("Erro", "Usuário já existe!")
-                return
-            
-            user = self.auth_controller.create_user(
-                self.db,
-                username=username,
-                password=password,
-                full_name=fullname,
-                email=email,
-                role=self.role_var.get()
-            )
+            with session_scope() as db:
+                existing = db.query(User).filter(User.username == username).first()
+                if existing:
+                    messagebox.showerror("Erro", "Usuário já existe!")
+                    return
+                
+                user = self.auth_controller.create_user(
+                    db,
+                    username=username,
+                    password=password,
+                    full_name=fullname,
+                    email=email,
+                    role=self.role_var.get()
+                )
             
             if user:
                 messagebox.showinfo("Sucesso", "Usuário criado com sucesso!")
@@ -639,7 +661,6 @@ class ChangePasswordDialog(ctk.CTkToplevel):
         self.parent = parent
         self.user = user
         self.auth_controller = AuthController()
-        self.db = SessionLocal()
         
         self.title(f"Alterar Senha - {user.username}")
         
@@ -713,8 +734,9 @@ class ChangePasswordDialog(ctk.CTkToplevel):
         # Alterar senha
         import bcrypt
         hashed = bcrypt.hashpw(new_pass.encode('utf-8'), bcrypt.gensalt())
-        self.user.password_hash = hashed.decode('utf-8')
-        self.db.commit()
+        with session_scope() as db:
+            user = db.query(User).filter(User.id == self.user.id).first()
+            user.password_hash = hashed.decode('utf-8')
         
         messagebox.showinfo("Sucesso", "Senha alterada com sucesso!")
         self.destroy()
@@ -7,6 +7,8 @@ Verifica:
 - Estrutura de banco de dados
 - Arquivos faltando
 - Configurações
+- Planos de consulta (EXPLAIN QUERY PLAN) dos controllers
+- Quantidade de consultas por tela (sem N+1)
 """
 
 import os
@@ -32,11 +34,14 @@ class ProjectValidator:
         self.check_required_files()
         self.check_database()
         self.check_env_vars()
+        self.check_query_plans()
+        self.check_statement_counts()
+        self.check_report_generation()
         self.report()
 
     def check_python_syntax(self):
         """Verifica sintaxe de todos os arquivos Python"""
-        print("[1/5] Verificando sintaxe Python...")
+        print("[1/8] Verificando sintaxe Python...")
         py_files = list(self.project_root.glob("**/*.py"))
         
         for py_file in py_files:
@@ -53,7 +58,7 @@ class ProjectValidator:
 
     def check_imports(self):
         """Verifica se os imports principais funcionam"""
-        print("[2/5] Verificando imports...")
+        print("[2/8] Verificando imports...")
         
         imports_to_check = [
             "src.controllers.auth_controller",
@@ -74,7 +79,7 @@ class ProjectValidator:
 
     def check_required_files(self):
         """Verifica se os arquivos essenciais existem"""
-        print("[3/5] Verificando arquivos essenciais...")
+        print("[3/8] Verificando arquivos essenciais...")
         
         required_files = [
             "main.py",
@@ -96,27 +101,65 @@ class ProjectValidator:
 
     def check_database(self):
         """Verifica estrutura do banco de dados"""
-        print("[4/5] Verificando banco de dados...")
+        print("[4/8] Verificando banco de dados...")
         
         try:
-            from src.models.database import SessionLocal, create_tables, engine
+            from src.models.database import session_scope, get_session_stats, engine
+            from src.models.migrations import ensure_schema, get_alembic_config, HEAD_REVISION
+            from alembic.script import ScriptDirectory
             from sqlalchemy import text
             
-            # Tentar criar tabelas
-            create_tables()
-            self.successes.append("✅ Banco de dados e tabelas OK")
+            # Conferir se HEAD_REVISION acompanha a última migração
+            script_head = ScriptDirectory.from_config(get_alembic_config()).get_current_head()
+            if script_head != HEAD_REVISION:
+                self.errors.append(
+                    f"❌ HEAD_REVISION ({HEAD_REVISION}) difere da última migração ({script_head})"
+                )
+            
+            # Migrações devem produzir exatamente o schema dos modelos
+            self.check_migrations_match_models()
+            
+            # Aplicar migrações pendentes
+            ensure_schema()
+            self.successes.append("✅ Banco de dados e migrações OK")
             
             # Verificar conexão
-            db = SessionLocal()
-            db.execute(text("SELECT 1"))
-            db.close()
+            with session_scope() as db:
+                db.execute(text("SELECT 1"))
             self.successes.append("✅ Conexão com banco de dados OK")
+            
+            # A sessão deve ter devolvido a conexão ao pool ao sair do bloco
+            stats = get_session_stats()
+            if stats['open_transactions'] or stats['pool_checked_out']:
+                self.errors.append(f"❌ Sessão não liberou a conexão: {stats}")
         except Exception as e:
             self.errors.append(f"❌ Erro ao verificar banco de dados: {e}")
 
+    def check_migrations_match_models(self):
+        """Compara o schema gerado pelas migrações com os modelos"""
+        import tempfile
+        from alembic.autogenerate import compare_metadata
+        from alembic.migration import MigrationContext
+        from src.models.database import Base, create_db_engine
+        from src.models.migrations import upgrade_database, include_name
+        import src.models  # noqa: F401
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            engine = create_db_engine(f"sqlite:///{tmpdir}/schema.db", profile="default")
+            upgrade_database(engine)
+            with engine.connect() as connection:
+                context = MigrationContext.configure(connection, opts={"include_name": include_name})
+                diff = compare_metadata(context, Base.metadata)
+            engine.dispose()
+        
+        if diff:
+            self.errors.append(f"❌ Migrações divergem dos modelos: {diff}")
+        else:
+            self.successes.append("✅ Migrações equivalentes aos modelos")
+
     def check_env_vars(self):
         """Verifica variáveis de ambiente"""
-        print("[5/5] Verificando variáveis de ambiente...")
+        print("[5/8] Verificando variáveis de ambiente...")
         
         env_file = self.project_root / ".env"
         env_example = self.project_root / ".env.example"
@@ -164,6 +207,376 @@ class ProjectValidator:
         
         return len(self.errors) == 0
 
+    def _seed_query_plan_db(self, db):
+        """Cria registros mínimos para exercitar as consultas dos controllers"""
+        from datetime import datetime, timedelta
+        from src.models import (User, Supplier, Product, Sale, Expense, Purchase,
+                                CashRegister, CashMovement, StockMovement)
+
+        now = datetime.now()
+        user = User(username="plan", email="plan@chefconta.com", password_hash="-",
+                    full_name="Plano", role="admin")
+        supplier = Supplier(name="Fornecedor")
+        product = Product(code="P1", name="Produto", sale_price=10.0, stock_quantity=10)
+        db.add_all([user, supplier, product])
+        db.flush()
+
+        register = CashRegister(user_id=user.id, opening_balance=0.0)
+        db.add(register)
+        db.flush()
+
+        db.add_all([
+            Sale(sale_number="VD1", user_id=user.id, sale_date=now,
+                 total_amount=10.0, final_amount=10.0),
+            Expense(expense_number="DP1", user_id=user.id, expense_type="outros",
+                    description="Teste", amount=5.0, due_date=now - timedelta(days=1)),
+            Purchase(purchase_number="CP1", supplier_id=supplier.id, user_id=user.id,
+                     total_amount=5.0),
+            CashMovement(cash_register_id=register.id, movement_type="entrada",
+                         amount=10.0, description="Teste"),
+            StockMovement(product_id=product.id, movement_type="entrada", quantity=1,
+                          previous_stock=9, new_stock=10),
+        ])
+        db.commit()
+        return {'user': user.id, 'supplier': supplier.id, 'product': product.id,
+                'register': register.id}
+
+    def check_query_plans(self):
+        """Verifica se as consultas quentes dos controllers usam índices"""
+        print("[6/8] Verificando planos de consulta...")
+
+        try:
+            from datetime import datetime, timedelta
+            from sqlalchemy import event
+            from sqlalchemy.orm import sessionmaker
+            from src.models.database import Base, create_db_engine
+            from src.controllers.sales_controller import SalesController
+            from src.controllers.expense_controller import ExpenseController
+            from src.controllers.purchase_controller import PurchaseController
+            from src.controllers.product_controller import ProductController
+            from src.controllers.cash_register_controller import CashRegisterController
+            from src.controllers.dashboard_controller import DashboardController
+            from src.controllers.rollup_controller import RollupController
+        except Exception as e:
+            self.errors.append(f"❌ Erro ao preparar verificação de planos: {e}")
+            return
+
+        engine = create_db_engine("sqlite://", profile="default")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        ids = self._seed_query_plan_db(db)
+
+        end = datetime.now()
+        start = end - timedelta(days=30)
+        sales = SalesController()
+        expenses = ExpenseController()
+        purchases = PurchaseController()
+        products = ProductController()
+        cash = CashRegisterController()
+        dashboard = DashboardController()
+        rollups = RollupController()
+
+        queries = {
+            "list_sales(período)": lambda: sales.list_sales(db, start, end),
+            "list_sales(com canceladas)": lambda: sales.list_sales(db, include_cancelled=True),
+            "list_sales(cliente)": lambda: sales.list_sales(db, customer_id=1),
+            "list_sales_page": lambda: sales.list_sales_page(db, cursor=(end, 1)),
+            "list_sales_page(com canceladas)": lambda: sales.list_sales_page(
+                db, cursor=(end, 1), include_cancelled=True),
+            "get_sales_summary": lambda: sales.get_sales_summary(db, start, end),
+            "list_expenses(período)": lambda: expenses.list_expenses(db, start, end),
+            "list_expenses(pendentes)": lambda: expenses.list_expenses(db, paid=False),
+            "list_expenses_page": lambda: expenses.list_expenses_page(db, cursor=(end, 1)),
+            "list_expenses_page(pendentes)": lambda: expenses.list_expenses_page(
+                db, cursor=(end, 1), paid=False),
+            "get_expenses_summary": lambda: expenses.get_expenses_summary(db, start, end),
+            "get_overdue_expenses": lambda: expenses.get_overdue_expenses(db),
+            "list_purchases(período)": lambda: purchases.list_purchases(db, start, end),
+            "list_purchases(fornecedor)": lambda: purchases.list_purchases(db, supplier_id=ids['supplier']),
+            "list_purchases_page": lambda: purchases.list_purchases_page(db, cursor=(end, 1)),
+            "count_sales": lambda: sales.count_sales(db),
+            "count_expenses(pendentes)": lambda: expenses.count_expenses(db, paid=False),
+            "list_products_page": lambda: products.list_products_page(db, cursor=("P", 1)),
+            "list_products_page(todos)": lambda: products.list_products_page(
+                db, cursor=("P", 1), active_only=False),
+            "search_products": lambda: products.search_products(db, "acucar", load="rows"),
+            "list_products_page(busca)": lambda: products.list_products_page(
+                db, cursor=(-1.0, 1), search="acucar"),
+            "get_stock_movements(produto)": lambda: products.get_stock_movements(db, ids['product']),
+            "get_stock_movements": lambda: products.get_stock_movements(db),
+            "get_open_cash_register": lambda: cash.get_open_cash_register(db),
+            "get_cash_register_summary": lambda: cash.get_cash_register_summary(db, ids['register']),
+            "list_cash_registers": lambda: cash.list_cash_registers(db),
+            "list_cash_registers_page": lambda: cash.list_cash_registers_page(db, cursor=(end, 1)),
+            "list_movements_page": lambda: cash.list_movements_page(
+                db, ids['register'], cursor=(start, 1)),
+            "get_dashboard": lambda: dashboard.get_dashboard(db, use_cache=False),
+            "get_purchases_summary": lambda: purchases.get_purchases_summary(db, start, end),
+            "sales_totals(mês inteiro)": lambda: rollups.sales_totals(
+                db, start.replace(hour=0, minute=0, second=0, microsecond=0)),
+        }
+
+        captured = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT"):
+                captured.append((statement, parameters))
+
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            for name, run in queries.items():
+                captured.clear()
+                run()
+                statements = list(captured)
+                problems = []
+                for statement, parameters in statements:
+                    plan = db.connection().exec_driver_sql(
+                        f"EXPLAIN QUERY PLAN {statement}", parameters
+                    ).fetchall()
+                    # Buscas FTS5: a varredura da tabela virtual usa o próprio
+                    # índice e a ordenação fica restrita às linhas encontradas
+                    uses_fts = any("VIRTUAL TABLE INDEX" in row[-1] for row in plan)
+                    for row in plan:
+                        detail = row[-1]
+                        # Varrer o resultado de uma subconsulta agregada (uma
+                        # linha) não é varrer a tabela
+                        full_scan = (detail.startswith("SCAN") and "USING" not in detail
+                                     and "VIRTUAL TABLE INDEX" not in detail
+                                     and detail.split()[1] in Base.metadata.tables)
+                        if full_scan or ("TEMP B-TREE" in detail and not uses_fts):
+                            problems.append(detail)
+
+                if problems:
+                    self.errors.append(f"❌ Consulta sem índice em {name}: {'; '.join(problems)}")
+                else:
+                    self.successes.append(f"✅ Plano com índice: {name}")
+        except Exception as e:
+            self.errors.append(f"❌ Erro ao verificar planos de consulta: {e}")
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+            db.close()
+            engine.dispose()
+
+    def _seed_screen_rows(self, db, count, items_per_document):
+        """Cria vendas, compras e despesas com relacionamentos distintos por linha"""
+        from src.models import (User, Customer, Supplier, Category, Product, Sale,
+                                SaleItem, Purchase, PurchaseItem, Expense)
+
+        user = db.query(User).first()
+        if not user:
+            user = User(username="telas", email="telas@chefconta.com", password_hash="-",
+                        full_name="Telas", role="admin")
+            db.add(user)
+            db.flush()
+
+        offset = db.query(Sale).count()
+        for i in range(offset, offset + count):
+            category = Category(name=f"Categoria {i}")
+            customer = Customer(name=f"Cliente {i}")
+            supplier = Supplier(name=f"Fornecedor {i}")
+            products = [
+                Product(code=f"T{i}-{j}", name=f"Produto {i}-{j}", sale_price=10.0,
+                        category=category)
+                for j in range(items_per_document)
+            ]
+            db.add_all([category, customer, supplier] + products)
+            db.flush()
+
+            db.add(Sale(
+                sale_number=f"VDT{i}", user_id=user.id, customer_id=customer.id,
+                total_amount=10.0, final_amount=10.0,
+                items=[SaleItem(product_id=p.id, quantity=1, unit_price=10.0, subtotal=10.0)
+                       for p in products]
+            ))
+            db.add(Purchase(
+                purchase_number=f"CPT{i}", user_id=user.id, supplier_id=supplier.id,
+                total_amount=10.0,
+                items=[PurchaseItem(product_id=p.id, quantity=1, unit_price=10.0, subtotal=10.0)
+                       for p in products]
+            ))
+            db.add(Expense(
+                expense_number=f"DPT{i}", user_id=user.id, supplier_id=supplier.id,
+                expense_type="outros", description="Teste", amount=5.0
+            ))
+        db.commit()
+
+    def check_statement_counts(self):
+        """Verifica se a quantidade de consultas por tela não cresce com as linhas"""
+        print("[7/8] Verificando consultas por tela...")
+
+        try:
+            from sqlalchemy import event, func
+            from sqlalchemy.orm import sessionmaker
+            from src.models.database import Base, create_db_engine
+            from src.models import Sale, Purchase, Expense
+            from src.controllers.sales_controller import SalesController
+            from src.controllers.expense_controller import ExpenseController
+            from src.controllers.purchase_controller import PurchaseController
+            from src.controllers.product_controller import ProductController
+            from src.controllers.product_catalog import catalog
+            from src.controllers.dashboard_controller import DashboardController
+            from src.utils.report_generator import build_report
+        except Exception as e:
+            self.errors.append(f"❌ Erro ao preparar contagem de consultas: {e}")
+            return
+
+        engine = create_db_engine("sqlite://", profile="default")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+
+        sales = SalesController()
+        expenses = ExpenseController()
+        purchases = PurchaseController()
+        products = ProductController()
+        dashboard = DashboardController()
+
+        def last_id(model):
+            return db.query(func.max(model.id)).scalar()
+
+        def sale_details():
+            sale = sales.get_sale(db, last_id(Sale), load="details")
+            return (sale.customer.name, sale.user.full_name,
+                    [item.product.name for item in sale.items])
+
+        def purchase_details():
+            purchase = purchases.get_purchase(db, last_id(Purchase), load="details")
+            return (purchase.supplier.name, purchase.user.full_name,
+                    [item.product.name for item in purchase.items])
+
+        def expense_details():
+            expense = expenses.get_expense(db, last_id(Expense), load="details")
+            return expense.supplier.name, expense.user.full_name
+
+        # Cada tela acessa os mesmos atributos que a view correspondente
+        screens = {
+            "Vendas": lambda: [s.customer_name for s in
+                               sales.list_sales_page(db, include_cancelled=True)[0]],
+            "Detalhes da venda": sale_details,
+            "Produtos": lambda: [p.category_name for p in
+                                 products.list_products_page(db, active_only=False)[0]],
+            "Compras": lambda: [(p.supplier_name, p.item_count) for p in
+                                purchases.list_purchases_page(db)[0]],
+            "Detalhes da compra": purchase_details,
+            "Despesas": lambda: [e.expense_number for e in
+                                 expenses.list_expenses_page(db)[0]],
+            "Detalhes da despesa": expense_details,
+            "Dashboard": lambda: dashboard.get_dashboard(db, use_cache=False),
+            "Relatório de estoque": lambda: list(
+                build_report(db, "stock", None, None).sections[0].rows
+            ),
+        }
+
+        statements = []
+
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        def measure():
+            counts = {}
+            for name, run in screens.items():
+                db.expunge_all()  # sem cache do identity map entre as telas
+                statements.clear()
+                run()
+                counts[name] = len(statements)
+            return counts
+
+        event.listen(engine, "before_cursor_execute", count)
+        try:
+            self._seed_screen_rows(db, count=5, items_per_document=2)
+            small = measure()
+            self._seed_screen_rows(db, count=40, items_per_document=6)
+            large = measure()
+
+            for name in screens:
+                if small[name] != large[name]:
+                    self.errors.append(
+                        f"❌ Consultas por tela crescem com as linhas em {name}: "
+                        f"{small[name]} -> {large[name]}"
+                    )
+                else:
+                    self.successes.append(f"✅ {name}: {large[name]} consulta(s) por carga")
+
+            # Nova venda: com o catálogo carregado, buscar e adicionar itens não consulta o banco
+            catalog.warm(db)
+            statements.clear()
+            labels = [product.label for product in catalog.list_products()]
+            found = catalog.lookup("T1-1") or catalog.search_prefix("produto")
+            if not labels or not found:
+                self.errors.append("❌ Catálogo de produtos vazio após o carregamento")
+            elif statements:
+                self.errors.append(f"❌ Nova venda consultou o banco com o catálogo carregado: {len(statements)}")
+            else:
+                self.successes.append("✅ Nova venda: 0 consulta(s) com o catálogo carregado")
+        except Exception as e:
+            self.errors.append(f"❌ Erro ao contar consultas por tela: {e}")
+        finally:
+            catalog.clear()
+            event.remove(engine, "before_cursor_execute", count)
+            db.close()
+            engine.dispose()
+
+    def check_report_generation(self):
+        """Gera todos os relatórios em todos os formatos, como a tela (com progresso e sem cache)"""
+        print("[8/8] Verificando geração de relatórios...")
+
+        try:
+            import tempfile
+            from datetime import datetime, timedelta
+            from sqlalchemy.orm import sessionmaker
+            from src.models.database import Base, create_db_engine
+            from src.utils import charts
+            from src.utils.report_generator import FORMAT_EXTENSIONS, REPORT_BUILDERS, ReportGenerator
+        except Exception as e:
+            self.errors.append(f"❌ Erro ao preparar geração de relatórios: {e}")
+            return
+
+        class ProgressTask:
+            """Mesma interface da Task do TaskRunner, sem cancelamento"""
+            def __init__(self):
+                self.updates = 0
+
+            def check_cancelled(self):
+                pass
+
+            def progress(self, fraction, message=None):
+                self.updates += 1
+
+        engine = create_db_engine("sqlite://", profile="default")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        chart_cache = charts._chart_cache
+        end_date = datetime.now() + timedelta(days=1)
+        start_date = end_date - timedelta(days=30)
+
+        try:
+            with tempfile.TemporaryDirectory() as output_dir:
+                # Gráficos do relatório financeiro fora da pasta do projeto
+                charts._chart_cache = charts.ChartCache(output_dir)
+                self._seed_screen_rows(db, count=5, items_per_document=2)
+                generator = ReportGenerator(output_dir, chunk_rows=2, use_cache=False)
+
+                for report_type in REPORT_BUILDERS:
+                    for output_format, extension in FORMAT_EXTENSIONS.items():
+                        name = f"{report_type}.{extension}"
+                        task = ProgressTask()
+                        try:
+                            path = generator.generate(db, report_type, start_date, end_date,
+                                                      os.path.join(output_dir, name),
+                                                      output_format, task=task)
+                        except Exception as e:
+                            self.errors.append(f"❌ Erro ao gerar o relatório {name}: {e}")
+                            continue
+                        if not os.path.getsize(path) or not task.updates:
+                            self.errors.append(f"❌ Relatório {name} vazio ou sem progresso")
+                        else:
+                            self.successes.append(f"✅ Relatório {name} gerado")
+        except Exception as e:
+            self.errors.append(f"❌ Erro ao gerar relatórios: {e}")
+        finally:
+            charts._chart_cache = chart_cache
+            db.close()
+            engine.dispose()
+
 if __name__ == "__main__":
     validator = ProjectValidator(Path(__file__).parent)
     success = validator.validate_all()